@@ -0,0 +1,342 @@
+"""End-to-end throughput benchmark on synthetic data
+
+Usage:
+    python benchmark.py --rows 20000 --text-chars 600
+    python benchmark.py --model mE5-small --set batch_size=128 --set upsert_workers=4
+    python benchmark.py --baseline benchmarks/before.json --max-regression 0.1
+
+Generates a SQLite table of `--rows` rows whose body text is about
+`--text-chars` characters, runs the full pipeline (SQLDatabaseService →
+TextProcessor → encoder → BatchProcessor) against Qdrant in local mode
+(in-memory by default, no server needed) and writes rows/s, chunks/s,
+vectors/s and the peak RSS of each stage to a JSON result file. Any job
+setting can be changed with --set, so two result files compare one
+setting or one code change.
+
+Peak RSS is sampled for this process only; encoding worker processes
+(encode_processes > 0) are not included.
+
+Exit codes: those of run_job.py, and 8 if throughput regressed against
+--baseline by more than --max-regression.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from run_job import EXIT_FAILED, EXIT_INVALID_SPEC, EXIT_OK, STAGE_EXIT_CODES
+from src.model_management.embedding_model import EmbeddingModelFactory, ModelConfig
+from src.model_management.model_registry import process_rss_bytes
+from src.services.database_service import DatabaseServiceFactory
+from src.services.embedding_pipeline import EmbeddingPipeline, PipelineError
+from src.services.pipeline_reporter import JsonLinesReporter
+from src.services.qdrant_service import QdrantServiceFactory
+from src.services.text_processor import TextProcessorFactory
+from src.utils.config_manager import AppSettings
+from src.utils.job_spec import JobSpecLoader, JobSpecError
+
+EXIT_REGRESSION = 8
+
+TABLE = "bench_docs"
+COLLECTION = "db2embed_benchmark"
+# Throughput compared against --baseline
+COMPARED_RATES = ["rows_per_s", "chunks_per_s", "vectors_per_s"]
+
+WORDS = [
+    "설비", "점검", "교체", "누유", "진동", "온도", "압력", "센서", "밸브", "펌프", "모터", "베어링",
+    "정비", "이상", "발생", "조치", "완료", "확인", "요청", "라인", "공정", "품질", "불량", "가동",
+    "pump", "valve", "sensor", "motor", "bearing", "alarm", "inspection", "replace", "leak", "line",
+]
+CATEGORIES = ["기계", "전기", "계장", "배관", "안전"]
+
+
+class RssSampler:
+    """Samples this process's RSS in a background thread"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: List[Tuple[float, int]] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            rss = process_rss_bytes()
+            if rss is not None:
+                self.samples.append((time.time(), rss))
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def peak(self, start: float = 0.0, end: float = float("inf")) -> Optional[int]:
+        """Largest sample taken between `start` and `end` (one interval of slack for short stages)"""
+        values = [rss for ts, rss in self.samples if start - self.interval <= ts <= end + self.interval]
+        return max(values) if values else None
+
+
+class BenchmarkReporter(JsonLinesReporter):
+    """JSON-lines reporter that also records when each stage ran"""
+
+    def __init__(self, stream=sys.stderr, progress_interval: float = 1.0):
+        super().__init__(stream, progress_interval)
+        self.windows: Dict[str, List[float]] = {}
+
+    def stage_started(self, stage: str, message: str = "") -> None:
+        self.windows.setdefault(stage, [time.time(), None])
+        super().stage_started(stage, message)
+
+    def stage_finished(self, stage: str, message: str = "", **info: Any) -> None:
+        # Streaming runs report fetch/text twice; the stage ends with the last report
+        now = time.time()
+        self.windows.setdefault(stage, [now, None])[1] = now
+        super().stage_finished(stage, message, **info)
+
+
+def generate_table(path: str, rows: int, text_chars: int, seed: int) -> bool:
+    """Create the synthetic table unless `path` already holds one with the same parameters"""
+    params = json.dumps({"rows": rows, "text_chars": text_chars, "seed": seed})
+    if os.path.exists(path):
+        conn = sqlite3.connect(path)
+        try:
+            if conn.execute("SELECT params FROM bench_meta").fetchone() == (params,):
+                return False
+        except sqlite3.Error:
+            pass
+        finally:
+            conn.close()
+        os.remove(path)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(f"CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY, title TEXT, body TEXT, "
+                     f"category TEXT, created_at TEXT)")
+        conn.execute("CREATE TABLE bench_meta (params TEXT)")
+        batch = []
+        for i in range(1, rows + 1):
+            body = []
+            length = 0
+            while length < text_chars:
+                word = rng.choice(WORDS)
+                body.append(word)
+                length += len(word) + 1
+            batch.append((i, f"작업지시 {i} " + " ".join(rng.sample(WORDS, 3)), " ".join(body)[:text_chars],
+                          rng.choice(CATEGORIES), f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"))
+            if len(batch) >= 10000:
+                conn.executemany(f"INSERT INTO {TABLE} VALUES (?, ?, ?, ?, ?)", batch)
+                batch = []
+        if batch:
+            conn.executemany(f"INSERT INTO {TABLE} VALUES (?, ?, ?, ?, ?)", batch)
+        conn.execute("INSERT INTO bench_meta VALUES (?)", (params,))
+        conn.commit()
+    finally:
+        conn.close()
+    return True
+
+
+def environment() -> Dict[str, Any]:
+    from importlib import metadata
+
+    versions = {}
+    for package in ["torch", "sentence-transformers", "qdrant-client", "numpy", "pandas", "SQLAlchemy"]:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "packages": versions,
+    }
+
+
+def stage_results(stats: Dict[str, Any], reporter: BenchmarkReporter, sampler: RssSampler) -> List[Dict[str, Any]]:
+    """Throughput of the concurrent stages plus elapsed time and peak RSS of every reported stage"""
+    results = []
+    for stat in stats["stages"]:
+        results.append({
+            "stage": stat["stage"],
+            "workers": stat["workers"],
+            "units": stat["units"],
+            "busy_time": round(stat["busy_time"], 3),
+            "busy_rate": round(stat["busy_rate"], 1),
+            "wall_rate": round(stat["wall_rate"], 1),
+            "avg_queue_occupancy": stat["avg_queue_occupancy"],
+        })
+    by_stage = {result["stage"]: result for result in results}
+    for stage, (started, finished) in reporter.windows.items():
+        result = by_stage.get(stage)
+        if result is None:
+            result = by_stage[stage] = {"stage": stage}
+            results.append(result)
+        finished = finished or time.time()
+        result["elapsed"] = round(finished - started, 3)
+        result["peak_rss_bytes"] = sampler.peak(started, finished)
+    return results
+
+
+def compare(result: Dict[str, Any], baseline_path: str, max_regression: float) -> Tuple[Dict[str, Any], bool]:
+    """Relative change of each rate against a previous result file; True if any dropped too far"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    changes = {}
+    regressed = False
+    for key in COMPARED_RATES:
+        before = baseline.get("throughput", {}).get(key)
+        after = result["throughput"][key]
+        if not before:
+            continue
+        change = (after - before) / before
+        changes[key] = {"baseline": before, "current": after, "change": round(change, 4)}
+        if change < -max_regression:
+            regressed = True
+    return {"baseline": baseline_path, "max_regression": max_regression, "rates": changes}, regressed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the embedding pipeline on synthetic SQLite data")
+    parser.add_argument("--rows", type=int, default=10000, help="Rows in the synthetic table")
+    parser.add_argument("--text-chars", type=int, default=400, help="Body text length in characters")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed of the synthetic data")
+    parser.add_argument("--db", default="benchmarks/bench.sqlite",
+                        help="SQLite file (reused while rows/text-chars/seed match)")
+    parser.add_argument("--model", default="paraphrase-ml", help="Model name from the models config")
+    parser.add_argument("--models-config", default="config/models_config.yaml", help="Model configuration file")
+    parser.add_argument("--location", default=":memory:",
+                        help="Local Qdrant: ':memory:' or a storage directory")
+    parser.add_argument("--host", default="",
+                        help="Use a Qdrant server instead of local mode (the benchmark collection is recreated)")
+    parser.add_argument("--port", type=int, default=6333, help="Qdrant server port")
+    parser.add_argument("--set", dest="overrides", action="append", default=[],
+                        metavar="KEY=VALUE", help="Override a job setting (repeatable)")
+    parser.add_argument("--output", default="",
+                        help="Result file (default: benchmarks/<time>_<model>_<rows>.json)")
+    parser.add_argument("--baseline", default="", help="Previous result file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.1,
+                        help="Allowed relative throughput drop against --baseline")
+    parser.add_argument("--progress-interval", type=float, default=1.0,
+                        help="Minimum seconds between progress lines per stage")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # Progress goes to stderr, the result to stdout and the result file
+    reporter = BenchmarkReporter(progress_interval=args.progress_interval)
+
+    job = AppSettings.DEFAULT_SETTINGS.copy()
+    job.update({
+        'db_uri': f"sqlite:///{os.path.abspath(args.db)}",
+        'sql': f"SELECT id, title, body, category, created_at FROM {TABLE} ORDER BY id",
+        'pk_col': 'id',
+        'template_str': '{{title}} - {{body}}',
+        'model': args.model,
+        'collection': COLLECTION,
+        'max_rows': 0,
+        'incremental': False,
+        # Cached vectors would measure the cache, not the encoder
+        'embedding_cache': False,
+        'artifact_dir': '',
+        'job_log_dir': '',
+    })
+    try:
+        JobSpecLoader.apply_overrides(job, args.overrides)
+        JobSpecLoader.validate(job)
+    except JobSpecError as e:
+        reporter.emit("result", status="error", stage="spec", error=str(e))
+        return EXIT_INVALID_SPEC
+
+    reporter.emit("stage_started", stage="generate")
+    generate_start = time.time()
+    generated = generate_table(args.db, args.rows, args.text_chars, args.seed)
+    reporter.emit("stage_finished", stage="generate", rows=args.rows, generated=generated,
+                  elapsed=round(time.time() - generate_start, 3))
+
+    if args.host:
+        qdrant_service = QdrantServiceFactory.create_service(args.host, args.port)
+    else:
+        qdrant_service = QdrantServiceFactory.create_service("", 0, location=args.location)
+    try:
+        qdrant_service.delete_collection(COLLECTION)
+    except Exception:
+        pass
+
+    sampler = RssSampler()
+    sampler.start()
+    try:
+        pipeline = EmbeddingPipeline(
+            database_service=DatabaseServiceFactory.create_service(job['db_uri'], job['db_arraysize']),
+            text_processor=TextProcessorFactory.create_processor(),
+            model_factory=EmbeddingModelFactory(ModelConfig(args.models_config)),
+            qdrant_service=qdrant_service,
+            reporter=reporter
+        )
+        stats = pipeline.run(job)
+    except PipelineError as e:
+        reporter.emit("result", status="error", stage=e.stage, error=str(e))
+        return STAGE_EXIT_CODES.get(e.stage, EXIT_FAILED)
+    except Exception as e:
+        reporter.emit("result", status="error", stage="unknown", error=str(e))
+        return EXIT_FAILED
+    finally:
+        sampler.stop()
+
+    # Model loading is excluded from the pipeline rates (the registry keeps models between jobs)
+    started, finished = reporter.windows["embed"][0], reporter.windows["upsert"][1]
+    pipeline_time = max(finished - started, 1e-9)
+    total_time = stats["total_time"]
+    result = {
+        "benchmark": {"rows": args.rows, "text_chars": args.text_chars, "seed": args.seed, "model": args.model,
+                      "qdrant": f"{args.host}:{args.port}" if args.host else args.location},
+        "job": {key: job[key] for key in AppSettings.DEFAULT_SETTINGS if key not in ('db_uri', 'sql')},
+        "environment": environment(),
+        "throughput": {
+            "rows_per_s": round(stats["rows"] / total_time, 1),
+            "chunks_per_s": round(stats["chunks"] / total_time, 1),
+            "vectors_per_s": round(stats["vectors"] / total_time, 1),
+            "pipeline_vectors_per_s": round(stats["vectors"] / pipeline_time, 1),
+        },
+        "total_time": round(total_time, 3),
+        "pipeline_time": round(pipeline_time, 3),
+        "peak_rss_bytes": sampler.peak(),
+        # Lifetime peak of the process (includes data generation)
+        "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "stages": stage_results(stats, reporter, sampler),
+        "stats": {key: value for key, value in stats.items() if key != "stages"},
+    }
+
+    exit_code = EXIT_OK
+    if args.baseline:
+        result["comparison"], regressed = compare(result, args.baseline, args.max_regression)
+        if regressed:
+            exit_code = EXIT_REGRESSION
+
+    output = args.output or os.path.join(
+        "benchmarks", f"{time.strftime('%Y%m%d_%H%M%S')}_{args.model}_{args.rows}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2, default=str)
+
+    print(json.dumps({"output": output, "throughput": result["throughput"],
+                      "peak_rss_bytes": result["peak_rss_bytes"],
+                      "comparison": result.get("comparison")}, ensure_ascii=False))
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Load an embedding artifact into Qdrant without re-encoding
+
+Usage:
+    python load_artifact.py artifacts/emswo_2024 --host qdrant-staging --collection emswo
+    python load_artifact.py artifacts/emswo_2024 --host qdrant-prod --set bulk_load=true
+
+The artifact is written by a job with `artifact_dir` (and `artifact_only`
+to skip Qdrant). Progress and the final result are written to stdout as
+JSON lines; exit codes are the same as run_job.py.
+"""
+import argparse
+import sys
+
+from run_job import EXIT_FAILED, EXIT_INVALID_SPEC, EXIT_OK, STAGE_EXIT_CODES
+from src.services.artifact_importer import ArtifactImporter
+from src.services.collection_profiles import CollectionProfileLoader
+from src.services.embedding_pipeline import PipelineError
+from src.services.pipeline_reporter import JsonLinesReporter
+from src.services.qdrant_service import QdrantServiceFactory
+from src.utils.config_manager import AppSettings
+from src.utils.job_spec import JobSpecLoader, JobSpecError
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Upsert an embedding artifact into a Qdrant collection")
+    parser.add_argument("artifact", help="Artifact directory (contains artifact.json)")
+    parser.add_argument("--host", default="localhost", help="Qdrant host")
+    parser.add_argument("--port", type=int, default=6333, help="Qdrant port")
+    parser.add_argument("--collection", default="",
+                        help="Target collection (default: the collection the artifact was made for)")
+    parser.add_argument("--profile", default="",
+                        help="Collection profile for a new collection (default: the artifact's)")
+    parser.add_argument("--set", dest="overrides", action="append", default=[],
+                        metavar="KEY=VALUE", help="Override an upsert setting, e.g. bulk_load=true (repeatable)")
+    parser.add_argument("--profiles-config", default=CollectionProfileLoader.DEFAULT_PATH,
+                        help="Collection profile configuration file")
+    parser.add_argument("--progress-interval", type=float, default=1.0,
+                        help="Minimum seconds between progress lines per stage")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    reporter = JsonLinesReporter(progress_interval=args.progress_interval)
+
+    job = AppSettings.DEFAULT_SETTINGS.copy()
+    job.update({'collection': args.collection, 'collection_profile': args.profile, 'filter_fields': '',
+                'profiles_config': args.profiles_config})
+    try:
+        JobSpecLoader.apply_overrides(job, args.overrides)
+    except JobSpecError as e:
+        reporter.emit("result", status="error", stage="spec", error=str(e))
+        return EXIT_INVALID_SPEC
+
+    try:
+        importer = ArtifactImporter(QdrantServiceFactory.create_service(args.host, args.port), reporter)
+        stats = importer.run(args.artifact, job)
+    except PipelineError as e:
+        reporter.emit("result", status="error", stage=e.stage, error=str(e))
+        return STAGE_EXIT_CODES.get(e.stage, EXIT_FAILED)
+    except Exception as e:
+        reporter.emit("result", status="error", stage="unknown", error=str(e))
+        return EXIT_FAILED
+
+    reporter.emit("result", status="ok", **stats)
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
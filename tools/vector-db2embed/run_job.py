@@ -0,0 +1,97 @@
+"""Headless job runner for the DB → text → embedding → Qdrant pipeline
+
+Usage:
+    python run_job.py config/job_example.yaml
+    python run_job.py job.yaml --set collection=equipment_v2 --set max_rows=0
+
+Progress and the final result are written to stdout as JSON lines.
+
+Exit codes:
+    0 success, 1 unexpected error, 2 invalid job spec, 3 database error,
+    4 model error, 5 Qdrant error, 6 no text produced, 7 artifact error
+"""
+import argparse
+import sys
+
+from src.model_management.embedding_model import EmbeddingModelFactory, ModelConfig
+from src.services.collection_profiles import CollectionProfileLoader
+from src.services.database_service import DatabaseServiceFactory
+from src.services.qdrant_service import QdrantServiceFactory
+from src.services.text_processor import TextProcessorFactory
+from src.services.embedding_pipeline import EmbeddingPipeline, PipelineError
+from src.services.pipeline_reporter import JsonLinesReporter
+from src.utils.job_spec import JobSpecLoader, JobSpecError
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_INVALID_SPEC = 2
+EXIT_DATABASE = 3
+EXIT_MODEL = 4
+EXIT_QDRANT = 5
+EXIT_NO_DATA = 6
+EXIT_ARTIFACT = 7
+
+STAGE_EXIT_CODES = {
+    "fetch": EXIT_DATABASE,
+    "text": EXIT_NO_DATA,
+    "model": EXIT_MODEL,
+    "tune": EXIT_MODEL,
+    "embed": EXIT_MODEL,
+    "collection": EXIT_QDRANT,
+    "diff": EXIT_QDRANT,
+    "upsert": EXIT_QDRANT,
+    "cleanup": EXIT_QDRANT,
+    "defer_index": EXIT_QDRANT,
+    "index": EXIT_QDRANT,
+    "artifact": EXIT_ARTIFACT,
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a DB → Qdrant embedding job without the UI")
+    parser.add_argument("job_spec", help="Job spec file (YAML or JSON)")
+    parser.add_argument("--set", dest="overrides", action="append", default=[],
+                        metavar="KEY=VALUE", help="Override a job spec value (repeatable)")
+    parser.add_argument("--models-config", default="config/models_config.yaml",
+                        help="Model configuration file")
+    parser.add_argument("--profiles-config", default=CollectionProfileLoader.DEFAULT_PATH,
+                        help="Collection profile configuration file")
+    parser.add_argument("--progress-interval", type=float, default=1.0,
+                        help="Minimum seconds between progress lines per stage")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    reporter = JsonLinesReporter(progress_interval=args.progress_interval)
+
+    try:
+        job = JobSpecLoader.load(args.job_spec, args.overrides)
+        job['profiles_config'] = args.profiles_config
+        CollectionProfileLoader.get(job['collection_profile'], args.profiles_config)
+    except (JobSpecError, ValueError) as e:
+        reporter.emit("result", status="error", stage="spec", error=str(e))
+        return EXIT_INVALID_SPEC
+
+    try:
+        pipeline = EmbeddingPipeline(
+            database_service=DatabaseServiceFactory.create_service(job['db_uri'], job['db_arraysize']),
+            text_processor=TextProcessorFactory.create_processor(),
+            model_factory=EmbeddingModelFactory(ModelConfig(args.models_config)),
+            qdrant_service=QdrantServiceFactory.create_service(job['q_host'], job['q_port']),
+            reporter=reporter
+        )
+        stats = pipeline.run(job)
+    except PipelineError as e:
+        reporter.emit("result", status="error", stage=e.stage, error=str(e))
+        return STAGE_EXIT_CODES.get(e.stage, EXIT_FAILED)
+    except Exception as e:
+        reporter.emit("result", status="error", stage="unknown", error=str(e))
+        return EXIT_FAILED
+
+    reporter.emit("result", status="ok", **stats)
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
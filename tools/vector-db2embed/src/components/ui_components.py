@@ -2,10 +2,14 @@
 import streamlit as st
 import pandas as pd
 import time
+import numpy as np
 from typing import List, Dict, Any, Optional, Callable, Tuple
 
 from src.model_management.embedding_model import EmbeddingModelFactory, ModelConfig
+from src.model_management.model_registry import model_registry, process_rss_bytes
+from src.services.collection_profiles import CollectionProfileLoader
 from src.services.qdrant_service import QdrantService
+from src.services.embedding_pipeline import PipelineReporter
 from src.utils.config_manager import AppSettings
 
 
@@ -59,6 +63,39 @@ class TextProcessingConfigComponent:
             key="template_str"
         )
 
+        chunk_modes = {'chars': '문자 수', 'tokens': '토큰 수 (모델 토크나이저)'}
+        st.selectbox(
+            "청킹 기준",
+            options=list(chunk_modes.keys()),
+            format_func=lambda mode: chunk_modes[mode],
+            index=list(chunk_modes.keys()).index(settings.get('chunk_mode', 'chars')),
+            help="토큰 수: 선택한 모델의 토크나이저로 길이를 재서 모델 최대 입력 길이에 맞게 청킹",
+            key="chunk_mode"
+        )
+
+        if st.session_state.get('chunk_mode', 'chars') == 'tokens':
+            col1, col2 = st.columns(2)
+            with col1:
+                st.number_input(
+                    "청크 최대 토큰 수",
+                    min_value=0,
+                    max_value=8192,
+                    value=settings.get('max_tokens', 0),
+                    step=64,
+                    help="0 = 모델 최대 입력 길이 (특수 토큰과 passage 접두어 포함)",
+                    key="max_tokens"
+                )
+            with col2:
+                st.number_input(
+                    "청크 겹침 토큰 수",
+                    min_value=0,
+                    max_value=512,
+                    value=settings.get('chunk_overlap', 32),
+                    step=8,
+                    help="이웃 청크가 공유하는 앞 청크 끝 문장의 최대 토큰 수",
+                    key="chunk_overlap"
+                )
+
         col1, col2 = st.columns(2)
         with col1:
             max_chars = st.number_input(
@@ -120,6 +157,40 @@ class EmbeddingModelComponent:
         return selected_model, dimension or 768
 
 
+class ModelRegistryComponent:
+    """Models kept loaded in this process (shared by all sessions)"""
+
+    @staticmethod
+    def render():
+        """Render loaded models with load time and memory"""
+        entries = model_registry.entries()
+        with st.expander(f"🧠 로드된 모델 ({len(entries)})"):
+            rss = process_rss_bytes()
+            if rss:
+                st.caption(f"프로세스 메모리(RSS): {rss / 1024 ** 2:,.0f} MB")
+            if not entries:
+                st.caption("로드된 모델이 없습니다. 첫 실행 시 로딩되고 이후 실행에서 재사용됩니다.")
+                return
+
+            st.dataframe(pd.DataFrame([
+                {
+                    "모델": e["name"],
+                    "로딩 시간(초)": round(e["load_time"], 1),
+                    "파라미터 메모리(MB)": round(e["memory_bytes"] / 1024 ** 2),
+                    "사용 횟수": e["uses"],
+                    "마지막 사용": time.strftime("%H:%M:%S", time.localtime(e["last_used"])),
+                }
+                for e in reversed(entries)
+            ]), hide_index=True)
+
+            keys = {e["key"]: e["name"] for e in entries}
+            key = st.selectbox("언로드할 모델", list(keys.keys()), format_func=lambda k: keys[k],
+                               key="unload_model")
+            if st.button("언로드", key="unload_model_btn"):
+                model_registry.unload(key)
+                st.rerun()
+
+
 class QdrantConfigComponent:
     """Qdrant configuration UI component"""
 
@@ -152,6 +223,24 @@ class QdrantConfigComponent:
             key="collection"
         )
 
+        profiles = CollectionProfileLoader.load()
+        current_profile = settings.get('collection_profile', 'default')
+        profile_names = list(profiles.keys())
+        st.selectbox(
+            "컬렉션 프로필",
+            profile_names,
+            index=profile_names.index(current_profile) if current_profile in profile_names else 0,
+            format_func=lambda name: f"{name} ({profiles[name].description})",
+            help="새 컬렉션을 만들 때만 적용 (양자화, 디스크 저장, HNSW, 샤드). config/collection_profiles.yaml",
+            key="collection_profile"
+        )
+        st.text_input(
+            "필터 필드",
+            value=settings.get('filter_fields', ''),
+            help="페이로드에 복사하고 인덱스를 만들 원본 컬럼 (쉼표 구분, 예: category, price:float, created:datetime)",
+            key="filter_fields"
+        )
+
         return (st.session_state.get('q_host', 'localhost'),
                 st.session_state.get('q_port', 6333),
                 st.session_state.get('collection', 'my_collection'))
@@ -200,6 +289,247 @@ class ProcessingOptionsComponent:
                 key="batch_size"
             )
 
+        col1, col2 = st.columns(2)
+        with col1:
+            st.checkbox(
+                "스트리밍 추출",
+                value=settings.get('streaming', False),
+                help="서버 측 커서로 청크 단위 조회/처리 (대용량 테이블의 메모리 사용량 제한)",
+                key="streaming"
+            )
+
+        with col2:
+            st.number_input(
+                "청크 행 수",
+                min_value=100,
+                max_value=1000000,
+                value=settings.get('fetch_size', 10000),
+                step=1000,
+                help="스트리밍 시 한 번에 가져와 처리할 행 수",
+                key="fetch_size"
+            )
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.text_input(
+                "파티션 컬럼",
+                value=settings.get('partition_column', ''),
+                placeholder="예: WO_NO, CREATED_AT",
+                help="숫자/날짜 컬럼의 값 범위를 나눠 여러 연결로 동시에 조회, 비우면 단일 쿼리",
+                key="partition_column"
+            )
+        with col2:
+            st.number_input(
+                "추출 병렬도",
+                min_value=1,
+                max_value=32,
+                value=settings.get('partition_parallelism', 4),
+                help="동시에 사용할 DB 연결 수 (DB 서버 부하 고려)",
+                key="partition_parallelism"
+            )
+
+        st.checkbox(
+            "배치 크기 자동 조정",
+            value=settings.get('auto_tune', False),
+            help="첫 청크의 텍스트로 인코딩 배치 크기를 측정해 고르고, 업서트 배치는 Qdrant 응답 시간에 맞춰 조절 "
+                 "(메모리 부족 시 인코딩 배치를 절반으로 줄여 재시도)",
+            key="auto_tune"
+        )
+        saved = settings.get('tuned_batch_sizes', {}).get(st.session_state.get('model', settings.get('model')))
+        if saved:
+            st.caption(f"저장된 값: 인코딩 배치 {saved.get('encode_batch_size')}, "
+                       f"업서트 배치 {saved.get('upsert_batch_size')} ({saved.get('tuned_at', '')})")
+
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            st.checkbox(
+                "임베딩 캐시",
+                value=settings.get('embedding_cache', False),
+                help="같은 모델 버전으로 인코딩한 적 있는 텍스트는 디스크 캐시에서 재사용 (디스크를 최대 캐시 용량까지 사용)",
+                key="embedding_cache"
+            )
+        with col2:
+            st.text_input(
+                "캐시 경로",
+                value=settings.get('embedding_cache_dir', 'cache/embeddings'),
+                key="embedding_cache_dir"
+            )
+        with col3:
+            st.number_input(
+                "캐시 용량 (GB)",
+                min_value=0.0,
+                max_value=1000.0,
+                value=float(settings.get('embedding_cache_gb', 10)),
+                step=1.0,
+                help="초과 시 가장 오래 사용하지 않은 샤드부터 삭제, 0 = 제한 없음",
+                key="embedding_cache_gb"
+            )
+
+        st.checkbox(
+            "대량 적재 모드",
+            value=settings.get('bulk_load', False),
+            help="적재 중에는 HNSW 인덱싱을 보류하고 끝난 뒤 한 번에 구축 (전체 재구축/대용량 적재용)",
+            key="bulk_load"
+        )
+
+        st.checkbox(
+            "증분 재처리",
+            value=settings.get('incremental', False),
+            help="기존 컬렉션에서 내용이 바뀐 청크만 다시 임베딩하고, 원본에서 사라진 청크는 삭제",
+            key="incremental"
+        )
+
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.text_input(
+                "아티팩트 저장 경로",
+                value=settings.get('artifact_dir', ''),
+                placeholder="예: artifacts/emswo_2024",
+                help="벡터, 페이로드, 모델 정보를 Parquet 아티팩트로 저장 (load_artifact.py로 다른 Qdrant에 재인코딩 없이 적재), 비우면 저장 안 함",
+                key="artifact_dir"
+            )
+        with col2:
+            st.checkbox(
+                "아티팩트만 저장",
+                value=settings.get('artifact_only', False),
+                help="Qdrant에 업서트하지 않고 아티팩트만 생성",
+                key="artifact_only"
+            )
+
+        with st.expander("동시 처리 단계"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.number_input(
+                    "렌더링 작업자",
+                    min_value=1,
+                    max_value=16,
+                    value=settings.get('render_workers', 1),
+                    help="템플릿 렌더링/청킹 스레드 수",
+                    key="render_workers"
+                )
+                st.number_input(
+                    "렌더링 프로세스",
+                    min_value=1,
+                    max_value=32,
+                    value=settings.get('render_processes', 1),
+                    help="큰 청크(2만 행 이상)를 나눠 렌더링할 프로세스 수 (Jinja 필터 등 복잡한 템플릿용)",
+                    key="render_processes"
+                )
+            with col2:
+                st.number_input(
+                    "업서트 작업자",
+                    min_value=1,
+                    max_value=16,
+                    value=settings.get('upsert_workers', 2),
+                    help="동시에 Qdrant로 업서트하는 스레드 수",
+                    key="upsert_workers"
+                )
+            with col3:
+                st.number_input(
+                    "단계 간 큐 크기",
+                    min_value=1,
+                    max_value=64,
+                    value=settings.get('queue_size', 4),
+                    help="단계 사이에 대기할 수 있는 배치 수 (메모리 상한)",
+                    key="queue_size"
+                )
+
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.number_input(
+                    "인코딩 프로세스",
+                    min_value=0,
+                    max_value=64,
+                    value=settings.get('encode_processes', 0),
+                    help="CPU 인코딩 작업자 프로세스 수 (각자 모델 사본 로딩), 0 = 현재 프로세스에서 인코딩",
+                    key="encode_processes"
+                )
+            with col2:
+                st.number_input(
+                    "작업자당 스레드",
+                    min_value=1,
+                    max_value=32,
+                    value=settings.get('encode_threads', 1),
+                    help="인코딩 프로세스 하나의 torch 스레드 수 (프로세스 수 × 스레드 수 ≤ 코어 수 권장)",
+                    key="encode_threads"
+                )
+            with col3:
+                st.checkbox(
+                    "코어 고정",
+                    value=settings.get('encode_pin', True),
+                    help="각 인코딩 프로세스를 서로 다른 CPU 코어에 고정 (Linux)",
+                    key="encode_pin"
+                )
+
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.checkbox(
+                    "비동기 업서트",
+                    value=settings.get('upsert_async', True),
+                    help="Qdrant 적용 완료를 기다리지 않고 전송 (작업 끝에 한 번 확인)",
+                    key="upsert_async"
+                )
+            with col2:
+                st.number_input(
+                    "요청 크기 상한 (MB)",
+                    min_value=0,
+                    max_value=256,
+                    value=settings.get('upsert_max_mb', 16),
+                    help="업서트 요청 하나의 예상 크기 상한, 0 = 건수로만 분할",
+                    key="upsert_max_mb"
+                )
+            with col3:
+                st.number_input(
+                    "업서트 재시도",
+                    min_value=0,
+                    max_value=10,
+                    value=settings.get('upsert_retries', 3),
+                    help="실패 시 지수 백오프 재시도 횟수, 이후 배치를 반으로 나눠 재전송",
+                    key="upsert_retries"
+                )
+
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                dtypes = ['float32', 'float16']
+                st.selectbox(
+                    "임베딩 버퍼 형식",
+                    dtypes,
+                    index=dtypes.index(settings.get('embedding_dtype', 'float32')),
+                    help="float16: 임베딩 버퍼 메모리 절반 (정밀도 약간 감소)",
+                    key="embedding_dtype"
+                )
+            with col2:
+                buffer_modes = {'ram': "메모리", 'memmap': "디스크 (memmap)"}
+                st.selectbox(
+                    "임베딩 버퍼 위치",
+                    options=list(buffer_modes.keys()),
+                    format_func=lambda mode: buffer_modes[mode],
+                    index=list(buffer_modes.keys()).index(settings.get('embedding_buffer', 'ram')),
+                    help="작업 시작 시 한 번 할당하는 임베딩 버퍼를 메모리 또는 디스크 파일에 둠 (메모리가 부족한 대용량 작업)",
+                    key="embedding_buffer"
+                )
+            with col3:
+                st.text_input(
+                    "버퍼 디렉터리",
+                    value=settings.get('embedding_buffer_dir', 'cache/buffers'),
+                    key="embedding_buffer_dir"
+                )
+
+        with st.expander("작업 로그 / 모니터링"):
+            st.text_input(
+                "작업 로그 디렉터리",
+                value=settings.get('job_log_dir', 'logs/jobs'),
+                help="작업마다 단계별 시간, 건수, 처리량, 병목 단계를 JSON Lines 파일로 기록, 비우면 기록 안 함",
+                key="job_log_dir"
+            )
+            st.text_input(
+                "Pushgateway URL",
+                value=settings.get('pushgateway_url', ''),
+                placeholder="예: http://pushgateway:9091",
+                help="작업 종료 시 Prometheus 메트릭 전송, 비우면 전송 안 함",
+                key="pushgateway_url"
+            )
+
         return (st.session_state.get('preview_rows', 50),
                 st.session_state.get('max_rows', 0),
                 st.session_state.get('batch_size', 64))
@@ -210,20 +540,49 @@ class CollectionInfoComponent:
 
     @staticmethod
     def render(qdrant_service: QdrantService, collection_name: str):
-        """Render collection information"""
+        """Render collection information (cached stats, never blocks for long)"""
         try:
-            if qdrant_service.test_connection():
-                collection_info = qdrant_service.get_collection_info(collection_name)
-                if collection_info:
-                    st.info(
-                        f"📊 **{collection_name}**: "
-                        f"{collection_info['vector_size']}차원, "
-                        f"{collection_info['count']}개 벡터"
-                    )
+            collection_info = qdrant_service.get_collection_info(collection_name)
+            if collection_info:
+                st.info(
+                    f"📊 **{collection_name}**: "
+                    f"{collection_info['vector_size']}차원, "
+                    f"약 {collection_info['count']:,}개 벡터"
+                )
         except Exception:
             pass  # Silently ignore connection failures
 
 
+class TokenStatsComponent:
+    """Token length distribution of chunks (preview)"""
+
+    @staticmethod
+    def render(lengths: List[int], max_tokens: int):
+        """Render percentiles, over-limit count and a histogram"""
+        if not lengths:
+            return
+        values = np.asarray(lengths)
+        over = int((values > max_tokens).sum())
+
+        st.markdown(f"**청크 토큰 길이 분포** ({len(values)}개 청크, 모델 한도 {max_tokens} 토큰)")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("중앙값", int(np.percentile(values, 50)))
+        with col2:
+            st.metric("p95", int(np.percentile(values, 95)))
+        with col3:
+            st.metric("최대", int(values.max()))
+        with col4:
+            st.metric("한도 초과 (잘림)", over)
+
+        counts, edges = np.histogram(values, bins=min(20, max(1, len(np.unique(values)))))
+        st.bar_chart(pd.DataFrame({"청크 수": counts}, index=[f"{int(edges[i])}-{int(edges[i + 1])}"
+                                                            for i in range(len(counts))]))
+        if over:
+            st.warning(f"{over}개 청크가 모델 최대 입력 길이를 넘어 임베딩 시 뒷부분이 잘립니다. "
+                       "청킹 기준을 '토큰 수'로 바꾸거나 최대 문자 수를 줄이세요.")
+
+
 class ProgressComponent:
     """Progress tracking component"""
 
@@ -328,12 +687,20 @@ class CollectionManagerComponent:
             collections = qdrant_service.get_collections()
 
             if collections:
-                st.subheader("컬렉션 정보")
+                col1, col2 = st.columns([4, 1])
+                with col1:
+                    st.subheader("컬렉션 정보")
+                with col2:
+                    if st.button("🔄 새로고침", key="refresh_collections_btn"):
+                        qdrant_service.refresh_stats()
+                        st.rerun()
 
                 # Convert to DataFrame for display
                 df_collections = pd.DataFrame(collections)
-                df_collections.columns = ["컬렉션", "벡터 차원", "거리 측정", "벡터 개수", "상태"]
+                df_collections.columns = ["컬렉션", "벡터 차원", "거리 측정", "벡터 개수 (근사)", "상태"]
                 st.dataframe(df_collections, use_container_width=True)
+                if any(coll["status"] == "pending" for coll in collections):
+                    st.caption("⏳ 일부 컬렉션 통계를 조회 중입니다. 새로고침하면 표시됩니다.")
 
                 # Collection deletion interface
                 st.subheader("컬렉션 삭제")
@@ -403,4 +770,183 @@ class SettingsComponent:
                 if settings.save():
                     st.success("설정 저장됨")
                 else:
-                    st.error("설정 저장 실패")
\ No newline at end of file
+                    st.error("설정 저장 실패")
+
+
+def format_remaining_time(remaining_time: float) -> str:
+    """Format remaining seconds for progress text"""
+    if remaining_time < 60:
+        return f"{remaining_time:.1f}초"
+    elif remaining_time < 3600:
+        minutes = int(remaining_time // 60)
+        seconds = int(remaining_time % 60)
+        return f"{minutes}분 {seconds}초"
+    hours = int(remaining_time // 3600)
+    minutes = int((remaining_time % 3600) // 60)
+    return f"{hours}시간 {minutes}분"
+
+
+class PipelineProgressComponent(PipelineReporter):
+    """Streamlit rendering of EmbeddingPipeline progress"""
+
+    PROGRESS_STAGES = {
+        "embed": ("🤖 **임베딩 생성**", "텍스트"),
+        "upsert": ("📤 **Qdrant 업서트**", "벡터"),
+    }
+    # What to try when a stage limits throughput
+    BOTTLENECK_HINTS = {
+        "fetch": "DB 쿼리(인덱스)나 스트리밍 청크 행 수를 확인하세요.",
+        "text": "렌더링 작업자나 렌더링 프로세스를 늘려 보세요.",
+        "diff": "업서트 작업자를 늘려 해시 조회를 병렬화해 보세요.",
+        "embed": "인코딩 프로세스, 배치 크기, 더 작은 모델을 검토하세요.",
+        "upsert": "업서트 작업자, 비동기 업서트, 요청 크기 상한을 조정해 보세요.",
+    }
+    # Stages that get a progress bar only when they run
+    LATE_STAGES = {
+        "index": ("🧱 **HNSW 인덱스 구축**", "벡터 인덱싱"),
+    }
+
+    def __init__(self, log, table_slot, preview_rows: int = 50):
+        self.log = log
+        self.table_slot = table_slot
+        self.preview_rows = preview_rows
+        self._bars: Dict[str, Any] = {}
+        self._status: Dict[str, Any] = {}
+        self._started: Dict[str, float] = {}
+        self._stats_slot = None
+
+    def _create_progress_bars(self):
+        columns = st.columns(len(self.PROGRESS_STAGES))
+        for column, (stage, (title, _)) in zip(columns, self.PROGRESS_STAGES.items()):
+            with column:
+                st.write(title)
+                self._bars[stage] = st.progress(0, text="대기 중...")
+                self._status[stage] = st.empty()
+        self._stats_slot = st.empty()
+
+    def stage_started(self, stage: str, message: str = "") -> None:
+        self._started[stage] = time.time()
+        if message:
+            with self.log:
+                st.info(message)
+        if stage == "embed" and not self._bars:
+            self._create_progress_bars()
+        if stage in self.LATE_STAGES and stage not in self._bars:
+            with self.log:
+                st.write(self.LATE_STAGES[stage][0])
+                self._bars[stage] = st.progress(0, text="대기 중...")
+                self._status[stage] = st.empty()
+
+    def progress(self, stage: str, done: int, total: int) -> None:
+        bar = self._bars.get(stage)
+        if bar is None:
+            return
+        unit = {**self.PROGRESS_STAGES, **self.LATE_STAGES}[stage][1]
+
+        if total <= 0:
+            # Streaming: total is unknown until the source is exhausted
+            bar.progress(0.0, text=f"{done}")
+            self._status[stage].info(f"처리중: {done} {unit}")
+            return
+
+        elapsed = time.time() - self._started.get(stage, time.time())
+        if 0 < done < total:
+            time_str = format_remaining_time(elapsed / done * (total - done))
+            progress_text = f"{done}/{total} - 남은 시간: {time_str}"
+            status_text = f"처리중: {done}/{total} {unit} (남은 시간: {time_str})"
+        else:
+            progress_text = f"{done}/{total}"
+            status_text = f"처리중: {done}/{total} {unit}"
+
+        bar.progress(min(done / total, 1.0), text=progress_text)
+        self._status[stage].info(status_text)
+
+    def stage_finished(self, stage: str, message: str = "", **info: Any) -> None:
+        if stage in self._bars:
+            self._bars[stage].progress(1.0, text="완료!")
+            self._status[stage].success(message)
+        elif message:
+            with self.log:
+                st.info(message)
+
+    def warning(self, message: str) -> None:
+        with self.log:
+            st.warning(message)
+
+    def data_fetched(self, df: pd.DataFrame) -> None:
+        self.table_slot.dataframe(df.head(self.preview_rows))
+
+    def stage_stats(self, stats: List[Dict[str, Any]]) -> None:
+        if self._stats_slot is None:
+            return
+        rows = []
+        for stat in stats:
+            occupancy = stat.get("queue_occupancy")
+            rows.append({
+                "단계": stat["stage"],
+                "작업자": stat["workers"],
+                "처리 건수": stat["units"],
+                "처리량(/s)": round(stat["wall_rate"], 1),
+                "최대 처리량(/s)": round(stat["busy_rate"], 1),
+                "가동률": f"{stat.get('utilization', 0.0) * 100:.0f}%",
+                "입력 큐": "-" if occupancy is None else f"{occupancy * 100:.0f}%",
+            })
+        self._stats_slot.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+    def render_summary(self, stats: Dict[str, Any]):
+        """Render final job summary"""
+        st.success(f"🎉 전체 작업 완료! 총 {stats['vectors']}건 처리")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("임베딩 시간", f"{stats['embedding_time']:.1f}초")
+        with col2:
+            st.metric("업서트 시간", f"{stats['upsert_time']:.1f}초")
+        with col3:
+            st.metric("전체 시간", f"{stats['total_time']:.1f}초")
+        if stats.get('artifact_dir'):
+            st.info(f"💾 아티팩트 저장: {stats['artifact_dir']} ({stats['artifact_rows']}개 벡터)")
+        if stats.get('embedding_buffer_bytes'):
+            st.caption(f"임베딩 버퍼: {stats['embedding_buffer_bytes'] / 1024 ** 2:.1f} MB (작업 시작 시 한 번 할당)")
+        if stats.get('encode_workers'):
+            st.markdown("**인코딩 작업자별 처리량**")
+            st.dataframe(pd.DataFrame([
+                {"작업자": w["worker"], "텍스트": w["texts"], "작업 시간(초)": round(w["busy_time"], 1),
+                 "처리량(개/초)": round(w["rate"], 1)}
+                for w in stats['encode_workers']
+            ]), hide_index=True)
+        tuning = stats.get('tuning')
+        if tuning:
+            latency = tuning.get('upsert_latency')
+            message = (f"🎛️ 자동 조정: 인코딩 배치 {tuning['encode_batch_size']}"
+                       f", 업서트 배치 {tuning['upsert_batch_size']}")
+            if latency is not None:
+                message += f" (요청당 {latency:.2f}초)"
+            if tuning.get('backoffs'):
+                message += f", 메모리 부족으로 {tuning['backoffs']}회 축소"
+            st.info(message + " — 다음 실행을 위해 저장했습니다.")
+        if stats.get('skipped') or stats.get('deleted'):
+            st.info(f"증분 재처리: 변경 없음 {stats['skipped']}개 건너뜀, 원본에서 사라진 청크 {stats['deleted']}개 삭제")
+        if stats.get('telemetry'):
+            self.render_telemetry(stats['telemetry'])
+
+    def render_telemetry(self, telemetry: Dict[str, Any]):
+        """Render the bottleneck stage, counters and per-stage timings of a finished job"""
+        bottleneck = telemetry.get('bottleneck')
+        if bottleneck:
+            st.info(f"🔎 병목 단계: **{bottleneck['stage']}** (작업자 가동률 {bottleneck['utilization'] * 100:.0f}%) "
+                    f"{self.BOTTLENECK_HINTS.get(bottleneck['stage'], '')}")
+        with st.expander("📈 작업 텔레메트리"):
+            counters = telemetry.get('counters', {})
+            rates = telemetry.get('rates', {})
+            st.dataframe(pd.DataFrame([
+                {"항목": name, "건수": value, "초당": rates.get(f"{name}_per_s", "-")}
+                for name, value in counters.items()
+            ]), hide_index=True)
+            st.dataframe(pd.DataFrame([
+                {"단계": stage, "시간(초)": values.get("elapsed", "-"), "처리 건수": values.get("units", "-"),
+                 "처리량(/s)": values.get("wall_rate", "-"),
+                 "가동률": "-" if values.get("utilization") is None else f"{values['utilization'] * 100:.0f}%"}
+                for stage, values in telemetry.get('stages', {}).items()
+            ]), hide_index=True)
+            if telemetry.get('log_path'):
+                st.caption(f"작업 로그: {telemetry['log_path']}")
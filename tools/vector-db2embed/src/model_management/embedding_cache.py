@@ -0,0 +1,222 @@
+"""Persistent content-addressed embedding cache
+
+Layout under the cache root:
+
+    <namespace>/meta.json              model, version, dimension
+    <namespace>/<pid>_<n>.f16          float16 vectors, one row per entry (memory-mapped for reads)
+    <namespace>/<pid>_<n>.keys         16-byte key per row, same order as the .f16 file
+
+A namespace is one (model, version, dimension). Keys hash the mode prefix
+and the text. Each process appends to its own shard files, so a UI and a CLI
+job can share the cache; shards written by other processes are picked up
+each time the cache is opened for a job (`refresh`). Eviction deletes whole shards, least recently used
+first, when the cache grows over `max_bytes`.
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+KEY_BYTES = 16
+
+
+class EmbeddingCache:
+    """Float16 embedding cache for one model namespace"""
+
+    SHARD_BYTES = 64 * 1024 * 1024
+
+    _instances: Dict[Tuple[str, str], "EmbeddingCache"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, root: str, namespace: str, meta: Dict, dimension: int, max_bytes: int):
+        self.root = root
+        self.path = os.path.join(root, namespace)
+        self.dimension = dimension
+        self.max_bytes = max_bytes
+        self.row_bytes = dimension * 2
+        self.hits = 0
+        self.misses = 0
+        self._index: Dict[bytes, Tuple[str, int]] = {}
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._shard: Optional[str] = None
+        self._shard_seq = 0
+
+        os.makedirs(self.path, exist_ok=True)
+        meta_path = os.path.join(self.path, "meta.json")
+        if not os.path.exists(meta_path):
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+        self.refresh()
+
+    @classmethod
+    def open(cls, root: str, model_id: str, version: str, dimension: int, max_bytes: int) -> "EmbeddingCache":
+        """Process-wide cache instance for a model version"""
+        namespace = hashlib.sha256(f"{model_id}\x1f{version}\x1f{dimension}".encode("utf-8")).hexdigest()[:16]
+        with cls._instances_lock:
+            cache = cls._instances.get((root, namespace))
+            if cache is None:
+                meta = {"model": model_id, "version": version, "dimension": dimension}
+                cache = cls(root, namespace, meta, dimension, max_bytes)
+                cls._instances[(root, namespace)] = cache
+                cache.evict()
+            else:
+                cache.refresh()
+            cache.max_bytes = max_bytes
+            return cache
+
+    @staticmethod
+    def make_keys(prefix: str, texts: List[str]) -> List[bytes]:
+        """Content keys: hash of mode prefix and text"""
+        return [hashlib.blake2b(f"{prefix}\x1f{text}".encode("utf-8"), digest_size=KEY_BYTES).digest()
+                for text in texts]
+
+    def refresh(self) -> int:
+        """Index rows appended to shards since the last refresh (also by other processes)
+
+        Only the new part of each keys file is read. Returns the number of
+        rows added to the index.
+        """
+        added = 0
+        for name in sorted(os.listdir(self.path)):
+            if not name.endswith(".keys"):
+                continue
+            shard = name[:-5]
+            data_path = os.path.join(self.path, shard + ".f16")
+            try:
+                data_size = os.path.getsize(data_path)
+                with open(os.path.join(self.path, name), 'rb') as f:
+                    with self._lock:
+                        known = self._rows.get(shard, 0)
+                    f.seek(known * KEY_BYTES)
+                    keys = f.read()
+            except OSError:
+                continue  # Missing data file or evicted meanwhile
+            # A crash (or a writer mid-append) can leave keys and data of different lengths; trust the shorter
+            rows = min(known + len(keys) // KEY_BYTES, data_size // self.row_bytes)
+            if rows <= known:
+                continue
+            with self._lock:
+                if self._rows.get(shard, 0) != known:
+                    continue  # Our own writer appended meanwhile
+                for row in range(known, rows):
+                    offset = (row - known) * KEY_BYTES
+                    self._index[keys[offset:offset + KEY_BYTES]] = (shard, row)
+                self._rows[shard] = rows
+            added += rows - known
+        return added
+
+    def lookup(self, keys: List[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (found mask, float32 vectors for the found keys in order)"""
+        vectors = np.empty((len(keys), self.dimension), dtype=np.float32)
+        found = self.lookup_into(keys, vectors)
+        return found, vectors[found]
+
+    def lookup_into(self, keys: List[bytes], out: np.ndarray) -> np.ndarray:
+        """Write cached vectors into the matching rows of `out`; return the found mask"""
+        with self._lock:
+            locations = [self._index.get(key) for key in keys]
+            rows = dict(self._rows)
+        found = np.zeros(len(keys), dtype=bool)
+
+        by_shard: Dict[str, List[Tuple[int, int]]] = {}
+        for position, loc in enumerate(locations):
+            if loc is not None:
+                by_shard.setdefault(loc[0], []).append((position, loc[1]))
+        for shard, pairs in by_shard.items():
+            data_path = os.path.join(self.path, shard + ".f16")
+            positions = [position for position, _ in pairs]
+            try:
+                data = np.memmap(data_path, dtype=np.float16, mode='r', shape=(rows[shard], self.dimension))
+                out[positions] = data[[row for _, row in pairs]]
+                os.utime(data_path)  # Recently used shards are evicted last
+            except (OSError, ValueError, KeyError):
+                # Shard evicted by another process meanwhile: treat as misses
+                with self._lock:
+                    self._forget(shard)
+                continue
+            found[positions] = True
+
+        hits = int(found.sum())
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    def store(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        """Append vectors (converted to float16) and evict if over the size limit"""
+        if not keys:
+            return
+        data = np.ascontiguousarray(vectors, dtype=np.float16)
+        with self._lock:
+            if self._shard is None or self._rows.get(self._shard, 0) * self.row_bytes >= self.SHARD_BYTES:
+                self._shard_seq += 1
+                self._shard = f"{os.getpid()}_{self._shard_seq:05d}"
+                while os.path.exists(os.path.join(self.path, self._shard + ".f16")):
+                    self._shard_seq += 1
+                    self._shard = f"{os.getpid()}_{self._shard_seq:05d}"
+                self._rows[self._shard] = 0
+                rotated = True
+            else:
+                rotated = False
+            shard = self._shard
+            base = self._rows[shard]
+            with open(os.path.join(self.path, shard + ".f16"), 'ab') as f:
+                f.write(data.tobytes())
+            with open(os.path.join(self.path, shard + ".keys"), 'ab') as f:
+                f.write(b"".join(keys))
+            for i, key in enumerate(keys):
+                self._index[key] = (shard, base + i)
+            self._rows[shard] = base + len(keys)
+        # Checking the size needs a directory scan, so only do it when a shard fills up
+        if rotated:
+            self.evict()
+
+    def _forget(self, shard: str) -> None:
+        self._rows.pop(shard, None)
+        self._index = {key: loc for key, loc in self._index.items() if loc[0] != shard}
+        if self._shard == shard:
+            self._shard = None
+
+    def evict(self) -> int:
+        """Delete least recently used shards (whole cache root) until under max_bytes"""
+        if not self.max_bytes:
+            return 0
+        shards = []
+        total = 0
+        for namespace in os.listdir(self.root):
+            directory = os.path.join(self.root, namespace)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if name.endswith(".f16"):
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    shards.append((stat.st_mtime, path))
+                    total += stat.st_size
+        removed = 0
+        for _, path in sorted(shards):
+            if total <= self.max_bytes:
+                break
+            size = os.path.getsize(path)
+            for suffix_path in (path, path[:-4] + ".keys"):
+                try:
+                    os.remove(suffix_path)
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+            if os.path.dirname(path) == self.path:
+                with self._lock:
+                    self._forget(os.path.basename(path)[:-4])
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = len(self._index)
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
@@ -1,5 +1,7 @@
 """Embedding model management with clean interface"""
+import hashlib
 import os
+import time
 from typing import Dict, List, Optional, Tuple
 try:
     import yaml
@@ -10,13 +12,68 @@ from sentence_transformers import SentenceTransformer
 import numpy as np
 from abc import ABC, abstractmethod
 
+from src.model_management.embedding_cache import EmbeddingCache
+from src.model_management.encode_pool import EncodePool
+from src.model_management.model_registry import model_registry
+
+# HuggingFace IDs used when a model has no local path
+HF_MODEL_MAP = {
+    'bge-m3': 'BAAI/bge-m3',
+    'mE5-small': 'intfloat/multilingual-e5-small',
+    'mE5-base': 'intfloat/multilingual-e5-base',
+    'mE5-large': 'intfloat/multilingual-e5-large',
+    'paraphrase-ml': 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
+}
+
+# Used when neither the model config nor the tokenizer gives a usable limit
+DEFAULT_MAX_TOKENS = 512
+# Texts per forward pass unless a job tunes it (sentence-transformers default)
+DEFAULT_ENCODE_BATCH_SIZE = 32
+
+
+def passage_prefix(model_name: str) -> str:
+    """Prefix added to documents before encoding (E5 models expect "passage: ")"""
+    return "passage: " if 'e5' in model_name.lower() else ""
+
+
+def resolve_model_source(model_name: str, model_path: Optional[str]) -> str:
+    """Local path if it exists, otherwise the HuggingFace model ID"""
+    if model_path and os.path.exists(model_path):
+        return model_path
+    return HF_MODEL_MAP.get(model_name, model_name)
+
+
+class EncodeContext:
+    """Per-job encoding state: embedding cache, worker pool and forward batch size
+
+    A loaded model is shared by every job and session of the process (model
+    registry), so nothing a job configures is stored on the model; encode()
+    receives it here instead. close() releases the job's use of the pool.
+    """
+
+    def __init__(self, cache: Optional[EmbeddingCache] = None, pool: Optional[EncodePool] = None,
+                 batch_size: int = DEFAULT_ENCODE_BATCH_SIZE):
+        self.cache = cache
+        self.pool = pool
+        self.batch_size = max(1, int(batch_size))
+
+    @property
+    def workers(self) -> int:
+        return self.pool.workers if self.pool is not None else 1
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.release()
+            self.pool = None
+
 
 class EmbeddingModelInterface(ABC):
     """Abstract interface for embedding models"""
 
     @abstractmethod
-    def encode(self, texts: List[str]) -> np.ndarray:
-        """Encode texts to embeddings"""
+    def encode(self, texts: List[str], out: Optional[np.ndarray] = None,
+               context: Optional[EncodeContext] = None) -> np.ndarray:
+        """Encode texts to embeddings (written into `out` when given) with a job's `context`"""
         pass
 
     @abstractmethod
@@ -29,49 +86,122 @@ class EmbeddingModelInterface(ABC):
         """Get model name"""
         pass
 
+    @abstractmethod
+    def create_context(self, cache_root: Optional[str] = None, cache_max_bytes: int = 0, workers: int = 0,
+                       threads_per_worker: int = 1, pin: bool = True) -> EncodeContext:
+        """Encoding state for one job: persistent cache under `cache_root` (None = no cache)
+        and a pool of `workers` processes (0 = in-process)"""
+        pass
+
+    @abstractmethod
+    def time_encode(self, texts: List[str], batch_size: int, context: Optional[EncodeContext] = None) -> float:
+        """Seconds to encode `texts` with forward passes of `batch_size` (bypasses the cache)"""
+        pass
+
 
 class SentenceTransformerModel(EmbeddingModelInterface):
     """Sentence transformer implementation"""
 
-    def __init__(self, model_name: str, model_path: Optional[str] = None):
+    def __init__(self, model_name: str, model_path: Optional[str] = None, dimension: Optional[int] = None):
         self.model_name = model_name
+        self._source = resolve_model_source(model_name, model_path)
         self._model = self._load_model(model_path)
-        self._dimension = self._detect_dimension()
+        self._dimension = self._detect_dimension(dimension)
 
     def _load_model(self, model_path: Optional[str]) -> SentenceTransformer:
         """Load model from local path or HuggingFace"""
-        if model_path and os.path.exists(model_path):
-            return SentenceTransformer(model_path)
-
-        # Fallback to HuggingFace
-        hf_model_map = {
-            'bge-m3': 'BAAI/bge-m3',
-            'mE5-small': 'intfloat/multilingual-e5-small',
-            'mE5-base': 'intfloat/multilingual-e5-base',
-            'mE5-large': 'intfloat/multilingual-e5-large',
-            'paraphrase-ml': 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
-        }
-        hf_model = hf_model_map.get(self.model_name, self.model_name)
-        return SentenceTransformer(hf_model)
+        return SentenceTransformer(resolve_model_source(self.model_name, model_path))
 
-    def _detect_dimension(self) -> int:
-        """Detect embedding dimension"""
+    def _detect_dimension(self, configured: Optional[int] = None) -> int:
+        """Embedding dimension from model metadata, then config; probe encode only as a last resort"""
+        dimension = self._model.get_sentence_embedding_dimension()
+        if dimension:
+            return int(dimension)
+        if configured:
+            return int(configured)
         test_embedding = self._model.encode(["test"], convert_to_numpy=True)
         return test_embedding.shape[1]
 
-    def encode(self, texts: List[str]) -> np.ndarray:
-        """Encode texts to normalized embeddings"""
+    def encode(self, texts: List[str], out: Optional[np.ndarray] = None,
+               context: Optional[EncodeContext] = None) -> np.ndarray:
+        """Encode texts to normalized embeddings
+
+        With `out` (len(texts) rows, float32 or float16, e.g. a slot of an
+        EmbeddingBuffer) the vectors are written into it instead of a new array.
+
+        With a cache in the `context`, texts encoded before (same model
+        version and prefix) are read from disk and only the rest go through
+        the model (in the context's pool, with its batch size).
+        """
+        context = context or EncodeContext()
+        if out is None:
+            out = np.empty((len(texts), self._dimension), dtype=np.float32)
         # Add E5 prefix for E5 models (for document embedding)
-        if 'e5' in self.model_name.lower():
-            texts = [f"passage: {text}" for text in texts]
+        prefix = passage_prefix(self.model_name)
+        if context.cache is None:
+            out[...] = self._encode(texts, prefix, context.pool, context.batch_size)
+            return out
+
+        keys = EmbeddingCache.make_keys(prefix, texts)
+        found = context.cache.lookup_into(keys, out)
+        if found.all():
+            return out
+
+        missing = np.flatnonzero(~found)
+        fresh = self._encode([texts[i] for i in missing], prefix, context.pool, context.batch_size)
+        context.cache.store([keys[i] for i in missing], fresh)
+        out[missing] = fresh
+        return out
 
-        embeddings = self._model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+    def _encode(self, texts: List[str], prefix: str, pool: Optional[EncodePool], batch_size: int) -> np.ndarray:
+        if prefix:
+            texts = [f"{prefix}{text}" for text in texts]
+
+        if pool is not None:
+            embeddings = pool.encode(texts, batch_size=batch_size)
+        else:
+            embeddings = self._model.encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                                            show_progress_bar=False)
         return self._l2_normalize(embeddings)
 
+    def model_version(self) -> str:
+        """Identifies the weights: file sizes/mtimes of a local model, else the hub revision"""
+        if os.path.isdir(self._source):
+            digest = hashlib.sha256()
+            for directory, _, files in sorted(os.walk(self._source)):
+                for name in sorted(files):
+                    stat = os.stat(os.path.join(directory, name))
+                    digest.update(f"{os.path.relpath(os.path.join(directory, name), self._source)}:"
+                                  f"{stat.st_size}:{int(stat.st_mtime)}\n".encode("utf-8"))
+            return digest.hexdigest()[:16]
+        try:
+            return self._model[0].auto_model.config._commit_hash or "unknown"
+        except Exception:
+            return "unknown"
+
+    def create_context(self, cache_root: Optional[str] = None, cache_max_bytes: int = 0, workers: int = 0,
+                       threads_per_worker: int = 1, pin: bool = True) -> EncodeContext:
+        """Encoding state for one job (see EmbeddingCache, EncodePool); close() it when the job ends"""
+        cache = None
+        if cache_root:
+            cache = EmbeddingCache.open(cache_root, self._source, self.model_version(), self._dimension,
+                                        cache_max_bytes)
+        pool = EncodePool.acquire(self._source, workers, threads_per_worker, pin) if workers and workers > 0 else None
+        return EncodeContext(cache, pool)
+
+    def time_encode(self, texts: List[str], batch_size: int, context: Optional[EncodeContext] = None) -> float:
+        """Seconds to encode `texts` with forward passes of `batch_size` (bypasses the cache)"""
+        pool = context.pool if context is not None else None
+        start = time.time()
+        self._encode(texts, passage_prefix(self.model_name), pool, batch_size)
+        return time.time() - start
+
     def _l2_normalize(self, vectors: np.ndarray) -> np.ndarray:
-        """L2 normalize vectors for cosine similarity"""
-        norms = np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
-        return vectors / norms
+        """L2 normalize vectors in place for cosine similarity (float32)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms += 1e-12
+        return np.divide(vectors, norms, out=vectors)
 
     def get_dimension(self) -> int:
         return self._dimension
@@ -130,17 +260,67 @@ class ModelConfig:
         model_info = self.get_model_info(model_name)
         return model_info.get('dimension') if model_info else None
 
+    def get_setting(self, key: str, default=None):
+        """Get a global setting (`settings:` section)"""
+        return (self._config.get('settings') or {}).get(key, default)
+
+    def get_max_sequence_length(self, model_name: str) -> Optional[int]:
+        """Get max input tokens (per model, falling back to the global setting)"""
+        model_info = self.get_model_info(model_name) or {}
+        value = model_info.get('max_sequence_length') or self._config.get('settings', {}).get('max_sequence_length')
+        return int(value) if value else None
+
 
 class EmbeddingModelFactory:
     """Factory for creating embedding models"""
 
+    # Tokenizers by model source, shared by all factories in the process
+    _tokenizers: Dict[str, object] = {}
+
     def __init__(self, config: ModelConfig):
         self.config = config
 
     def create_model(self, model_name: str) -> EmbeddingModelInterface:
-        """Create embedding model instance"""
+        """Create embedding model instance
+
+        Models are kept in the process-wide registry (settings cache_models,
+        max_cached_models, max_cached_model_gb), so repeated jobs and
+        Streamlit reruns reuse the loaded model.
+        """
         model_path = self.config.get_model_path(model_name)
-        return SentenceTransformerModel(model_name, model_path)
+        dimension = self.config.get_model_dimension(model_name)
+
+        def load() -> EmbeddingModelInterface:
+            return SentenceTransformerModel(model_name, model_path, dimension)
+
+        if not self.config.get_setting('cache_models', True):
+            return load()
+        return model_registry.get(
+            key=f"{model_name}|{resolve_model_source(model_name, model_path)}",
+            name=model_name,
+            loader=load,
+            max_models=int(self.config.get_setting('max_cached_models', 5) or 0),
+            max_bytes=int(float(self.config.get_setting('max_cached_model_gb', 0) or 0) * 1024 ** 3)
+        )
+
+    def create_tokenizer(self, model_name: str):
+        """Load the model's fast tokenizer only (much cheaper than loading the model)"""
+        source = resolve_model_source(model_name, self.config.get_model_path(model_name))
+        if source not in self._tokenizers:
+            from transformers import AutoTokenizer
+            self._tokenizers[source] = AutoTokenizer.from_pretrained(source, use_fast=True)
+        return self._tokenizers[source]
+
+    def get_max_tokens(self, model_name: str) -> int:
+        """Max input tokens of a model: config value, else tokenizer limit, else 512"""
+        configured = self.config.get_max_sequence_length(model_name)
+        if configured:
+            return configured
+        limit = getattr(self.create_tokenizer(model_name), 'model_max_length', None)
+        # Tokenizers without a limit report a huge sentinel value
+        if limit and limit < 100000:
+            return int(limit)
+        return DEFAULT_MAX_TOKENS
 
     def get_available_models(self) -> List[Tuple[str, str]]:
         """Get available models with descriptions"""
@@ -0,0 +1,218 @@
+"""Multi-process CPU encoding pool
+
+torch intra-op threading stops scaling well before a large CPU box is busy,
+especially for small models. The pool runs several worker processes, each
+with its own model copy, a fixed number of torch threads and (on Linux) a
+pinned set of cores. An encode call is cut into chunks of one forward batch
+that are dispatched to whichever worker is free and gathered back in the
+original order.
+"""
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+_READY = "ready"
+_STOP = None
+
+
+def _worker_main(worker_id: int, source: str, threads: int, cores: Optional[List[int]],
+                 tasks: "mp.Queue", results: "mp.Queue") -> None:
+    """Worker process: load the model once, then encode chunks until stopped"""
+    try:
+        if cores and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cores)
+        os.environ["OMP_NUM_THREADS"] = str(threads)
+        import torch
+        torch.set_num_threads(threads)
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(source, device="cpu")
+    except Exception as e:
+        results.put((_READY, worker_id, str(e)))
+        return
+    results.put((_READY, worker_id, None))
+
+    while True:
+        task = tasks.get()
+        if task is _STOP:
+            break
+        call_id, index, texts, batch_size = task
+        start = time.time()
+        try:
+            embeddings = model.encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                                      show_progress_bar=False)
+            results.put((call_id, index, worker_id, embeddings.astype(np.float32), time.time() - start, None))
+        except Exception as e:
+            results.put((call_id, index, worker_id, None, time.time() - start, str(e)))
+
+
+class EncodePoolError(Exception):
+    """Encoding worker failure"""
+    pass
+
+
+class EncodePool:
+    """Worker processes that encode chunks of texts with one model each"""
+
+    START_TIMEOUT = 600.0
+
+    _instances: Dict[Tuple[str, int, int, bool], "EncodePool"] = {}
+    # Settings most recently requested per model source
+    _latest: Dict[str, Tuple[str, int, int, bool]] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, source: str, workers: int, threads_per_worker: int = 1, pin: bool = True):
+        self.source = source
+        self.workers = max(1, int(workers))
+        self.threads_per_worker = max(1, int(threads_per_worker))
+        self.pin = pin
+        self._context = mp.get_context("spawn")  # fork is unsafe once torch threads exist
+        self._tasks = self._context.Queue()
+        self._results = self._context.Queue()
+        self._lock = threading.Lock()
+        self._call_id = 0
+        self._texts = [0] * self.workers
+        self._busy = [0.0] * self.workers
+        self._processes = []
+        self.key = (source, self.workers, self.threads_per_worker, bool(pin))
+        self.users = 0
+
+        core_sets = self._core_sets()
+        for worker_id in range(self.workers):
+            process = self._context.Process(
+                target=_worker_main,
+                args=(worker_id, source, self.threads_per_worker, core_sets[worker_id],
+                      self._tasks, self._results),
+                daemon=True,
+                name=f"encode-worker-{worker_id}"
+            )
+            process.start()
+            self._processes.append(process)
+        self._wait_ready()
+
+    @classmethod
+    def acquire(cls, source: str, workers: int, threads_per_worker: int = 1, pin: bool = True) -> "EncodePool":
+        """Process-wide pool for a model and settings; pair every call with release()
+
+        Pools are keyed by the full settings, so a job asking for other
+        settings never closes a pool another job is still encoding on.
+        Pools of the same model with superseded settings are closed once
+        no job uses them.
+        """
+        key = (source, max(1, int(workers)), max(1, int(threads_per_worker)), bool(pin))
+        with cls._instances_lock:
+            pool = cls._instances.get(key)
+            if pool is None or not pool.alive():
+                if pool is not None and not pool.users:
+                    pool.close()
+                pool = cls(source, workers, threads_per_worker, pin)
+                cls._instances[key] = pool
+            pool.users += 1
+            cls._latest[source] = key
+            for other in [p for k, p in cls._instances.items() if k[0] == source and k != key and not p.users]:
+                cls._instances.pop(other.key)
+                other.close()
+            return pool
+
+    def release(self) -> None:
+        """End one acquire(); closes the pool if it is idle and its settings were superseded"""
+        cls = type(self)
+        with cls._instances_lock:
+            self.users = max(0, self.users - 1)
+            if self.users:
+                return
+            if cls._instances.get(self.key) is self:
+                if cls._latest.get(self.source) == self.key:
+                    return
+                cls._instances.pop(self.key)
+        self.close()
+
+    def _core_sets(self) -> List[Optional[List[int]]]:
+        """Disjoint core sets of threads_per_worker cores, wrapping when cores run out"""
+        if not self.pin or not hasattr(os, "sched_getaffinity"):
+            return [None] * self.workers
+        cores = sorted(os.sched_getaffinity(0))
+        sets = []
+        for worker_id in range(self.workers):
+            start = worker_id * self.threads_per_worker
+            sets.append([cores[(start + i) % len(cores)] for i in range(self.threads_per_worker)])
+        return sets
+
+    def _wait_ready(self) -> None:
+        deadline = time.time() + self.START_TIMEOUT
+        ready = 0
+        while ready < self.workers:
+            try:
+                message = self._results.get(timeout=max(0.1, deadline - time.time()))
+            except queue.Empty:
+                self.close()
+                raise EncodePoolError("Encoding workers did not start in time")
+            _, worker_id, error = message
+            if error:
+                self.close()
+                raise EncodePoolError(f"Encoding worker {worker_id} failed to load model: {error}")
+            ready += 1
+
+    def alive(self) -> bool:
+        return bool(self._processes) and all(process.is_alive() for process in self._processes)
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Encode texts across the workers in forward passes of `batch_size`; rows come back in input order"""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        with self._lock:
+            self._call_id += 1
+            call_id = self._call_id
+            # One forward batch per chunk, so workers run exactly the batch size asked for
+            chunk = max(1, int(batch_size))
+            chunks = [texts[i:i + chunk] for i in range(0, len(texts), chunk)]
+            for index, part in enumerate(chunks):
+                self._tasks.put((call_id, index, part, batch_size))
+
+            parts: List[Optional[np.ndarray]] = [None] * len(chunks)
+            received = 0
+            while received < len(chunks):
+                try:
+                    message = self._results.get(timeout=5.0)
+                except queue.Empty:
+                    if not self.alive():
+                        raise EncodePoolError("An encoding worker exited unexpectedly")
+                    continue
+                result_call, index, worker_id, embeddings, elapsed, error = message
+                if result_call != call_id:
+                    continue  # Leftover from an aborted call
+                if error:
+                    raise EncodePoolError(f"Encoding worker {worker_id} failed: {error}")
+                parts[index] = embeddings
+                self._texts[worker_id] += len(chunks[index])
+                self._busy[worker_id] += elapsed
+                received += 1
+        return np.concatenate(parts)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Texts, busy seconds and texts/sec per worker since the pool started"""
+        return [
+            {
+                "worker": worker_id,
+                "texts": self._texts[worker_id],
+                "busy_time": self._busy[worker_id],
+                "rate": self._texts[worker_id] / self._busy[worker_id] if self._busy[worker_id] > 0 else 0.0,
+            }
+            for worker_id in range(self.workers)
+        ]
+
+    def close(self) -> None:
+        for _ in self._processes:
+            try:
+                self._tasks.put(_STOP)
+            except Exception:
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
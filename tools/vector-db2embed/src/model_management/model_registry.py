@@ -0,0 +1,130 @@
+"""Process-wide registry of loaded embedding models
+
+Streamlit re-runs the app script on every interaction and the CLI may run
+several jobs in one process; modules stay imported, so a module-level
+registry keeps loaded models across reruns and sessions. Retention is
+bounded by model count and by parameter memory, least recently used first.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+
+def model_memory_bytes(model: Any) -> int:
+    """Parameter and buffer memory of a wrapped torch model (0 if unknown)"""
+    module = getattr(model, '_model', model)
+    try:
+        total = sum(p.numel() * p.element_size() for p in module.parameters())
+        total += sum(b.numel() * b.element_size() for b in module.buffers())
+        return int(total)
+    except Exception:
+        return 0
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Current resident set size of this process (Linux), else None"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class LoadedModel:
+    """Registry entry with load statistics"""
+
+    def __init__(self, key: str, name: str, model: Any, load_time: float):
+        self.key = key
+        self.name = name
+        self.model = model
+        self.load_time = load_time
+        self.memory_bytes = model_memory_bytes(model)
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.uses = 0
+
+
+class ModelRegistry:
+    """Loads each model once per process and keeps the most recently used ones"""
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, LoadedModel]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+
+    def get(
+        self,
+        key: str,
+        name: str,
+        loader: Callable[[], Any],
+        max_models: int = 5,
+        max_bytes: int = 0
+    ) -> Any:
+        """Return the model for `key`, loading it with `loader` on first use"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return self._touch(entry)
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        # One loader per key; concurrent sessions wait for the same load
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    return self._touch(entry)
+
+            start = time.time()
+            model = loader()
+            entry = LoadedModel(key, name, model, time.time() - start)
+
+            with self._lock:
+                self._entries[key] = entry
+                self._evict(max_models, max_bytes, keep=key)
+                self._loading.pop(key, None)
+                return self._touch(entry)
+
+    def _touch(self, entry: LoadedModel) -> Any:
+        entry.last_used = time.time()
+        entry.uses += 1
+        self._entries.move_to_end(entry.key)
+        return entry.model
+
+    def _evict(self, max_models: int, max_bytes: int, keep: str) -> None:
+        """Drop least recently used models over the count or memory limit"""
+        def over_limit() -> bool:
+            if max_models and len(self._entries) > max_models:
+                return True
+            return bool(max_bytes) and sum(e.memory_bytes for e in self._entries.values()) > max_bytes
+
+        for key in list(self._entries.keys()):
+            if not over_limit():
+                break
+            if key != keep:
+                del self._entries[key]
+
+    def unload(self, key: str) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Loaded models, most recently used last"""
+        with self._lock:
+            return [
+                {
+                    "key": e.key,
+                    "name": e.name,
+                    "load_time": e.load_time,
+                    "memory_bytes": e.memory_bytes,
+                    "loaded_at": e.loaded_at,
+                    "last_used": e.last_used,
+                    "uses": e.uses,
+                }
+                for e in self._entries.values()
+            ]
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,127 @@
+"""Load an embedding artifact into a Qdrant collection without re-encoding"""
+import time
+from typing import Any, Dict, List
+
+from src.services.collection_profiles import CollectionProfileLoader, parse_field_list
+from src.services.embedding_artifact import ArtifactReader
+from src.services.embedding_pipeline import CollectionTarget, PipelineError, PipelineReporter
+from src.services.qdrant_service import QdrantService, BatchProcessor
+from src.services.staged_runner import Stage, StagedRunner, StageFailure
+
+
+class ArtifactImporter:
+    """Upserts the points of an artifact (written with `artifact_dir`) into a collection
+
+    Job keys: collection (default: the collection the artifact was made
+    for), collection_profile, profiles_config, filter_fields (default: the
+    artifact's), batch_size, upsert_workers, upsert_async, upsert_max_mb,
+    upsert_retries, queue_size, bulk_load, index_wait_timeout.
+    """
+
+    REPORT_INTERVAL = 0.5
+    READ_BATCH_ROWS = 10000
+
+    def __init__(self, qdrant_service: QdrantService, reporter: PipelineReporter = None):
+        self.qdrant_service = qdrant_service
+        self.reporter = reporter or PipelineReporter()
+
+    def run(self, path: str, job: Dict[str, Any]) -> Dict[str, Any]:
+        reporter = self.reporter
+        total_start_time = time.time()
+
+        reporter.stage_started("artifact", "📦 아티팩트 읽는 중...")
+        try:
+            reader = ArtifactReader(path)
+            manifest = reader.manifest
+            collection = job.get('collection') or manifest['collection']
+            profile = CollectionProfileLoader.get(job.get('collection_profile') or manifest.get('collection_profile'),
+                                                  job.get('profiles_config', CollectionProfileLoader.DEFAULT_PATH))
+            filter_fields = parse_field_list(job.get('filter_fields') or manifest.get('filter_fields'))
+        except Exception as e:
+            raise PipelineError("artifact", str(e)) from e
+        reporter.stage_finished("artifact", f"아티팩트: {manifest['model']} ({reader.dimension}차원, {reader.rows}개 벡터)",
+                                model=manifest['model'], dimension=reader.dimension, rows=reader.rows)
+
+        target = CollectionTarget(self.qdrant_service, reporter, collection)
+        pk_type = "integer" if str(manifest.get('pk_type', '')).startswith(('int', 'uint')) else "keyword"
+        try:
+            created = target.prepare(reader.dimension, profile, pk_type, filter_fields,
+                                     defer_indexes=bool(job.get('bulk_load')))
+            if job.get('bulk_load'):
+                target.begin_bulk_load()
+
+            reporter.stage_started("upsert", "⬆️ 아티팩트 업서트 중...")
+            batch_processor = BatchProcessor(
+                self.qdrant_service,
+                int(job.get('batch_size', 64)),
+                max_batch_bytes=int(job.get('upsert_max_mb', 16) or 0) * 1024 * 1024,
+                wait=not job.get('upsert_async', True),
+                max_retries=job.get('upsert_retries', 3)
+            )
+
+            def upsert(item):
+                documents, embeddings = item
+                processed_count, _ = batch_processor.process_batches(
+                    collection_name=collection,
+                    documents=documents,
+                    embeddings=embeddings
+                )
+                return [processed_count]
+
+            runner = StagedRunner(
+                source=reader.iter_batches(self.READ_BATCH_ROWS),
+                source_stage=Stage("read", None, measure=lambda item: len(item[0])),
+                stages=[Stage("upsert", upsert, workers=job.get('upsert_workers', 2), measure=lambda n: n)],
+                queue_size=job.get('queue_size', 4)
+            )
+            runner.start()
+            try:
+                while not runner.wait(timeout=self.REPORT_INTERVAL):
+                    self._report(runner, reader.rows)
+            finally:
+                runner.stop()
+            try:
+                runner.raise_if_failed()
+            except StageFailure as e:
+                stage = "artifact" if e.stage == "read" else e.stage
+                raise PipelineError(stage, str(e.error)) from e.error
+
+            try:
+                missing = batch_processor.barrier(collection)
+            except Exception as e:
+                raise PipelineError("upsert", str(e)) from e
+            if missing:
+                reporter.warning(f"업서트한 포인트 중 {missing}개가 컬렉션에 없습니다. 비동기 업서트 일부가 "
+                                 f"적용되지 않았을 수 있습니다 (원본의 중복 PK도 원인일 수 있음).")
+
+            by_stage = {stat["stage"]: stat for stat in self._report(runner, reader.rows)}
+            vectors = by_stage["upsert"]["units"]
+            upsert_time = by_stage["upsert"]["busy_time"]
+            reporter.stage_finished("upsert", f"✅ Qdrant 업서트 완료: {vectors}개 벡터",
+                                    vectors=vectors, elapsed=upsert_time, bytes=batch_processor.bytes_sent,
+                                    retries=batch_processor.retries, splits=batch_processor.splits)
+        except BaseException:
+            target.abort()
+            raise
+
+        index_time = target.finish(float(job.get('index_wait_timeout', 3600)))
+
+        return {
+            "collection": collection,
+            "model": manifest['model'],
+            "dimension": reader.dimension,
+            "collection_created": created,
+            "collection_profile": profile.name,
+            "vectors": vectors,
+            "upsert_time": upsert_time,
+            "index_time": index_time,
+            "upsert_retries": batch_processor.retries,
+            "total_time": time.time() - total_start_time,
+        }
+
+    def _report(self, runner: StagedRunner, total: int) -> List[Dict[str, Any]]:
+        stats = runner.stats()
+        by_stage = {stat["stage"]: stat for stat in stats}
+        self.reporter.progress("upsert", by_stage["upsert"]["units"], total)
+        self.reporter.stage_stats(stats)
+        return stats
@@ -0,0 +1,104 @@
+"""Encode batch size tuning by probing the job's own texts"""
+import time
+from typing import Any, Dict, List, Optional
+
+from src.model_management.embedding_model import EmbeddingModelInterface, EncodeContext
+
+
+def available_memory_fraction() -> Optional[float]:
+    """MemAvailable / MemTotal from /proc/meminfo (Linux), else None"""
+    try:
+        values = {}
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                key, value = line.split(':', 1)
+                values[key] = int(value.split()[0])
+        return values['MemAvailable'] / values['MemTotal']
+    except (OSError, KeyError, ValueError, ZeroDivisionError):
+        return None
+
+
+def is_memory_error(error: BaseException) -> bool:
+    """Host or GPU out-of-memory (torch raises RuntimeError subclasses; pool workers report the text)"""
+    return isinstance(error, MemoryError) or "out of memory" in str(error).lower()
+
+
+class EncodeBatchTuner:
+    """Picks the forward batch size with the best encode throughput
+
+    Candidates are tried smallest first on an evenly spaced sample of the
+    job's texts, so the probe sees the real text length distribution.
+    Probing stops when a larger batch gains less than MIN_GAIN, when it
+    runs out of memory (CUDA/host) or leaves less than
+    MIN_AVAILABLE_MEMORY of host memory free (the previous size is kept),
+    or when TIME_BUDGET is spent. With `start` (a value saved from an
+    earlier run) only start/2, start and start×2 are probed.
+
+    With an encode pool in the context every probe gives each worker two
+    forward batches of the candidate size (EncodePool cuts calls into
+    chunks of one batch), so the rate is the pool's, not one process's.
+    """
+
+    LADDER = [8, 16, 32, 64, 128, 256, 512]
+    MIN_GAIN = 0.05
+    MIN_AVAILABLE_MEMORY = 0.10
+    TIME_BUDGET = 30.0
+    # Texts per probe: at least this many, and two forward passes per worker
+    MIN_PROBE_TEXTS = 64
+
+    def __init__(self, model: EmbeddingModelInterface, context: Optional[EncodeContext] = None):
+        self.model = model
+        self.context = context
+        self.workers = context.workers if context is not None else 1
+
+    def candidates(self, start: Optional[int] = None) -> List[int]:
+        if start:
+            return sorted({max(1, int(start) // 2), int(start), int(start) * 2})
+        return list(self.LADDER)
+
+    def tune(self, texts: List[str], start: Optional[int] = None) -> Dict[str, Any]:
+        """Probe the candidates; returns batch_size, rate (texts/s), probes and the stop reason"""
+        candidates = self.candidates(start)
+        sample_size = min(len(texts), max(self.MIN_PROBE_TEXTS, candidates[-1] * self.workers * 2))
+        step = max(1, len(texts) // max(1, sample_size))
+        sample = texts[::step][:sample_size]
+
+        deadline = time.time() + self.TIME_BUDGET
+        # Warm-up: first calls pay for lazy initialization, not batch size
+        self.model.time_encode(sample[:min(len(sample), 8)], candidates[0], self.context)
+
+        best: Optional[Dict[str, Any]] = None
+        probes: List[Dict[str, Any]] = []
+        reason = "max"
+        for size in candidates:
+            if time.time() > deadline:
+                reason = "time"
+                break
+            count = min(len(sample), max(self.MIN_PROBE_TEXTS, size * self.workers * 2))
+            if best is not None and count < size:
+                reason = "sample"  # Not enough texts to fill a larger batch
+                break
+            try:
+                seconds = self.model.time_encode(sample[:count], size, self.context)
+            except Exception as e:
+                if not is_memory_error(e):
+                    raise
+                probes.append({"batch_size": size, "error": "out of memory"})
+                reason = "memory"
+                break
+            memory = available_memory_fraction()
+            probe = {"batch_size": size, "rate": round(count / max(seconds, 1e-9), 1),
+                     "available_memory": None if memory is None else round(memory, 3)}
+            probes.append(probe)
+            if probe["available_memory"] is not None and probe["available_memory"] < self.MIN_AVAILABLE_MEMORY:
+                reason = "memory"
+                break
+            if best is not None and probe["rate"] < best["rate"] * (1 + self.MIN_GAIN):
+                reason = "plateau"
+                break
+            best = probe
+
+        if best is None:
+            # Even the smallest candidate failed; fall back to half of it
+            return {"batch_size": max(1, candidates[0] // 2), "rate": None, "probes": probes, "reason": reason}
+        return {"batch_size": best["batch_size"], "rate": best["rate"], "probes": probes, "reason": reason}
@@ -0,0 +1,154 @@
+"""Collection creation profiles (quantization, storage, HNSW, sharding, payload indexes)"""
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import yaml
+    HAS_YAML = True
+except ImportError:
+    HAS_YAML = False
+
+from qdrant_client.models import (
+    VectorParams, Distance, HnswConfigDiff, PayloadSchemaType,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+    BinaryQuantization, BinaryQuantizationConfig
+)
+
+PAYLOAD_SCHEMA_TYPES = {t.value: t for t in PayloadSchemaType}
+
+
+class CollectionProfile:
+    """How a new collection is created and which payload fields are indexed
+
+    quantization: none | int8 | binary (quantized vectors kept in RAM when
+    `always_ram`, originals on disk when `on_disk`). Payload indexes are
+    created for `pk`, `source` and every entry of `payload_indexes`
+    ("field" or "field:type").
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str = "",
+        distance: str = "Cosine",
+        on_disk: bool = False,
+        quantization: str = "none",
+        always_ram: bool = True,
+        hnsw_m: Optional[int] = None,
+        hnsw_ef_construct: Optional[int] = None,
+        shards: Optional[int] = None,
+        replicas: Optional[int] = None,
+        on_disk_payload: Optional[bool] = None,
+        payload_indexes: Optional[List[str]] = None
+    ):
+        if quantization not in ("none", "int8", "binary"):
+            raise ValueError(f"Unknown quantization '{quantization}' in profile '{name}'")
+        self.name = name
+        self.description = description or name
+        self.distance = distance
+        self.on_disk = on_disk
+        self.quantization = quantization
+        self.always_ram = always_ram
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construct = hnsw_ef_construct
+        self.shards = shards
+        self.replicas = replicas
+        self.on_disk_payload = on_disk_payload
+        self.payload_indexes = list(payload_indexes or [])
+
+    @classmethod
+    def from_dict(cls, name: str, data: Dict[str, Any]) -> "CollectionProfile":
+        return cls(name=name, **(data or {}))
+
+    def create_kwargs(self, vector_size: int) -> Dict[str, Any]:
+        """Keyword arguments for QdrantClient.create_collection"""
+        kwargs: Dict[str, Any] = {
+            "vectors_config": VectorParams(size=vector_size, distance=Distance(self.distance),
+                                           on_disk=self.on_disk or None),
+        }
+        if self.hnsw_m is not None or self.hnsw_ef_construct is not None:
+            kwargs["hnsw_config"] = HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+        if self.quantization == "int8":
+            kwargs["quantization_config"] = ScalarQuantization(
+                scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=self.always_ram))
+        elif self.quantization == "binary":
+            kwargs["quantization_config"] = BinaryQuantization(
+                binary=BinaryQuantizationConfig(always_ram=self.always_ram))
+        if self.shards:
+            kwargs["shard_number"] = self.shards
+        if self.replicas:
+            kwargs["replication_factor"] = self.replicas
+        if self.on_disk_payload is not None:
+            kwargs["on_disk_payload"] = self.on_disk_payload
+        return kwargs
+
+    def index_fields(self, pk_type: str = "keyword", extra: Optional[List[str]] = None) -> List[Tuple[str, PayloadSchemaType]]:
+        """(field, schema) of every payload index: pk, source, profile and job filter fields"""
+        fields = {"pk": pk_type, "source": "keyword"}
+        for entry in self.payload_indexes + list(extra or []):
+            field, schema = parse_field_spec(entry)
+            fields[field] = schema
+        return [(field, PAYLOAD_SCHEMA_TYPES[schema]) for field, schema in fields.items()]
+
+    def summary(self) -> str:
+        parts = [self.distance]
+        if self.quantization != "none":
+            parts.append(f"{self.quantization} quantization" + (" (RAM)" if self.always_ram else ""))
+        if self.on_disk:
+            parts.append("vectors on disk")
+        if self.hnsw_m or self.hnsw_ef_construct:
+            parts.append(f"HNSW m={self.hnsw_m or '-'} ef={self.hnsw_ef_construct or '-'}")
+        if self.shards or self.replicas:
+            parts.append(f"shards={self.shards or 1} replicas={self.replicas or 1}")
+        return ", ".join(parts)
+
+
+def parse_field_spec(entry: str) -> Tuple[str, str]:
+    """'field' or 'field:type' -> (field, type); type defaults to keyword"""
+    field, _, schema = entry.strip().partition(":")
+    schema = (schema or "keyword").strip().lower()
+    if schema not in PAYLOAD_SCHEMA_TYPES:
+        raise ValueError(f"Unknown payload index type '{schema}' for '{field}'")
+    return field.strip(), schema
+
+
+def parse_field_list(value: Any) -> List[str]:
+    """Comma-separated string or list of field specs"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+class CollectionProfileLoader:
+    """Load profiles from YAML (the single source); only "default" is built in"""
+
+    DEFAULT_PATH = "config/collection_profiles.yaml"
+
+    # The profiles live in DEFAULT_PATH; this only keeps "default" usable without it
+    DEFAULT_PROFILES = {
+        'default': {
+            'description': "기본 (float32 벡터 메모리 저장)",
+        },
+    }
+
+    @staticmethod
+    def load(path: str = DEFAULT_PATH) -> Dict[str, CollectionProfile]:
+        data = None
+        try:
+            if HAS_YAML and os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = (yaml.safe_load(f) or {}).get('profiles')
+        except Exception:
+            data = None
+        data = {**CollectionProfileLoader.DEFAULT_PROFILES, **(data or {})}
+        return {name: CollectionProfile.from_dict(name, values) for name, values in data.items()}
+
+    @staticmethod
+    def get(name: Optional[str], path: str = DEFAULT_PATH) -> CollectionProfile:
+        profiles = CollectionProfileLoader.load(path)
+        name = name or 'default'
+        if name not in profiles:
+            raise ValueError(f"Unknown collection profile '{name}' (available: {', '.join(profiles)})")
+        return profiles[name]
@@ -1,9 +1,48 @@
 """Database service with clean interface"""
+import datetime
+import decimal
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from sqlalchemy import create_engine, Engine
-from typing import Optional
+from sqlalchemy import create_engine, Engine, text
+from sqlalchemy.engine import make_url
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from abc import ABC, abstractmethod
 
+# Plain (unquoted) column names only; the partition column is put into SQL text
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_$#]*$')
+
+
+def partition_ranges(low: Any, high: Any, count: int) -> List[Tuple[Any, Any]]:
+    """Split [low, high] into at most `count` consecutive ranges of equal width
+
+    Works for integers, floats, decimals, dates and datetimes. Each range is
+    half-open [start, end) except the last one, which ends at `high` inclusive.
+    """
+    count = max(1, int(count))
+    if isinstance(low, bool) or not isinstance(low, (int, float, decimal.Decimal, datetime.date)):
+        raise DatabaseConnectionError(
+            f"Partition column must be numeric or date/datetime, got {type(low).__name__}")
+    if low == high:
+        return [(low, high)]
+
+    if isinstance(low, int) and isinstance(high, int):
+        step = -(-(high - low + 1) // count)
+        bounds = list(range(low, high + 1, step))
+    elif isinstance(low, datetime.datetime):
+        step = (high - low) / count
+        bounds = [low + step * i for i in range(count)]
+    elif isinstance(low, datetime.date):
+        days = (high - low).days
+        step = max(1, -(-(days + 1) // count))
+        bounds = [low + datetime.timedelta(days=d) for d in range(0, days + 1, step)]
+    else:
+        step = (high - low) / (decimal.Decimal(count) if isinstance(low, decimal.Decimal) else count)
+        bounds = [low + step * i for i in range(count)]
+    return [(start, bounds[i + 1] if i + 1 < len(bounds) else high) for i, start in enumerate(bounds)]
+
 
 class DatabaseInterface(ABC):
     """Abstract interface for database operations"""
@@ -13,6 +52,17 @@ class DatabaseInterface(ABC):
         """Execute SQL query and return DataFrame"""
         pass
 
+    @abstractmethod
+    def iter_query(self, query: str, chunk_size: int = 10000) -> Iterator[pd.DataFrame]:
+        """Execute SQL query and yield DataFrames of at most chunk_size rows"""
+        pass
+
+    @abstractmethod
+    def iter_partitioned_query(self, query: str, column: str, parallelism: int,
+                               chunk_size: int = 10000) -> Iterator[pd.DataFrame]:
+        """Execute SQL query as concurrent range partitions of `column` and yield DataFrames"""
+        pass
+
     @abstractmethod
     def test_connection(self) -> bool:
         """Test database connection"""
@@ -22,14 +72,36 @@ class DatabaseInterface(ABC):
 class SQLDatabaseService(DatabaseInterface):
     """SQL database service implementation"""
 
-    def __init__(self, connection_uri: str):
+    # Ranges per worker in partitioned queries, so skewed ranges even out
+    PARTITIONS_PER_WORKER = 4
+    _POLL_INTERVAL = 0.1
+
+    def __init__(self, connection_uri: str, arraysize: Optional[int] = None, pool_size: Optional[int] = None):
         self.connection_uri = connection_uri
+        self.arraysize = arraysize
+        self.pool_size = pool_size
         self._engine: Optional[Engine] = None
 
-    def _get_engine(self) -> Engine:
-        """Get or create database engine"""
+    def _get_engine(self, pool_size: Optional[int] = None) -> Engine:
+        """Get or create database engine (recreated if `pool_size` connections are not available)"""
+        if pool_size and self._engine is not None and (self.pool_size or 0) < pool_size:
+            self._engine.dispose()
+            self._engine = None
+        if pool_size:
+            self.pool_size = max(self.pool_size or 0, pool_size)
         if self._engine is None:
-            self._engine = create_engine(self.connection_uri)
+            engine_kwargs: Dict[str, Any] = {}
+            # Oracle drivers fetch `arraysize` rows per round trip (driver default is 100)
+            if self.arraysize and self.connection_uri.startswith('oracle'):
+                engine_kwargs['arraysize'] = self.arraysize
+            url = make_url(self.connection_uri)
+            # In-memory SQLite uses a per-thread pool that takes no size
+            in_memory = url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+            if self.pool_size and not in_memory:
+                engine_kwargs['pool_size'] = self.pool_size
+                engine_kwargs['max_overflow'] = 0
+                engine_kwargs['pool_pre_ping'] = True
+            self._engine = create_engine(self.connection_uri, **engine_kwargs)
         return self._engine
 
     def execute_query(self, query: str) -> pd.DataFrame:
@@ -40,6 +112,99 @@ class SQLDatabaseService(DatabaseInterface):
         except Exception as e:
             raise DatabaseConnectionError(f"Query execution failed: {e}")
 
+    def iter_query(self, query: str, chunk_size: int = 10000) -> Iterator[pd.DataFrame]:
+        """Stream query results through a server-side cursor in DataFrame chunks
+
+        Peak memory is bounded by chunk_size rather than the result size.
+        Row index continues across chunks so row_index stays unique.
+        """
+        try:
+            engine = self._get_engine()
+            with engine.connect() as conn:
+                conn = conn.execution_options(stream_results=True, max_row_buffer=chunk_size)
+                offset = 0
+                for chunk in pd.read_sql(text(query), conn, chunksize=chunk_size):
+                    chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+                    offset += len(chunk)
+                    yield chunk
+        except Exception as e:
+            raise DatabaseConnectionError(f"Query execution failed: {e}")
+
+    def iter_partitioned_query(self, query: str, column: str, parallelism: int,
+                               chunk_size: int = 10000) -> Iterator[pd.DataFrame]:
+        """Read the query as range partitions of `column` over `parallelism` pooled connections
+
+        MIN/MAX of the column (numeric or date) are split into
+        parallelism × PARTITIONS_PER_WORKER ranges plus one partition for
+        NULLs; each range is a `SELECT * FROM (query) q WHERE q.column ...`
+        read by a worker thread on its own connection, streamed in
+        chunk_size DataFrames. Chunks are yielded as they arrive (row order
+        across partitions is not preserved); a bounded queue keeps fast
+        workers from running ahead of the consumer. Row index continues
+        across chunks so row_index stays unique.
+        """
+        if not _IDENTIFIER.match(column or ''):
+            raise DatabaseConnectionError(f"Invalid partition column: '{column}'")
+        parallelism = max(1, int(parallelism))
+        subquery = f"({query.strip().rstrip(';')}) q"
+        try:
+            engine = self._get_engine(pool_size=parallelism)
+            with engine.connect() as conn:
+                low, high = conn.execute(text(f"SELECT MIN(q.{column}), MAX(q.{column}) FROM {subquery}")).one()
+        except Exception as e:
+            raise DatabaseConnectionError(f"Partition bounds query failed: {e}")
+
+        partitions = [(f"q.{column} IS NULL", {})]
+        if low is not None:
+            ranges = partition_ranges(low, high, parallelism * self.PARTITIONS_PER_WORKER)
+            for i, (start, end) in enumerate(ranges):
+                upper = "<=" if i == len(ranges) - 1 else "<"
+                partitions.append((f"q.{column} >= :low AND q.{column} {upper} :high", {"low": start, "high": end}))
+
+        results: queue.Queue = queue.Queue(maxsize=parallelism * 2)
+        stop = threading.Event()
+
+        def read(predicate: str, params: Dict[str, Any]) -> None:
+            with engine.connect() as conn:
+                conn = conn.execution_options(stream_results=True, max_row_buffer=chunk_size)
+                for chunk in pd.read_sql(text(f"SELECT * FROM {subquery} WHERE {predicate}"), conn,
+                                         params=params, chunksize=chunk_size):
+                    while not stop.is_set():
+                        try:
+                            results.put(chunk, timeout=self._POLL_INTERVAL)
+                            break
+                        except queue.Full:
+                            continue
+                    if stop.is_set():
+                        return
+
+        executor = ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="db-partition")
+        pending = [executor.submit(read, predicate, params) for predicate, params in partitions]
+        offset = 0
+        try:
+            while True:
+                try:
+                    chunk = results.get(timeout=self._POLL_INTERVAL)
+                except queue.Empty:
+                    for future in pending:
+                        if future.done() and future.exception() is not None:
+                            raise future.exception()
+                    pending = [future for future in pending if not future.done()]
+                    # Finished workers have queued everything they read
+                    if not pending and results.empty():
+                        break
+                    continue
+                chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+                offset += len(chunk)
+                yield chunk
+        except DatabaseConnectionError:
+            raise
+        except Exception as e:
+            raise DatabaseConnectionError(f"Partitioned query failed: {e}")
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
     def test_connection(self) -> bool:
         """Test database connection"""
         try:
@@ -101,9 +266,10 @@ class DatabaseServiceFactory:
     """Factory for creating database services"""
 
     @staticmethod
-    def create_service(connection_uri: str) -> DatabaseInterface:
-        """Create database service from connection URI"""
+    def create_service(connection_uri: str, arraysize: Optional[int] = None,
+                       pool_size: Optional[int] = None) -> DatabaseInterface:
+        """Create database service from connection URI (`pool_size` connections for partitioned reads)"""
         if not connection_uri:
             raise ValueError("Connection URI is required")
 
-        return SQLDatabaseService(connection_uri)
\ No newline at end of file
+        return SQLDatabaseService(connection_uri, arraysize, pool_size)
\ No newline at end of file
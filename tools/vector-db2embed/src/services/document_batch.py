@@ -0,0 +1,121 @@
+"""Columnar batch of text chunks passed between pipeline stages"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class DocumentBatch:
+    """Chunks stored as parallel columns instead of one dict per chunk
+
+    Each source row is serialized to JSON once (`source_rows`); chunks refer
+    to their row through `row_offsets`, so a row split into many chunks
+    shares one string. Slicing and filtering copy only the small per-chunk
+    columns and keep referencing the same row strings. `row_fields` (filter
+    fields copied into the payload) is per row as well, parallel to
+    `source_rows`. `tokens` is the encoder token count of all chunks, known
+    only for freshly built batches with token chunking.
+    """
+
+    def __init__(
+        self,
+        texts: List[str],
+        pks: List[Any],
+        chunk_indices: np.ndarray,
+        row_indices: np.ndarray,
+        row_offsets: np.ndarray,
+        source_rows: List[str],
+        content_hashes: Optional[List[str]] = None,
+        point_ids: Optional[np.ndarray] = None,
+        row_fields: Optional[List[Dict[str, Any]]] = None,
+        tokens: Optional[int] = None
+    ):
+        self.texts = texts
+        self.pks = pks
+        self.chunk_indices = np.asarray(chunk_indices, dtype=np.int32)
+        self.row_indices = np.asarray(row_indices, dtype=np.int64)
+        self.row_offsets = np.asarray(row_offsets, dtype=np.int64)
+        self.source_rows = source_rows
+        self.content_hashes = content_hashes
+        self.point_ids = point_ids
+        self.row_fields = row_fields
+        self.tokens = tokens
+
+    @classmethod
+    def empty(cls) -> "DocumentBatch":
+        return cls([], [], np.empty(0), np.empty(0), np.empty(0), [])
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def source_row(self, i: int) -> str:
+        """Serialized source row of chunk i"""
+        return self.source_rows[self.row_offsets[i]]
+
+    def row_fields_of(self, i: int) -> Optional[Dict[str, Any]]:
+        """Payload filter fields of chunk i's source row, if any"""
+        return None if self.row_fields is None else self.row_fields[self.row_offsets[i]]
+
+    def take(self, indices: Sequence[int]) -> "DocumentBatch":
+        """New batch with the chunks at `indices` (shares source_rows)"""
+        indices = np.asarray(indices, dtype=np.int64)
+        return DocumentBatch(
+            texts=[self.texts[i] for i in indices],
+            pks=[self.pks[i] for i in indices],
+            chunk_indices=self.chunk_indices[indices],
+            row_indices=self.row_indices[indices],
+            row_offsets=self.row_offsets[indices],
+            source_rows=self.source_rows,
+            content_hashes=None if self.content_hashes is None else [self.content_hashes[i] for i in indices],
+            point_ids=None if self.point_ids is None else self.point_ids[indices],
+            row_fields=self.row_fields
+        )
+
+    def slice(self, start: int, end: int) -> "DocumentBatch":
+        """New batch with chunks [start, end) (shares source_rows)"""
+        return DocumentBatch(
+            texts=self.texts[start:end],
+            pks=self.pks[start:end],
+            chunk_indices=self.chunk_indices[start:end],
+            row_indices=self.row_indices[start:end],
+            row_offsets=self.row_offsets[start:end],
+            source_rows=self.source_rows,
+            content_hashes=None if self.content_hashes is None else self.content_hashes[start:end],
+            point_ids=None if self.point_ids is None else self.point_ids[start:end],
+            row_fields=self.row_fields
+        )
+
+    def split(self, size: int) -> List["DocumentBatch"]:
+        """Split into consecutive batches of at most `size` chunks"""
+        return [self.slice(i, i + size) for i in range(0, len(self), size)]
+
+    @staticmethod
+    def concat(batches: List["DocumentBatch"]) -> "DocumentBatch":
+        """Join batches, renumbering row offsets into one source_rows list"""
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return DocumentBatch.empty()
+        if len(batches) == 1:
+            return batches[0]
+
+        texts, pks, source_rows, offsets = [], [], [], []
+        for batch in batches:
+            texts.extend(batch.texts)
+            pks.extend(batch.pks)
+            offsets.append(batch.row_offsets + len(source_rows))
+            source_rows.extend(batch.source_rows)
+        with_hashes = all(batch.content_hashes is not None for batch in batches)
+        with_ids = all(batch.point_ids is not None for batch in batches)
+        with_fields = all(batch.row_fields is not None for batch in batches)
+        with_tokens = all(batch.tokens is not None for batch in batches)
+        return DocumentBatch(
+            texts=texts,
+            pks=pks,
+            chunk_indices=np.concatenate([batch.chunk_indices for batch in batches]),
+            row_indices=np.concatenate([batch.row_indices for batch in batches]),
+            row_offsets=np.concatenate(offsets),
+            source_rows=source_rows,
+            content_hashes=[h for batch in batches for h in batch.content_hashes] if with_hashes else None,
+            point_ids=np.concatenate([batch.point_ids for batch in batches]) if with_ids else None,
+            row_fields=[f for batch in batches for f in batch.row_fields] if with_fields else None,
+            tokens=sum(batch.tokens for batch in batches) if with_tokens else None
+        )
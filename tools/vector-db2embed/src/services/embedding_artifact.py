@@ -0,0 +1,189 @@
+"""Self-describing embedding artifacts (Arrow/Parquet)
+
+An artifact is a directory of Parquet files plus a manifest:
+
+    artifact.json          metadata (model, dimension, dtype, template, ...), files and row counts
+    part-00000.parquet     id, vector (fixed-size list), text, pk, chunk_index, row_index,
+                           source_row, content_hash, fields (filter fields as JSON)
+
+The same metadata is stored in the Parquet schema under the `db2embed` key,
+so a single part file is self-describing as well. Vectors are stored as
+fixed-size lists and read back without per-value conversion.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+from src.services.document_batch import DocumentBatch
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = "artifact.json"
+METADATA_KEY = b"db2embed"
+
+
+class ArtifactError(Exception):
+    """Embedding artifact read/write error"""
+    pass
+
+
+def _require_pyarrow() -> None:
+    if not HAS_PYARROW:
+        raise ArtifactError("pyarrow is required for embedding artifacts (pip install pyarrow)")
+
+
+class ArtifactWriter:
+    """Appends embedded batches to an artifact directory (safe to share between threads)"""
+
+    ROWS_PER_FILE = 1_000_000
+
+    def __init__(self, path: str, metadata: Dict[str, Any], dimension: int, dtype: str = "float32"):
+        _require_pyarrow()
+        if os.path.exists(os.path.join(path, MANIFEST_NAME)):
+            raise ArtifactError(f"Artifact already exists: {path}")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.dimension = dimension
+        self.metadata = {
+            "format_version": FORMAT_VERSION,
+            "dimension": dimension,
+            "dtype": dtype,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            **metadata,
+        }
+        self._value_type = pa.float16() if dtype == "float16" else pa.float32()
+        self._schema: Optional["pa.Schema"] = None
+        self._writer: Optional["pq.ParquetWriter"] = None
+        self._files: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self.rows = 0
+
+    def _build_schema(self, pk_type: "pa.DataType") -> "pa.Schema":
+        return pa.schema([
+            ("id", pa.uint64()),
+            ("vector", pa.list_(self._value_type, self.dimension)),
+            ("text", pa.string()),
+            ("pk", pk_type),
+            ("chunk_index", pa.int32()),
+            ("row_index", pa.int64()),
+            ("source_row", pa.string()),
+            ("content_hash", pa.string()),
+            ("fields", pa.string()),
+        ], metadata={METADATA_KEY: json.dumps(self.metadata, ensure_ascii=False).encode("utf-8")})
+
+    def write(self, documents: DocumentBatch, point_ids: np.ndarray, embeddings: np.ndarray) -> None:
+        """Append one batch (rows of `embeddings` match the documents)"""
+        if not len(documents):
+            return
+        vectors = np.ascontiguousarray(embeddings, dtype=self._value_type.to_pandas_dtype())
+        source_rows = [documents.source_row(i) for i in range(len(documents))]
+        fields = None
+        if documents.row_fields is not None:
+            fields = [json.dumps(documents.row_fields_of(i), ensure_ascii=False) for i in range(len(documents))]
+
+        with self._lock:
+            pk_array = pa.array(documents.pks, type=self._schema.field("pk").type if self._schema else None)
+            if self._schema is None:
+                self.metadata["pk_type"] = str(pk_array.type)
+                self._schema = self._build_schema(pk_array.type)
+            table = pa.Table.from_arrays([
+                pa.array(point_ids, type=pa.uint64()),
+                pa.FixedSizeListArray.from_arrays(pa.array(vectors.reshape(-1), type=self._value_type),
+                                                  self.dimension),
+                pa.array(documents.texts, type=pa.string()),
+                pk_array,
+                pa.array(documents.chunk_indices, type=pa.int32()),
+                pa.array(documents.row_indices, type=pa.int64()),
+                pa.array(source_rows, type=pa.string()),
+                pa.array(documents.content_hashes, type=pa.string()) if documents.content_hashes is not None
+                else pa.nulls(len(documents), pa.string()),
+                pa.array(fields, type=pa.string()) if fields is not None else pa.nulls(len(documents), pa.string()),
+            ], schema=self._schema)
+
+            if self._writer is None or self._files[-1]["rows"] >= self.ROWS_PER_FILE:
+                self._open_part()
+            self._writer.write_table(table)
+            self._files[-1]["rows"] += len(documents)
+            self.rows += len(documents)
+
+    def _open_part(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        name = f"part-{len(self._files):05d}.parquet"
+        self._writer = pq.ParquetWriter(os.path.join(self.path, name), self._schema, compression="zstd")
+        self._files.append({"name": name, "rows": 0})
+
+    def abort(self) -> None:
+        """Close the open part without a manifest (an incomplete artifact cannot be loaded)"""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def close(self) -> Dict[str, Any]:
+        """Finish the last part and write the manifest; returns the manifest"""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            manifest = {**self.metadata, "rows": self.rows, "files": self._files}
+            with open(os.path.join(self.path, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            return manifest
+
+
+class ArtifactReader:
+    """Reads an artifact back as (DocumentBatch, embeddings) batches"""
+
+    def __init__(self, path: str):
+        _require_pyarrow()
+        manifest_path = os.path.join(path, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            raise ArtifactError(f"Not an embedding artifact (missing {MANIFEST_NAME}): {path}")
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version", 0) > FORMAT_VERSION:
+            raise ArtifactError(f"Unsupported artifact format version {self.manifest['format_version']}")
+        self.path = path
+        self.dimension = int(self.manifest["dimension"])
+        self.rows = int(self.manifest.get("rows", 0))
+
+    def iter_batches(self, batch_size: int = 10000) -> Iterator[Tuple[DocumentBatch, np.ndarray]]:
+        for part in self.manifest.get("files", []):
+            parquet_file = pq.ParquetFile(os.path.join(self.path, part["name"]))
+            for record_batch in parquet_file.iter_batches(batch_size=batch_size):
+                yield self._to_documents(record_batch)
+
+    def _to_documents(self, record_batch: "pa.RecordBatch") -> Tuple[DocumentBatch, np.ndarray]:
+        def column(name: str) -> "pa.Array":
+            return record_batch.column(record_batch.schema.get_field_index(name))
+
+        rows = record_batch.num_rows
+        # flatten() honours the slice offset; values of a fixed-size list are contiguous
+        vectors = column("vector").flatten().to_numpy(zero_copy_only=False).reshape(rows, self.dimension)
+        fields = column("fields")
+        row_fields = None
+        if fields.null_count < rows:
+            row_fields = [json.loads(value) if value is not None else None for value in fields.to_pylist()]
+        documents = DocumentBatch(
+            texts=column("text").to_pylist(),
+            pks=column("pk").to_pylist(),
+            chunk_indices=column("chunk_index").to_numpy(zero_copy_only=False),
+            row_indices=column("row_index").to_numpy(zero_copy_only=False),
+            row_offsets=np.arange(rows, dtype=np.int64),  # One source row string per chunk
+            source_rows=column("source_row").to_pylist(),
+            content_hashes=column("content_hash").to_pylist(),
+            point_ids=column("id").to_numpy(zero_copy_only=False),
+            row_fields=row_fields
+        )
+        return documents, vectors
@@ -0,0 +1,84 @@
+"""Preallocated embedding buffer shared by the embed and upsert stages"""
+import os
+import tempfile
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+DTYPES = {"float32": np.float32, "float16": np.float16}
+
+
+class EmbeddingBufferClosed(Exception):
+    """The buffer was closed while waiting for a free slot"""
+    pass
+
+
+class EmbeddingBuffer:
+    """Fixed ring of embedding slots allocated once per job
+
+    The embed stage encodes each batch straight into a free slot and the
+    upsert stage releases it once the points are sent, so no per-batch
+    arrays are allocated and embedding memory is exactly
+    slots × slot_rows × dimension × itemsize. With `directory` the slots are
+    a disk-backed memmap (temporary file, removed on close) instead of RAM.
+    """
+
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, slots: int, slot_rows: int, dimension: int, dtype: str = "float32",
+                 directory: Optional[str] = None):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported embedding dtype '{dtype}' (float32 or float16)")
+        self.slots = max(1, int(slots))
+        self.slot_rows = max(1, int(slot_rows))
+        self.dimension = dimension
+        self.dtype = np.dtype(DTYPES[dtype])
+        self.path: Optional[str] = None
+        shape = (self.slots, self.slot_rows, dimension)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            fd, self.path = tempfile.mkstemp(prefix="embeddings_", suffix=".buf", dir=directory)
+            os.close(fd)
+            self._data = np.memmap(self.path, dtype=self.dtype, mode="w+", shape=shape)
+        else:
+            self._data = np.empty(shape, dtype=self.dtype)
+        self._free: List[int] = list(range(self.slots))
+        self._cond = threading.Condition()
+        self._closed = False
+
+    @property
+    def nbytes(self) -> int:
+        return self.slots * self.slot_rows * self.dimension * self.dtype.itemsize
+
+    def acquire(self, rows: int) -> Tuple[int, np.ndarray]:
+        """Wait for a free slot; return (slot, view of its first `rows` rows)"""
+        if rows > self.slot_rows:
+            raise ValueError(f"Batch of {rows} rows exceeds the slot size {self.slot_rows}")
+        with self._cond:
+            while not self._free:
+                if self._closed:
+                    raise EmbeddingBufferClosed("Embedding buffer closed")
+                self._cond.wait(self.POLL_INTERVAL)
+            if self._closed:
+                raise EmbeddingBufferClosed("Embedding buffer closed")
+            slot = self._free.pop()
+        return slot, self._data[slot, :rows]
+
+    def release(self, slot: int) -> None:
+        with self._cond:
+            self._free.append(slot)
+            self._cond.notify()
+
+    def close(self) -> None:
+        """Wake waiting stages and drop the memmap file"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self.path is not None:
+            del self._data
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
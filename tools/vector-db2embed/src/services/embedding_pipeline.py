@@ -0,0 +1,758 @@
+"""End-to-end DB → text → embedding → Qdrant pipeline shared by the UI and the CLI"""
+import json
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.model_management.embedding_model import EmbeddingModelFactory, EncodeContext, passage_prefix
+from src.services.batch_tuner import EncodeBatchTuner, is_memory_error
+from src.services.collection_profiles import (
+    CollectionProfile, CollectionProfileLoader, parse_field_list, parse_field_spec
+)
+from src.services.database_service import DatabaseInterface, QueryValidator
+from src.services.document_batch import DocumentBatch
+from src.services.embedding_artifact import ArtifactWriter
+from src.services.embedding_buffer import EmbeddingBuffer
+from src.services.job_telemetry import JobTelemetry
+from src.services.pipeline_reporter import PipelineReporter
+from src.services.qdrant_service import QdrantService, BatchProcessor, VectorProcessor
+from src.services.text_processor import TextProcessorInterface, TokenChunker
+from src.services.staged_runner import Stage, StagedRunner, StageFailure
+
+
+class PipelineError(Exception):
+    """Pipeline failure tagged with the stage that failed"""
+
+    def __init__(self, stage: str, message: str):
+        super().__init__(message)
+        self.stage = stage
+
+
+class CollectionTarget:
+    """Collection-side steps shared by pipeline runs and artifact imports
+
+    Creates the collection with a profile and its payload indexes, defers
+    HNSW indexing during bulk loads and builds the index at the end. In a
+    bulk load the payload indexes are created in finish(), after indexing
+    is restored, so no index is maintained while points arrive.
+    """
+
+    def __init__(self, qdrant_service: QdrantService, reporter: PipelineReporter, collection: str):
+        self.qdrant_service = qdrant_service
+        self.reporter = reporter
+        self.collection = collection
+        self.bulk_load = False
+        self.indexing_threshold: Optional[int] = None
+        # Payload indexes deferred by prepare(defer_indexes=True)
+        self.pending_indexes: List[Tuple[str, Any]] = []
+
+    @staticmethod
+    def pk_schema(pk: Any) -> str:
+        """Payload index type for PK values like `pk`"""
+        return "integer" if isinstance(pk, (int, np.integer)) and not isinstance(pk, bool) else "keyword"
+
+    def prepare(self, dimension: int, profile: CollectionProfile, pk_type: str, filter_fields: List[str],
+                defer_indexes: bool = False) -> bool:
+        """Ensure the collection and its payload indexes (left to finish() when `defer_indexes`);
+        True if it was created"""
+        self.reporter.stage_started("collection", "🎯 Qdrant 컬렉션 준비 중...")
+        fields = profile.index_fields(pk_type, filter_fields)
+        try:
+            created = self.qdrant_service.ensure_collection(self.collection, dimension, profile)
+            if defer_indexes:
+                self.pending_indexes = fields
+                indexes = 0
+            else:
+                indexes = self.qdrant_service.create_payload_indexes(self.collection, fields)
+        except Exception as e:
+            raise PipelineError("collection", str(e)) from e
+        if created:
+            message = f"컬렉션 생성: {self.collection} (size={dimension}, {profile.name}: {profile.summary()})"
+        else:
+            message = f"컬렉션 존재: {self.collection}"
+        if indexes:
+            message += f", 페이로드 인덱스 {indexes}개 생성"
+        elif defer_indexes:
+            message += ", 페이로드 인덱스는 적재 후 생성"
+        self.reporter.stage_finished("collection", message, collection=self.collection, created=created,
+                                     profile=profile.name, payload_indexes=indexes)
+        return created
+
+    def begin_bulk_load(self) -> None:
+        """No HNSW indexing while points arrive (see QdrantService.begin_bulk_load)"""
+        self.reporter.stage_started("defer_index")
+        try:
+            self.indexing_threshold = self.qdrant_service.begin_bulk_load(self.collection)
+        except Exception as e:
+            raise PipelineError("defer_index", str(e)) from e
+        self.bulk_load = True
+        self.reporter.stage_finished("defer_index", "⏸️ 대량 적재 모드: 적재가 끝날 때까지 HNSW 인덱싱 보류",
+                                     previous_threshold=self.indexing_threshold)
+
+    def abort(self) -> None:
+        """Never leave the collection unindexed: restore indexing (if deferred) and create the
+        deferred payload indexes; the index builds in the background"""
+        if self.bulk_load:
+            try:
+                self.qdrant_service.end_bulk_load(self.collection, self.indexing_threshold)
+            except Exception:
+                self.reporter.warning("인덱싱 설정 복원 실패: 컬렉션 인덱싱 임계값을 확인하세요.")
+        if not self.pending_indexes:
+            return
+        try:
+            self.qdrant_service.create_payload_indexes(self.collection, self.pending_indexes)
+            self.pending_indexes = []
+        except Exception:
+            self.reporter.warning("페이로드 인덱스 생성 실패: 컬렉션 페이로드 인덱스를 확인하세요.")
+
+    def finish(self, timeout: float) -> float:
+        """Restore indexing after a bulk load, create the deferred payload indexes and wait for
+        the index; returns seconds waited"""
+        if not self.bulk_load:
+            return 0.0
+        index_start = time.time()
+        try:
+            self.qdrant_service.end_bulk_load(self.collection, self.indexing_threshold)
+            self.reporter.stage_started("index", "🧱 HNSW 인덱스 구축 중...")
+            indexes = self.qdrant_service.create_payload_indexes(self.collection, self.pending_indexes)
+            self.pending_indexes = []
+            green = self.qdrant_service.wait_for_green(
+                self.collection,
+                timeout=timeout,
+                progress_callback=lambda indexed, points: self.reporter.progress("index", indexed, points)
+            )
+        except Exception as e:
+            raise PipelineError("index", str(e)) from e
+        index_time = time.time() - index_start
+        if green:
+            message = f"✅ 인덱스 구축 완료 ({index_time:.1f}초)"
+            if indexes:
+                message += f", 페이로드 인덱스 {indexes}개 생성"
+            self.reporter.stage_finished("index", message, elapsed=index_time, payload_indexes=indexes)
+        else:
+            self.reporter.warning("인덱스 구축 대기 시간을 넘었습니다. 인덱스는 백그라운드에서 계속 구축됩니다.")
+        return index_time
+
+
+class EmbeddingPipeline:
+    """Runs one ingestion job described by a settings-style dict
+
+    Job keys match AppSettings: sql, pk_col, template_str, max_chars, strip_ws,
+    model, collection, batch_size, max_rows, streaming, fetch_size, chunk_mode,
+    max_tokens, chunk_overlap, collection_profile, filter_fields.
+
+    With `streaming` enabled rows are read through a server-side cursor in
+    `fetch_size` chunks and each chunk is rendered, embedded and upserted
+    before the next one is fetched, so peak memory is bounded by the chunk size.
+
+    With `partition_column` set (numeric or date column of the query) rows
+    are read as range partitions over `partition_parallelism` pooled
+    connections at once (see SQLDatabaseService.iter_partitioned_query).
+
+    Fetch, text rendering, embedding and upsert run concurrently (StagedRunner)
+    with bounded queues in between; `render_workers`, `upsert_workers` and
+    `queue_size` tune the stages. Upserts are sent with wait=False
+    (`upsert_async`) and split by `upsert_max_mb`; a final barrier waits for
+    Qdrant to apply them before the run is reported complete.
+
+    With `incremental` enabled, chunks whose stored content hash (template,
+    model, chunk text) is unchanged are not re-embedded, and points that the
+    run did not produce are deleted afterwards.
+
+    With `bulk_load` enabled, HNSW indexing is deferred while points are
+    written and the index is built once at the end (see
+    QdrantService.begin_bulk_load).
+
+    New collections are created with the `collection_profile` (quantization,
+    on-disk vectors, HNSW, shards; see config/collection_profiles.yaml).
+    Payload indexes are created for `pk`, `source` and the `filter_fields`
+    ("column" or "column:type"), whose values are copied from the source row
+    into top-level payload keys.
+
+    Embeddings are written into a preallocated EmbeddingBuffer
+    (`embedding_dtype` float32 or float16, `embedding_buffer` ram or memmap
+    under `embedding_buffer_dir`) sized for every batch that can be in flight
+    between the embed and upsert stages.
+
+    With `artifact_dir` set, the vectors, payload and model metadata are also
+    written as an Arrow/Parquet artifact (see embedding_artifact); with
+    `artifact_only` Qdrant is not touched at all, and the artifact can be
+    loaded into any Qdrant instance later (ArtifactImporter).
+
+    Every run is wrapped in JobTelemetry: stage timers, counters (rows,
+    chunks, tokens, vectors, bytes upserted, retries), rates and the
+    bottleneck stage are returned under `telemetry` and written to a
+    JSON-lines log in `job_log_dir`; with `pushgateway_url` they are pushed
+    as Prometheus metrics as well.
+
+    With `auto_tune` enabled the model's forward batch size is probed on the
+    first texts of the job (EncodeBatchTuner) and upsert batches follow the
+    request latency (BatchProcessor adaptive mode); an out-of-memory error
+    while encoding halves the forward batch and retries. The chosen sizes are
+    returned under `tuning`, and values saved from earlier runs
+    (`tuned_batch_sizes`, per model) with the same `encode_processes`
+    narrow the probe.
+    """
+
+    REPORT_INTERVAL = 0.5
+
+    def __init__(
+        self,
+        database_service: DatabaseInterface,
+        text_processor: TextProcessorInterface,
+        model_factory: EmbeddingModelFactory,
+        qdrant_service: QdrantService,
+        reporter: PipelineReporter = None
+    ):
+        self.database_service = database_service
+        self.text_processor = text_processor
+        self.model_factory = model_factory
+        self.qdrant_service = qdrant_service
+        self.reporter = reporter or PipelineReporter()
+        self._token_chunker: Optional[TokenChunker] = None
+        self._filter_columns: List[str] = []
+        self._tokens = 0
+        self._tokens_lock = threading.Lock()
+        self._encode_context: Optional[EncodeContext] = None
+        # Warnings raised in stage worker threads, reported from the run's own thread
+        # (the Streamlit reporter can only draw from the script thread)
+        self._warnings: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+        self._run_thread: Optional[int] = None
+
+    @staticmethod
+    def create_token_chunker(model_factory: EmbeddingModelFactory, job: Dict[str, Any]) -> TokenChunker:
+        """Token chunker for the job's model (`max_tokens` 0 = the model's limit)"""
+        model_name = job['model']
+        max_tokens = int(job.get('max_tokens', 0) or 0) or model_factory.get_max_tokens(model_name)
+        return TokenChunker(
+            tokenizer=model_factory.create_tokenizer(model_name),
+            max_tokens=max_tokens,
+            overlap_tokens=int(job.get('chunk_overlap', 0) or 0),
+            prefix=passage_prefix(model_name)
+        )
+
+    def _iter_frames(self, job: Dict[str, Any]) -> Iterator[pd.DataFrame]:
+        """Yield source DataFrames, honouring max_rows"""
+        QueryValidator.validate_query(job['sql'])
+        if job.get('partition_column'):
+            frames = self.database_service.iter_partitioned_query(
+                job['sql'], job['partition_column'], int(job.get('partition_parallelism', 4) or 1),
+                int(job.get('fetch_size', 10000)))
+            if not job.get('streaming'):
+                parts = list(frames)
+                frames = iter([pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()])
+        elif job.get('streaming'):
+            frames = self.database_service.iter_query(job['sql'], int(job.get('fetch_size', 10000)))
+        else:
+            frames = iter([self.database_service.execute_query(job['sql'])])
+
+        max_rows = int(job.get('max_rows', 0) or 0)
+        fetched = 0
+        for df in frames:
+            if max_rows > 0 and fetched + len(df) > max_rows:
+                df = df.head(max_rows - fetched)
+                self._warn(f"최대 {max_rows}행만 처리합니다.")
+            fetched += len(df)
+            yield df
+            if max_rows > 0 and fetched >= max_rows:
+                break
+
+    def _warn(self, message: str) -> None:
+        """Report a warning now on the run's thread, or queue it for the progress loop"""
+        if threading.get_ident() == self._run_thread:
+            self.reporter.warning(message)
+        else:
+            self._warnings.put(message)
+
+    def _flush_warnings(self) -> None:
+        while True:
+            try:
+                message = self._warnings.get_nowait()
+            except queue.Empty:
+                return
+            self.reporter.warning(message)
+
+    def _build_documents(self, df: pd.DataFrame, job: Dict[str, Any]) -> DocumentBatch:
+        try:
+            documents = self.text_processor.build_text_documents(
+                df=df,
+                template=job['template_str'],
+                pk_column=job['pk_col'],
+                max_chars=job['max_chars'],
+                strip_whitespace=job['strip_ws'],
+                processes=job.get('render_processes', 1),
+                token_chunker=self._token_chunker
+            )
+        except Exception as e:
+            raise PipelineError("text", str(e)) from e
+        if documents.tokens is not None:
+            with self._tokens_lock:
+                self._tokens += documents.tokens
+
+        if self._filter_columns and len(documents):
+            documents.row_fields = self._row_fields(df, documents)
+            # Filter field changes must also re-upsert in incremental runs
+            row_keys = [json.dumps(fields, sort_keys=True, ensure_ascii=False) for fields in documents.row_fields]
+            documents.content_hashes = [
+                VectorProcessor.create_content_hash(job['template_str'], job['model'], text, row_keys[offset])
+                for text, offset in zip(documents.texts, documents.row_offsets.tolist())
+            ]
+        else:
+            documents.content_hashes = [
+                VectorProcessor.create_content_hash(job['template_str'], job['model'], text)
+                for text in documents.texts
+            ]
+        return documents
+
+    def _token_count(self) -> Optional[int]:
+        """Encoder tokens of the chunks built so far (token chunking only)"""
+        return self._tokens if self._token_chunker is not None else None
+
+    def _row_fields(self, df: pd.DataFrame, documents: DocumentBatch) -> List[Dict[str, Any]]:
+        """Filter field values of every source row of the batch, in source_rows order"""
+        missing = [column for column in self._filter_columns if column not in df.columns]
+        if missing:
+            raise PipelineError("text", f"필터 필드 컬럼이 없습니다: {', '.join(missing)}")
+        # Every source row has at least one chunk; its first chunk gives the row index
+        _, first = np.unique(documents.row_offsets, return_index=True)
+        records = df.loc[documents.row_indices[first], self._filter_columns].to_dict('records')
+        return [{key: VectorProcessor.payload_value(value) for key, value in record.items()}
+                for record in records]
+
+    def _artifact_metadata(self, job: Dict[str, Any], embedding_model: Any, profile: CollectionProfile,
+                           filter_fields: List[str]) -> Dict[str, Any]:
+        """What an artifact needs to be loaded and queried without the original job"""
+        model_name = job['model']
+        return {
+            "model": model_name,
+            "model_version": embedding_model.model_version() if hasattr(embedding_model, 'model_version') else None,
+            "passage_prefix": passage_prefix(model_name),
+            "normalized": True,
+            "distance": profile.distance,
+            "collection": job['collection'],
+            "collection_profile": profile.name,
+            "filter_fields": filter_fields,
+            "template": job['template_str'],
+            "pk_column": job['pk_col'],
+            "chunk_mode": job.get('chunk_mode', 'chars'),
+            "max_chars": job.get('max_chars'),
+            "max_tokens": self._token_chunker.max_tokens if self._token_chunker else None,
+        }
+
+    def _changed_documents(self, collection: str, documents: DocumentBatch,
+                           seen_ids: List[np.ndarray]) -> DocumentBatch:
+        """Drop chunks whose stored content hash matches; remember every point ID seen"""
+        point_ids = VectorProcessor.create_point_ids(documents)
+        seen_ids.append(point_ids)
+        existing = self.qdrant_service.get_payload_values(collection, point_ids.tolist(), "content_hash")
+        changed = [i for i, (point_id, content_hash) in enumerate(zip(point_ids.tolist(), documents.content_hashes))
+                   if existing.get(point_id) != content_hash]
+        return documents.take(changed)
+
+    def _delete_orphans(self, collection: str, seen_ids: List[np.ndarray]) -> int:
+        """Delete points not produced by this run (shrunk rows' extra chunks, deleted rows)"""
+        seen = np.unique(np.concatenate(seen_ids)) if seen_ids else np.empty(0, dtype=np.uint64)
+        deleted = 0
+        for point_ids in self.qdrant_service.iter_point_ids(collection):
+            # Only integer IDs can come from this tool; leave any other points alone
+            candidates = [pid for pid in point_ids if isinstance(pid, int)]
+            if not candidates:
+                continue
+            ids = np.asarray(candidates, dtype=np.uint64)
+            pos = np.minimum(np.searchsorted(seen, ids), max(len(seen) - 1, 0))
+            known = (seen[pos] == ids) if len(seen) else np.zeros(len(ids), dtype=bool)
+            orphans = [candidates[i] for i in np.flatnonzero(~known)]
+            if orphans:
+                self.qdrant_service.delete_points(collection, orphans)
+                deleted += len(orphans)
+        return deleted
+
+    def run(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the job and return final statistics (with the telemetry summary)"""
+        reporter = self.reporter
+        telemetry = JobTelemetry.for_job(job, reporter)
+        self.reporter = telemetry
+        try:
+            stats = self._run(job)
+        except PipelineError as e:
+            telemetry.close("error", stage=e.stage, error=str(e))
+            raise
+        except BaseException as e:
+            telemetry.close("error", stage="unknown", error=str(e))
+            raise
+        finally:
+            self.reporter = reporter
+            if self._encode_context is not None:
+                self._encode_context.close()  # Release this job's use of the encode pool
+                self._encode_context = None
+        stats["telemetry"] = telemetry.close("ok")
+        return stats
+
+    def _run(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        reporter = self.reporter
+        collection = job['collection']
+        batch_size = int(job.get('batch_size', 64))
+        streaming = bool(job.get('streaming'))
+        total_start_time = time.time()
+        self._tokens = 0
+        self._encode_context = None
+        self._run_thread = threading.get_ident()
+
+        try:
+            profile = CollectionProfileLoader.get(job.get('collection_profile'),
+                                                  job.get('profiles_config', CollectionProfileLoader.DEFAULT_PATH))
+            filter_fields = parse_field_list(job.get('filter_fields'))
+            self._filter_columns = [parse_field_spec(entry)[0] for entry in filter_fields]
+        except ValueError as e:
+            raise PipelineError("collection", str(e)) from e
+
+        # Step 1: Execute query and get the first chunk (the whole result unless streaming)
+        reporter.stage_started("fetch", "🔍 데이터베이스에서 데이터 가져오는 중...")
+        frames = self._iter_frames(job)
+        try:
+            first_df = next(frames, None)
+        except Exception as e:
+            raise PipelineError("fetch", str(e)) from e
+        if first_df is None:
+            first_df = pd.DataFrame()
+        reporter.data_fetched(first_df)
+        if not streaming:
+            reporter.stage_finished("fetch", f"쿼리 완료: {len(first_df)} rows", rows=len(first_df))
+
+        # Step 2: Process text documents of the first chunk
+        reporter.stage_started("text", "📝 텍스트 처리 및 청킹 중...")
+        self._token_chunker = None
+        if job.get('chunk_mode') == 'tokens':
+            try:
+                self._token_chunker = self.create_token_chunker(self.model_factory, job)
+            except Exception as e:
+                raise PipelineError("text", f"토크나이저 로딩 실패: {e}") from e
+        first_documents = self._build_documents(first_df, job)
+        if not first_documents:
+            raise PipelineError("text", "처리된 텍스트가 없습니다. 템플릿이나 데이터를 확인하세요.")
+        if not streaming:
+            reporter.stage_finished("text", f"텍스트 처리 완료: {len(first_documents)} 개 청크 생성",
+                                    chunks=len(first_documents), tokens=self._token_count())
+
+        # Step 3: Load embedding model
+        reporter.stage_started("model", "🤖 임베딩 모델 로딩 중...")
+        model_name = job['model']
+        try:
+            embedding_model = self.model_factory.create_model(model_name)
+            dimension = embedding_model.get_dimension()
+            # The model instance is shared (model registry); cache, pool and batch size belong to this job
+            encode_processes = int(job.get('encode_processes', 0) or 0)
+            encode_context = embedding_model.create_context(
+                job.get('embedding_cache_dir', 'cache/embeddings') if job.get('embedding_cache') else None,
+                int(float(job.get('embedding_cache_gb', 10)) * 1024 ** 3),
+                encode_processes,
+                int(job.get('encode_threads', 1) or 1),
+                bool(job.get('encode_pin', True))
+            )
+            self._encode_context = encode_context
+        except Exception as e:
+            raise PipelineError("model", str(e)) from e
+        cache = encode_context.cache
+        cache_hits_before = cache.hits if cache else 0
+        pool = encode_context.pool
+        pool_before = pool.stats() if pool else []
+        # Give every encoding worker a share of each embed call
+        embed_batch = batch_size * max(1, encode_processes)
+        reporter.stage_finished("model", f"모델 로딩 완료: {model_name} ({dimension}차원)",
+                                model=model_name, dimension=dimension)
+
+        auto_tune = bool(job.get('auto_tune'))
+        saved = (job.get('tuned_batch_sizes') or {}).get(model_name) or {}
+        # A forward batch tuned in-process says little about pool workers (and vice versa)
+        saved_encode = saved.get('encode_batch_size') \
+            if int(saved.get('encode_processes', 0) or 0) == encode_processes else None
+        tuning = self._tune_encode_batch(embedding_model, encode_context, first_documents.texts,
+                                         saved_encode) if auto_tune else None
+        if tuning is not None:
+            # Enough texts per embed call to keep every worker's forward batches full
+            embed_batch = max(embed_batch, tuning["batch_size"] * max(1, encode_processes))
+
+        # Optional artifact with the vectors, payload and model metadata
+        artifact_dir = job.get('artifact_dir')
+        artifact_only = bool(artifact_dir) and bool(job.get('artifact_only'))
+        artifact_writer = None
+        if artifact_dir:
+            try:
+                artifact_writer = ArtifactWriter(artifact_dir, self._artifact_metadata(job, embedding_model, profile,
+                                                                                      filter_fields),
+                                                 dimension, dtype=job.get('embedding_dtype', 'float32'))
+            except Exception as e:
+                raise PipelineError("artifact", str(e)) from e
+
+        target = CollectionTarget(self.qdrant_service, reporter, collection)
+        created = False
+        # Every batch between embed and upsert: the embed output queue, one per
+        # upsert worker and the one being encoded
+        upsert_workers = max(1, int(job.get('upsert_workers', 2)))
+        embedding_buffer = None
+        try:
+            # Step 4: Prepare Qdrant (bulk load: no HNSW indexing while points arrive, build once at the end)
+            if not artifact_only:
+                created = target.prepare(dimension, profile, CollectionTarget.pk_schema(first_documents.pks[0]),
+                                         filter_fields, defer_indexes=bool(job.get('bulk_load')))
+                if job.get('bulk_load'):
+                    target.begin_bulk_load()
+
+            try:
+                embedding_buffer = EmbeddingBuffer(
+                    slots=int(job.get('queue_size', 4)) + upsert_workers + 1,
+                    slot_rows=embed_batch,
+                    dimension=dimension,
+                    dtype=job.get('embedding_dtype', 'float32'),
+                    directory=job.get('embedding_buffer_dir', 'cache/buffers')
+                    if job.get('embedding_buffer') == 'memmap' else None
+                )
+            except Exception as e:
+                raise PipelineError("embed", f"임베딩 버퍼 할당 실패: {e}") from e
+
+            # Step 5: Fetch, render, embed and upsert as concurrent stages
+            reporter.stage_started("embed", "⚡ 임베딩 생성 및 업서트 중...")
+            reporter.stage_started("upsert")
+            batch_processor = BatchProcessor(
+                self.qdrant_service,
+                int(saved.get('upsert_batch_size') or batch_size) if auto_tune else batch_size,
+                max_batch_bytes=int(job.get('upsert_max_mb', 16) or 0) * 1024 * 1024,
+                wait=not job.get('upsert_async', True),
+                max_retries=job.get('upsert_retries', 3),
+                adaptive=auto_tune,
+                max_batch_size=embed_batch
+            )
+            backoffs = [0]
+            # Incremental runs compare content hashes of an existing collection
+            incremental = bool(job.get('incremental')) and not created and not artifact_only
+            seen_ids: List[np.ndarray] = []
+            # Totals are only known up front when the whole result was fetched at once
+            known_total = 0 if streaming or incremental else len(first_documents)
+
+            def source():
+                yield first_df, first_documents
+                for df in frames:
+                    yield df, None
+
+            def render(item):
+                df, documents = item
+                if documents is None:
+                    documents = self._build_documents(df, job)
+                return documents.split(embed_batch)
+
+            def diff(documents):
+                changed = self._changed_documents(collection, documents, seen_ids)
+                return [changed] if changed else []
+
+            def encode(texts, out):
+                while True:
+                    try:
+                        return embedding_model.encode(texts, out=out, context=encode_context)
+                    except Exception as e:
+                        if not auto_tune or not is_memory_error(e) or encode_context.batch_size <= 1:
+                            raise
+                    smaller = max(1, encode_context.batch_size // 2)
+                    encode_context.batch_size = smaller
+                    backoffs[0] += 1
+                    self._warn(f"인코딩 메모리 부족: 배치 크기를 {smaller}(으)로 줄여 다시 시도합니다.")
+
+            def embed(documents):
+                slot, out = embedding_buffer.acquire(len(documents))
+                try:
+                    encode(documents.texts, out)
+                except BaseException:
+                    embedding_buffer.release(slot)
+                    raise
+                return [(documents, out, slot)]
+
+            def upsert(item):
+                documents, embeddings, slot = item
+                try:
+                    if artifact_writer is not None:
+                        artifact_writer.write(documents, VectorProcessor.create_point_ids(documents), embeddings)
+                    if artifact_only:
+                        processed_count = len(documents)
+                    else:
+                        processed_count, _ = batch_processor.process_batches(
+                            collection_name=collection,
+                            documents=documents,
+                            embeddings=embeddings
+                        )
+                finally:
+                    embedding_buffer.release(slot)
+                return [processed_count]
+
+            stages = [Stage("text", render, workers=job.get('render_workers', 1), measure=len)]
+            if incremental:
+                stages.append(Stage("diff", diff, workers=job.get('upsert_workers', 2), measure=len))
+            stages += [
+                Stage("embed", embed, workers=1, measure=lambda item: len(item[0])),
+                Stage("upsert", upsert, workers=upsert_workers, measure=lambda n: n),
+            ]
+            runner = StagedRunner(
+                source=source(),
+                source_stage=Stage("fetch", None, measure=lambda item: len(item[0])),
+                stages=stages,
+                queue_size=job.get('queue_size', 4)
+            )
+            runner.start()
+            try:
+                while not runner.wait(timeout=self.REPORT_INTERVAL):
+                    self._report_stages(runner, known_total)
+            finally:
+                runner.stop()
+                self._flush_warnings()
+            try:
+                runner.raise_if_failed()
+            except StageFailure as e:
+                if isinstance(e.error, PipelineError):
+                    raise e.error
+                raise PipelineError(e.stage, str(e.error)) from e.error
+
+            # Queued (wait=False) writes must be applied before reporting success or cleaning up
+            try:
+                missing = batch_processor.barrier(collection)
+            except Exception as e:
+                raise PipelineError("upsert", str(e)) from e
+            if missing:
+                reporter.warning(f"업서트한 포인트 중 {missing}개가 컬렉션에 없습니다. 비동기 업서트 일부가 "
+                                 f"적용되지 않았을 수 있습니다 (원본의 중복 PK도 원인일 수 있음).")
+
+            stage_stats = self._report_stages(runner, known_total)
+            by_stage = {stat["stage"]: stat for stat in stage_stats}
+            rows = by_stage["fetch"]["units"]
+            chunks = by_stage["text"]["units"]
+            vectors = by_stage["upsert"]["units"]
+            embedding_time = by_stage["embed"]["busy_time"]
+            upsert_time = by_stage["upsert"]["busy_time"]
+
+            if streaming:
+                reporter.stage_finished("fetch", f"쿼리 완료: {rows} rows", rows=rows)
+                reporter.stage_finished("text", f"텍스트 처리 완료: {chunks} 개 청크 생성", chunks=chunks,
+                                        tokens=self._token_count())
+            cache_hits = cache.hits - cache_hits_before if cache else 0
+            encode_workers = self._worker_stats(pool_before, pool.stats()) if pool else []
+            message = f"✅ 임베딩 생성 완료: {chunks}개 텍스트"
+            if cache:
+                message += f" (캐시 재사용 {cache_hits}개)"
+            reporter.stage_finished("embed", message, texts=chunks, elapsed=embedding_time, cache_hits=cache_hits,
+                                    encode_workers=encode_workers, buffer_bytes=embedding_buffer.nbytes)
+            if artifact_only:
+                reporter.stage_finished("upsert", f"✅ 아티팩트 기록 완료: {vectors}개 벡터 (Qdrant 업서트 안 함)",
+                                        vectors=vectors, elapsed=upsert_time)
+            else:
+                reporter.stage_finished("upsert", f"✅ Qdrant 업서트 완료: {vectors}개 벡터",
+                                        vectors=vectors, elapsed=upsert_time, bytes=batch_processor.bytes_sent,
+                                        retries=batch_processor.retries, splits=batch_processor.splits)
+            if artifact_writer is not None:
+                try:
+                    manifest = artifact_writer.close()
+                except Exception as e:
+                    raise PipelineError("artifact", str(e)) from e
+                reporter.stage_finished("artifact", f"💾 아티팩트 저장: {artifact_dir} ({manifest['rows']}개 벡터)",
+                                        path=artifact_dir, rows=manifest['rows'], files=len(manifest['files']))
+
+            # Step 6: Incremental cleanup of points that no longer exist in the source
+            skipped = chunks - by_stage["diff"]["units"] if incremental else 0
+            deleted = 0
+            if incremental:
+                if int(job.get('max_rows', 0) or 0) > 0:
+                    reporter.warning("최대 행 수 제한이 있어 삭제된 행 정리를 건너뜁니다.")
+                else:
+                    reporter.stage_started("cleanup", "🧹 원본에서 사라진 청크 정리 중...")
+                    try:
+                        deleted = self._delete_orphans(collection, seen_ids)
+                    except Exception as e:
+                        raise PipelineError("cleanup", str(e)) from e
+                    reporter.stage_finished("cleanup", f"변경 없음 {skipped}개 건너뜀, 정리 {deleted}개 삭제",
+                                            skipped=skipped, deleted=deleted)
+
+        except BaseException:
+            target.abort()
+            if artifact_writer is not None:
+                artifact_writer.abort()
+            raise
+        finally:
+            if embedding_buffer is not None:
+                embedding_buffer.close()
+
+        # Step 7: Bulk load: restore indexing and wait for the index to be built
+        index_time = target.finish(float(job.get('index_wait_timeout', 3600)))
+
+        return {
+            "collection": collection,
+            "model": model_name,
+            "dimension": dimension,
+            "collection_created": created,
+            "collection_profile": profile.name,
+            "rows": rows,
+            "chunks": chunks,
+            "vectors": vectors,
+            "tokens": self._token_count(),
+            "bytes_upserted": batch_processor.bytes_sent,
+            "skipped": skipped,
+            "deleted": deleted,
+            "embedding_time": embedding_time,
+            "upsert_time": upsert_time,
+            "index_time": index_time,
+            "upsert_retries": batch_processor.retries,
+            "cache_hits": cache_hits,
+            "encode_workers": encode_workers,
+            "embedding_buffer_bytes": embedding_buffer.nbytes,
+            "artifact_dir": artifact_dir or None,
+            "artifact_rows": artifact_writer.rows if artifact_writer is not None else 0,
+            "total_time": time.time() - total_start_time,
+            "stages": stage_stats,
+            "tuning": {
+                "model": model_name,
+                "encode_batch_size": encode_context.batch_size,
+                "encode_processes": encode_processes,
+                "encode_rate": tuning["rate"],
+                "upsert_batch_size": batch_processor.batch_size,
+                "upsert_latency": batch_processor.average_latency,
+                "backoffs": backoffs[0],
+                "probes": tuning["probes"],
+                "reason": tuning["reason"],
+            } if tuning is not None else None,
+        }
+
+    def _tune_encode_batch(self, embedding_model, encode_context, texts: List[str],
+                           start: Optional[int]) -> Dict[str, Any]:
+        """Probe the forward batch size on the job's first texts and set it on the job's encode context"""
+        self.reporter.stage_started("tune", "🎛️ 배치 크기 자동 조정 중...")
+        try:
+            tuning = EncodeBatchTuner(embedding_model, encode_context).tune(texts, start)
+            encode_context.batch_size = max(1, int(tuning["batch_size"]))
+        except Exception as e:
+            raise PipelineError("tune", str(e)) from e
+        rate = f", {tuning['rate']:.0f} 텍스트/초" if tuning["rate"] else ""
+        self.reporter.stage_finished("tune", f"인코딩 배치 크기: {tuning['batch_size']}{rate}",
+                                     batch_size=tuning["batch_size"], rate=tuning["rate"],
+                                     reason=tuning["reason"], probes=len(tuning["probes"]))
+        return tuning
+
+    @staticmethod
+    def _worker_stats(before: List[Dict[str, Any]], after: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Per-worker texts and throughput of this run (pool counters are cumulative)"""
+        stats = []
+        for old, new in zip(before, after):
+            texts = new["texts"] - old["texts"]
+            busy = new["busy_time"] - old["busy_time"]
+            stats.append({"worker": new["worker"], "texts": texts, "busy_time": busy,
+                          "rate": texts / busy if busy > 0 else 0.0})
+        return stats
+
+    def _report_stages(self, runner: StagedRunner, known_total: int) -> List[Dict[str, Any]]:
+        """Push per-stage counters, throughput and queue occupancy to the reporter"""
+        stats = runner.stats()
+        by_stage = {stat["stage"]: stat for stat in stats}
+        self._flush_warnings()
+        self.reporter.progress("fetch", by_stage["fetch"]["units"], 0)
+        self.reporter.progress("embed", by_stage["embed"]["units"], known_total)
+        self.reporter.progress("upsert", by_stage["upsert"]["units"], known_total)
+        self.reporter.stage_stats(stats)
+        return stats
@@ -0,0 +1,216 @@
+"""Per-job telemetry: stage timers, counters, rates and bottleneck analysis
+
+JobTelemetry sits between the pipeline and its reporters (Streamlit UI,
+JSON lines on stdout) and forwards every event unchanged. It also records
+when each stage ran, the counters reported when stages finish (rows,
+chunks, tokens, vectors, bytes upserted, retries) and the last per-stage
+throughput of the concurrent stages. When the job ends the summary is
+written to a JSON-lines job log (`job_log_dir`) and, with
+`pushgateway_url`, pushed in Prometheus text format to a Pushgateway (or
+anything accepting the same PUT).
+"""
+import os
+import re
+import threading
+import time
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from src.services.pipeline_reporter import JsonLinesReporter, PipelineReporter
+
+# (stage, stage_finished info key) -> counter
+COUNTERS = {
+    ("fetch", "rows"): "rows",
+    ("text", "chunks"): "chunks",
+    ("text", "tokens"): "tokens",
+    ("embed", "cache_hits"): "cache_hits",
+    ("upsert", "vectors"): "vectors",
+    ("upsert", "bytes"): "bytes_upserted",
+    ("upsert", "retries"): "retries",
+    ("upsert", "splits"): "splits",
+    ("cleanup", "skipped"): "skipped",
+    ("cleanup", "deleted"): "deleted",
+}
+# Counters reported as rates over the whole job
+RATE_COUNTERS = ["rows", "chunks", "tokens", "vectors", "bytes_upserted"]
+
+
+def analyze_bottleneck(stage_stats: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The concurrent stage whose workers were busy the largest share of the run
+
+    A stage near 100% utilization limits throughput; the stages before it
+    wait on full queues and the ones after it on empty queues.
+    """
+    active = [stat for stat in stage_stats if stat.get("units")]
+    if not active:
+        return None
+    busiest = max(active, key=lambda stat: stat.get("utilization", 0.0))
+    return {
+        "stage": busiest["stage"],
+        "utilization": round(busiest.get("utilization", 0.0), 3),
+        "workers": busiest["workers"],
+        "input_queue": busiest.get("avg_queue_occupancy"),
+        "utilization_by_stage": {stat["stage"]: round(stat.get("utilization", 0.0), 3) for stat in stage_stats},
+    }
+
+
+def prometheus_text(summary: Dict[str, Any]) -> str:
+    """Summary in the Prometheus text exposition format (all gauges)"""
+    lines = [
+        "# TYPE db2embed_job_success gauge",
+        f"db2embed_job_success {1 if summary['status'] == 'ok' else 0}",
+        "# TYPE db2embed_job_duration_seconds gauge",
+        f"db2embed_job_duration_seconds {summary['elapsed']}",
+        "# TYPE db2embed_job_last_run_timestamp_seconds gauge",
+        f"db2embed_job_last_run_timestamp_seconds {round(time.time(), 3)}",
+        "# TYPE db2embed_job_total gauge",
+    ]
+    lines += [f'db2embed_job_total{{counter="{name}"}} {value}' for name, value in summary["counters"].items()]
+    lines.append("# TYPE db2embed_job_rate gauge")
+    lines += [f'db2embed_job_rate{{counter="{name}"}} {value}' for name, value in summary["rates"].items()]
+    for metric, key in [("db2embed_stage_seconds", "elapsed"), ("db2embed_stage_rate", "wall_rate"),
+                        ("db2embed_stage_utilization", "utilization")]:
+        lines.append(f"# TYPE {metric} gauge")
+        lines += [f'{metric}{{stage="{stage}"}} {values[key]}'
+                  for stage, values in summary["stages"].items() if values.get(key) is not None]
+    return "\n".join(lines) + "\n"
+
+
+def push_metrics(url: str, labels: Dict[str, str], summary: Dict[str, Any], timeout: float = 5.0) -> None:
+    """PUT the summary to a Pushgateway grouping key (job=db2embed plus `labels`)"""
+    path = "/metrics/job/db2embed" + "".join(
+        f"/{name}/{urllib.parse.quote(str(value), safe='')}" for name, value in labels.items() if value)
+    request = urllib.request.Request(
+        url.rstrip("/") + path,
+        data=prometheus_text(summary).encode("utf-8"),
+        method="PUT",
+        headers={"Content-Type": "text/plain; version=0.0.4"}
+    )
+    with urllib.request.urlopen(request, timeout=timeout):
+        pass
+
+
+class JobTelemetry(PipelineReporter):
+    """Forwards pipeline events to `reporters` and records timers and counters"""
+
+    # Minimum seconds between progress/stage_stats lines in the job log
+    LOG_INTERVAL = 5.0
+
+    def __init__(self, reporters: List[PipelineReporter], job_log: Optional[JsonLinesReporter] = None,
+                 log_path: Optional[str] = None, pushgateway_url: str = "", labels: Optional[Dict[str, str]] = None):
+        self.reporters = reporters
+        self.job_log = job_log
+        self.log_path = log_path
+        self.pushgateway_url = pushgateway_url
+        self.labels = labels or {}
+        self.started = time.time()
+        self.windows: Dict[str, List[Optional[float]]] = {}
+        self.counters: Dict[str, Any] = {}
+        self._stage_stats: List[Dict[str, Any]] = []
+        self._targets = reporters + ([job_log] if job_log is not None else [])
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_job(cls, job: Dict[str, Any], reporter: PipelineReporter) -> "JobTelemetry":
+        """Telemetry for one pipeline run; opens `job_log_dir`/<time>_<collection>.jsonl"""
+        collection = str(job.get('collection', ''))
+        job_log, log_path = None, None
+        log_dir = job.get('job_log_dir')
+        if log_dir:
+            name = re.sub(r'[^\w.-]', '_', collection) or "job"
+            log_path = os.path.join(log_dir, f"{time.strftime('%Y%m%d_%H%M%S')}_{name}.jsonl")
+            try:
+                os.makedirs(log_dir, exist_ok=True)
+                job_log = JsonLinesReporter(open(log_path, 'a', encoding='utf-8'), progress_interval=cls.LOG_INTERVAL)
+            except OSError as e:
+                reporter.warning(f"작업 로그를 열 수 없습니다: {e}")
+                log_path = None
+
+        telemetry = cls([reporter], job_log, log_path, job.get('pushgateway_url') or "", {"collection": collection})
+        if job_log is not None:
+            # The connection URI may carry credentials; keep only its dialect
+            settings = {key: value for key, value in job.items() if key != 'db_uri'}
+            settings['db_dialect'] = str(job.get('db_uri', '')).split(':', 1)[0]
+            job_log.emit("job_started", job=settings)
+        return telemetry
+
+    def _forward(self, method: str, *args: Any, **kwargs: Any) -> None:
+        for target in self._targets:
+            getattr(target, method)(*args, **kwargs)
+
+    def stage_started(self, stage: str, message: str = "") -> None:
+        with self._lock:
+            self.windows.setdefault(stage, [time.time(), None])
+        self._forward("stage_started", stage, message)
+
+    def progress(self, stage: str, done: int, total: int) -> None:
+        self._forward("progress", stage, done, total)
+
+    def stage_finished(self, stage: str, message: str = "", **info: Any) -> None:
+        now = time.time()
+        with self._lock:
+            # Streaming runs report fetch/text again at the end; the stage ends with the last report
+            self.windows.setdefault(stage, [now, None])[1] = now
+            for key, value in info.items():
+                counter = COUNTERS.get((stage, key))
+                if counter is not None and value is not None:
+                    self.counters[counter] = value
+        self._forward("stage_finished", stage, message, **info)
+
+    def warning(self, message: str) -> None:
+        self._forward("warning", message)
+
+    def data_fetched(self, df: pd.DataFrame) -> None:
+        for reporter in self.reporters:
+            reporter.data_fetched(df)
+
+    def stage_stats(self, stats: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._stage_stats = stats
+        self._forward("stage_stats", stats)
+
+    def summary(self) -> Dict[str, Any]:
+        """Timers, counters, rates and the bottleneck stage so far"""
+        now = time.time()
+        elapsed = now - self.started
+        with self._lock:
+            counters = dict(self.counters)
+            stage_stats = list(self._stage_stats)
+            stages = {stage: {"elapsed": round((finished or now) - started, 3)}
+                      for stage, (started, finished) in self.windows.items()}
+        for stat in stage_stats:
+            stages.setdefault(stat["stage"], {}).update({
+                "workers": stat["workers"],
+                "units": stat["units"],
+                "busy_time": round(stat["busy_time"], 3),
+                "wall_rate": round(stat["wall_rate"], 1),
+                "busy_rate": round(stat["busy_rate"], 1),
+                "utilization": round(stat.get("utilization", 0.0), 3),
+            })
+        return {
+            "elapsed": round(elapsed, 3),
+            "counters": counters,
+            "rates": {f"{name}_per_s": round(counters[name] / elapsed, 1)
+                      for name in RATE_COUNTERS if name in counters and elapsed > 0},
+            "stages": stages,
+            "bottleneck": analyze_bottleneck(stage_stats),
+            "log_path": self.log_path,
+        }
+
+    def close(self, status: str, **info: Any) -> Dict[str, Any]:
+        """Finish the job log and push metrics; returns the summary"""
+        summary = {"status": status, **info, **self.summary()}
+        if self.job_log is not None:
+            self.job_log.emit("job_finished", **summary)
+            self.job_log.stream.close()
+            self._targets.remove(self.job_log)
+            self.job_log = None
+        if self.pushgateway_url:
+            try:
+                push_metrics(self.pushgateway_url, self.labels, summary)
+            except Exception as e:
+                self.warning(f"메트릭 전송 실패 ({self.pushgateway_url}): {e}")
+        return summary
@@ -0,0 +1,73 @@
+"""Pipeline event receivers: the no-op base class and the JSON-lines writer"""
+import json
+import sys
+import time
+from typing import Any, Dict, List
+
+import pandas as pd
+
+
+class PipelineReporter:
+    """Receives pipeline events. The base implementation ignores everything."""
+
+    def stage_started(self, stage: str, message: str = "") -> None:
+        """Called when a stage begins"""
+        pass
+
+    def progress(self, stage: str, done: int, total: int) -> None:
+        """Called after each batch of a stage"""
+        pass
+
+    def stage_finished(self, stage: str, message: str = "", **info: Any) -> None:
+        """Called when a stage completes"""
+        pass
+
+    def warning(self, message: str) -> None:
+        """Called for non-fatal conditions"""
+        pass
+
+    def data_fetched(self, df: pd.DataFrame) -> None:
+        """Called with the extracted source rows"""
+        pass
+
+    def stage_stats(self, stats: List[Dict[str, Any]]) -> None:
+        """Called periodically with per-stage throughput and queue occupancy"""
+        pass
+
+
+class JsonLinesReporter(PipelineReporter):
+    """Writes pipeline events as JSON lines"""
+
+    def __init__(self, stream=sys.stdout, progress_interval: float = 1.0):
+        self.stream = stream
+        self.progress_interval = progress_interval
+        self._last_progress: Dict[str, float] = {}
+
+    def emit(self, event: str, **data: Any) -> None:
+        record = {"ts": round(time.time(), 3), "event": event, **data}
+        self.stream.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self.stream.flush()
+
+    def stage_started(self, stage: str, message: str = "") -> None:
+        self.emit("stage_started", stage=stage)
+
+    def progress(self, stage: str, done: int, total: int) -> None:
+        # Throttle progress lines, but always report completion (total 0 = unknown)
+        now = time.time()
+        if (total <= 0 or done < total) and now - self._last_progress.get(stage, 0.0) < self.progress_interval:
+            return
+        self._last_progress[stage] = now
+        self.emit("progress", stage=stage, done=done, total=total)
+
+    def stage_finished(self, stage: str, message: str = "", **info: Any) -> None:
+        self.emit("stage_finished", stage=stage, **info)
+
+    def warning(self, message: str) -> None:
+        self.emit("warning", message=message)
+
+    def stage_stats(self, stats: List[Dict[str, Any]]) -> None:
+        now = time.time()
+        if now - self._last_progress.get("_stats", 0.0) < self.progress_interval:
+            return
+        self._last_progress["_stats"] = now
+        self.emit("stage_stats", stages=stats)
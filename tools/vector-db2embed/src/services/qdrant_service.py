@@ -1,26 +1,85 @@
 """Qdrant vector database service with clean interface"""
 import hashlib
+import threading
 import time
-from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
 from abc import ABC, abstractmethod
 
 import pandas as pd
 from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct
+from qdrant_client.models import (
+    PointStruct, PointIdsList, OptimizersConfigDiff, CollectionStatus, PayloadSchemaType,
+    FilterSelector, Filter, HasIdCondition
+)
 import numpy as np
 
+from src.services.collection_profiles import CollectionProfile
+from src.services.document_batch import DocumentBatch
+
 
 class VectorDatabaseInterface(ABC):
     """Abstract interface for vector database operations"""
 
     @abstractmethod
-    def ensure_collection(self, collection_name: str, vector_size: int) -> bool:
-        """Ensure collection exists with given vector size"""
+    def ensure_collection(self, collection_name: str, vector_size: int,
+                          profile: Optional[CollectionProfile] = None) -> bool:
+        """Ensure collection exists with given vector size (created with `profile`)"""
+        pass
+
+    @abstractmethod
+    def create_payload_indexes(self, collection_name: str, fields: List[Tuple[str, PayloadSchemaType]]) -> int:
+        """Create payload indexes that do not exist yet; returns how many were created"""
+        pass
+
+    @abstractmethod
+    def upsert_vectors(self, collection_name: str, points: List[PointStruct], wait: bool = True) -> bool:
+        """Upsert vector points to collection (wait=False returns once the write is queued)"""
+        pass
+
+    @abstractmethod
+    def get_payload_values(self, collection_name: str, point_ids: List[Any], key: str) -> Dict[Any, Any]:
+        """Get one payload field for the given point IDs (missing points are omitted)"""
+        pass
+
+    @abstractmethod
+    def iter_point_ids(self, collection_name: str, batch_size: int = 10000) -> Iterator[List[Any]]:
+        """Iterate over all point IDs of a collection in batches"""
+        pass
+
+    @abstractmethod
+    def delete_points(self, collection_name: str, point_ids: List[Any]) -> bool:
+        """Delete points by ID"""
+        pass
+
+    @abstractmethod
+    def flush_writes(self, collection_name: str) -> None:
+        """Wait until every shard has applied the writes queued so far"""
         pass
 
     @abstractmethod
-    def upsert_vectors(self, collection_name: str, points: List[PointStruct]) -> bool:
-        """Upsert vector points to collection"""
+    def count_points(self, collection_name: str) -> int:
+        """Exact number of points in the collection"""
+        pass
+
+    @abstractmethod
+    def begin_bulk_load(self, collection_name: str) -> Optional[int]:
+        """Defer vector indexing; returns the indexing threshold to restore afterwards"""
+        pass
+
+    @abstractmethod
+    def end_bulk_load(self, collection_name: str, indexing_threshold: Optional[int]) -> bool:
+        """Restore the indexing threshold so the index is built"""
+        pass
+
+    @abstractmethod
+    def wait_for_green(
+        self,
+        collection_name: str,
+        timeout: float = 3600.0,
+        progress_callback: Optional[callable] = None
+    ) -> bool:
+        """Wait until the collection status is green; False on timeout"""
         pass
 
     @abstractmethod
@@ -39,106 +98,379 @@ class VectorDatabaseInterface(ABC):
         pass
 
 
+class CollectionStatsCache:
+    """Process-wide cache of collection stats shared by all QdrantService instances
+
+    Streamlit builds new services on every rerun, so the cache lives at module
+    level and is keyed by server. Missing or expired entries are fetched
+    concurrently in a small thread pool; callers wait at most `TIMEOUT`
+    seconds and otherwise get the last known (possibly stale) value or
+    nothing, while the fetch finishes in the background for the next rerun.
+    Our own writes invalidate the affected entries.
+    """
+
+    TTL = 30.0
+    ERROR_TTL = 5.0
+    TIMEOUT = 2.0
+    WORKERS = 8
+
+    def __init__(self):
+        # (server, key) -> (fetched_at, ok, value or exception)
+        self._entries: Dict[Tuple[str, str], Tuple[float, bool, Any]] = {}
+        self._pending: Dict[Tuple[str, str], Future] = {}
+        self._invalidated: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.WORKERS, thread_name_prefix="qdrant-stats")
+
+    def get(self, server: str, keys: List[str], fetch: Callable[[str], Any],
+            timeout: Optional[float] = None) -> Dict[str, Tuple[bool, Any]]:
+        """(ok, value or exception) per key; keys still unknown after the timeout are left out"""
+        now = time.time()
+        results: Dict[str, Tuple[bool, Any]] = {}
+        waiting: List[Future] = []
+        with self._lock:
+            for key in keys:
+                cache_key = (server, key)
+                entry = self._entries.get(cache_key)
+                if entry is not None and now - entry[0] < (self.TTL if entry[1] else self.ERROR_TTL):
+                    results[key] = (entry[1], entry[2])
+                    continue
+                future = self._pending.get(cache_key)
+                if future is None:
+                    future = self._executor.submit(self._fetch, cache_key, fetch)
+                    self._pending[cache_key] = future
+                    future.add_done_callback(lambda done, k=cache_key: self._finished(k, done))
+                waiting.append(future)
+        if waiting:
+            wait(waiting, timeout=self.TIMEOUT if timeout is None else timeout)
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get((server, key))
+                if key not in results and entry is not None:
+                    results[key] = (entry[1], entry[2])
+        return results
+
+    def _fetch(self, cache_key: Tuple[str, str], fetch: Callable[[str], Any]) -> None:
+        started = time.time()
+        try:
+            entry = (started, True, fetch(cache_key[1]))
+        except Exception as e:
+            entry = (started, False, e)
+        with self._lock:
+            # A write after this fetch started makes its result stale
+            if started >= self._invalidated.get(cache_key, 0.0):
+                self._entries[cache_key] = entry
+
+    def _finished(self, cache_key: Tuple[str, str], future: Future) -> None:
+        with self._lock:
+            if self._pending.get(cache_key) is future:
+                del self._pending[cache_key]
+
+    def invalidate(self, server: str, keys: Optional[List[str]] = None) -> None:
+        """Forget entries of a server (all of them when keys is None)"""
+        now = time.time()
+        with self._lock:
+            if keys is None:
+                keys = [key for srv, key in list(self._entries) + list(self._pending) if srv == server]
+            for key in keys:
+                cache_key = (server, key)
+                self._entries.pop(cache_key, None)
+                self._pending.pop(cache_key, None)
+                self._invalidated[cache_key] = now
+
+
+collection_stats_cache = CollectionStatsCache()
+
+
 class QdrantService(VectorDatabaseInterface):
     """Qdrant vector database service implementation"""
 
-    def __init__(self, host: str = "localhost", port: int = 6333, api_key: Optional[str] = None):
+    # Indexing threshold (KB per segment) during bulk loads: high enough that
+    # no segment is indexed while points are still arriving
+    BULK_INDEXING_THRESHOLD = 1_000_000_000
+    # Qdrant's default, used when a collection reports no threshold
+    DEFAULT_INDEXING_THRESHOLD = 20000
+    GREEN_POLL_INTERVAL = 2.0
+    # Seconds a collection must stay green before it counts as indexed when
+    # indexed_vectors_count does not reach points_count (segments below the
+    # indexing threshold are never HNSW-indexed)
+    GREEN_SETTLE = 10.0
+    # Stats cache key of the collection name list
+    COLLECTIONS_KEY = ""
+
+    def __init__(self, host: str = "localhost", port: int = 6333, api_key: Optional[str] = None,
+                 location: Optional[str] = None):
         self.host = host
         self.port = port
         self.api_key = api_key
+        # Local mode without a server: ":memory:" or a storage directory
+        self.location = location
         self._client: Optional[QdrantClient] = None
 
     def _get_client(self) -> QdrantClient:
         """Get or create Qdrant client"""
         if self._client is None:
-            self._client = QdrantClient(host=self.host, port=self.port, api_key=self.api_key)
+            if self.location == ":memory:":
+                self._client = QdrantClient(location=":memory:")
+            elif self.location:
+                self._client = QdrantClient(path=self.location)
+            else:
+                self._client = QdrantClient(host=self.host, port=self.port, api_key=self.api_key)
         return self._client
 
-    def ensure_collection(self, collection_name: str, vector_size: int) -> bool:
-        """Ensure collection exists with given vector size"""
+    def _server(self) -> str:
+        if self.location:
+            # Each in-memory client is its own database
+            return f"local:{id(self)}" if self.location == ":memory:" else f"local:{self.location}"
+        return f"{self.host}:{self.port}"
+
+    def _changed(self, collection_name: str, listing: bool = False) -> None:
+        """Drop cached stats after our own writes (and the collection list if it changed)"""
+        keys = [collection_name, self.COLLECTIONS_KEY] if listing else [collection_name]
+        collection_stats_cache.invalidate(self._server(), keys)
+
+    def refresh_stats(self) -> None:
+        """Drop all cached stats of this server"""
+        collection_stats_cache.invalidate(self._server())
+
+    def ensure_collection(self, collection_name: str, vector_size: int,
+                          profile: Optional[CollectionProfile] = None) -> bool:
+        """Ensure collection exists with given vector size (created with `profile`)"""
         try:
             client = self._get_client()
-            existing_collections = [c.name for c in client.get_collections().collections]
-
-            if collection_name not in existing_collections:
-                client.recreate_collection(
-                    collection_name=collection_name,
-                    vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
-                )
+            if not client.collection_exists(collection_name):
+                profile = profile or CollectionProfile("default")
+                client.create_collection(collection_name=collection_name, **profile.create_kwargs(vector_size))
+                self._changed(collection_name, listing=True)
                 return True  # Created new collection
 
             return False  # Collection already exists
         except Exception as e:
             raise VectorDatabaseError(f"Failed to ensure collection: {e}")
 
-    def upsert_vectors(self, collection_name: str, points: List[PointStruct]) -> bool:
-        """Upsert vector points to collection"""
+    def create_payload_indexes(self, collection_name: str, fields: List[Tuple[str, PayloadSchemaType]]) -> int:
+        """Create payload indexes that do not exist yet; returns how many were created"""
         try:
             client = self._get_client()
-            client.upsert(collection_name=collection_name, points=points)
+            existing = client.get_collection(collection_name).payload_schema or {}
+            created = 0
+            for field_name, schema in fields:
+                if field_name in existing:
+                    continue
+                client.create_payload_index(collection_name=collection_name, field_name=field_name,
+                                            field_schema=schema, wait=True)
+                created += 1
+            return created
+        except Exception as e:
+            raise VectorDatabaseError(f"Failed to create payload indexes: {e}")
+
+    def upsert_vectors(self, collection_name: str, points: List[PointStruct], wait: bool = True) -> bool:
+        """Upsert vector points to collection (wait=False returns once the write is queued)"""
+        try:
+            client = self._get_client()
+            client.upsert(collection_name=collection_name, points=points, wait=wait)
+            self._changed(collection_name)
             return True
         except Exception as e:
-            raise VectorDatabaseError(f"Failed to upsert vectors: {e}")
+            raise VectorDatabaseError(f"Failed to upsert vectors: {e}", status_code=VectorDatabaseError.status_of(e))
 
-    def get_collections(self) -> List[Dict[str, Any]]:
-        """Get list of collections with metadata"""
+    def get_payload_values(self, collection_name: str, point_ids: List[Any], key: str) -> Dict[Any, Any]:
+        """Get one payload field for the given point IDs (missing points are omitted)"""
+        try:
+            client = self._get_client()
+            records = client.retrieve(
+                collection_name=collection_name,
+                ids=point_ids,
+                with_payload=[key],
+                with_vectors=False
+            )
+            return {record.id: (record.payload or {}).get(key) for record in records}
+        except Exception as e:
+            raise VectorDatabaseError(f"Failed to retrieve points: {e}")
+
+    def iter_point_ids(self, collection_name: str, batch_size: int = 10000) -> Iterator[List[Any]]:
+        """Iterate over all point IDs of a collection in batches"""
+        try:
+            client = self._get_client()
+            offset = None
+            while True:
+                records, offset = client.scroll(
+                    collection_name=collection_name,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=False,
+                    with_vectors=False
+                )
+                if records:
+                    yield [record.id for record in records]
+                if offset is None:
+                    break
+        except Exception as e:
+            raise VectorDatabaseError(f"Failed to scroll points: {e}")
+
+    def delete_points(self, collection_name: str, point_ids: List[Any]) -> bool:
+        """Delete points by ID"""
+        try:
+            client = self._get_client()
+            client.delete(collection_name=collection_name, points_selector=PointIdsList(points=point_ids))
+            self._changed(collection_name)
+            return True
+        except Exception as e:
+            raise VectorDatabaseError(f"Failed to delete points: {e}")
+
+    def flush_writes(self, collection_name: str) -> None:
+        """Wait until every shard has applied the writes queued so far
+
+        A filtered delete is sent to every shard and, with wait=True, each
+        shard answers only after applying the updates queued before it.
+        The empty ID condition matches no point.
+        """
+        try:
+            client = self._get_client()
+            client.delete(collection_name=collection_name,
+                          points_selector=FilterSelector(filter=Filter(must=[HasIdCondition(has_id=[])])),
+                          wait=True)
+        except Exception as e:
+            raise VectorDatabaseError(f"Failed to wait for queued writes: {e}")
+
+    def count_points(self, collection_name: str) -> int:
+        """Exact number of points in the collection"""
+        try:
+            return int(self._get_client().count(collection_name=collection_name, exact=True).count)
+        except Exception as e:
+            raise VectorDatabaseError(f"Failed to count points: {e}")
+
+    def begin_bulk_load(self, collection_name: str) -> Optional[int]:
+        """Defer vector indexing; returns the indexing threshold to restore afterwards"""
+        try:
+            client = self._get_client()
+            info = client.get_collection(collection_name)
+            previous = info.config.optimizer_config.indexing_threshold
+            client.update_collection(
+                collection_name=collection_name,
+                optimizers_config=OptimizersConfigDiff(indexing_threshold=self.BULK_INDEXING_THRESHOLD)
+            )
+            # A collection left in bulk mode by an aborted run must not be "restored" to bulk mode
+            if previous is not None and previous >= self.BULK_INDEXING_THRESHOLD:
+                previous = None
+            return previous
+        except Exception as e:
+            raise VectorDatabaseError(f"Failed to defer indexing: {e}")
+
+    def end_bulk_load(self, collection_name: str, indexing_threshold: Optional[int]) -> bool:
+        """Restore the indexing threshold so the index is built"""
+        try:
+            client = self._get_client()
+            client.update_collection(
+                collection_name=collection_name,
+                optimizers_config=OptimizersConfigDiff(
+                    indexing_threshold=indexing_threshold or self.DEFAULT_INDEXING_THRESHOLD)
+            )
+            self._changed(collection_name)
+            return True
+        except Exception as e:
+            raise VectorDatabaseError(f"Failed to restore indexing: {e}")
+
+    def wait_for_green(
+        self,
+        collection_name: str,
+        timeout: float = 3600.0,
+        progress_callback: Optional[callable] = None
+    ) -> bool:
+        """Wait until the collection status is green; False on timeout
+
+        Right after the indexing threshold changes the optimizer may not have
+        picked up any work yet and the collection still reports green, so
+        green alone is not enough: every point must also be indexed, or the
+        status must have stayed green for GREEN_SETTLE seconds.
+
+        progress_callback(indexed_vectors, points) is called on every poll.
+        """
         try:
             client = self._get_client()
-            collections_info = client.get_collections()
-
-            collections = []
-            for coll in collections_info.collections:
-                try:
-                    coll_info = client.get_collection(coll.name)
-                    count = client.count(coll.name)
-                    collections.append({
-                        "name": coll.name,
-                        "vector_size": coll_info.config.params.vectors.size,
-                        "distance": coll_info.config.params.vectors.distance.value,
-                        "count": count.count if count else 0,
-                        "status": coll_info.status.value
-                    })
-                except Exception:
-                    collections.append({
-                        "name": coll.name,
-                        "vector_size": "N/A",
-                        "distance": "N/A",
-                        "count": "N/A",
-                        "status": "Error"
-                    })
-
-            return collections
+            deadline = time.time() + timeout
+            green_since: Optional[float] = None
+            while True:
+                info = client.get_collection(collection_name)
+                indexed, points = info.indexed_vectors_count or 0, info.points_count or 0
+                if progress_callback:
+                    progress_callback(indexed, points)
+                if info.status == CollectionStatus.GREEN:
+                    if green_since is None:
+                        green_since = time.time()
+                    if indexed >= points or time.time() - green_since >= self.GREEN_SETTLE:
+                        return True
+                else:
+                    green_since = None
+                if time.time() >= deadline:
+                    return False
+                time.sleep(self.GREEN_POLL_INTERVAL)
         except Exception as e:
-            raise VectorDatabaseError(f"Failed to get collections: {e}")
+            raise VectorDatabaseError(f"Failed to get collection status: {e}")
+
+    def _fetch_collection_names(self, _key: str) -> List[str]:
+        return [c.name for c in self._get_client().get_collections().collections]
+
+    def _fetch_stats(self, collection_name: str) -> Dict[str, Any]:
+        """One get_collection call; points_count is Qdrant's approximate count"""
+        info = self._get_client().get_collection(collection_name)
+        vectors = info.config.params.vectors
+        if isinstance(vectors, dict):  # Named vectors: show the first
+            vectors = next(iter(vectors.values()))
+        return {
+            "name": collection_name,
+            "vector_size": vectors.size,
+            "distance": vectors.distance.value,
+            "count": info.points_count or 0,
+            "status": info.status.value
+        }
+
+    def get_collections(self) -> List[Dict[str, Any]]:
+        """Get list of collections with metadata
+
+        Served from the stats cache (see CollectionStatsCache): blocks for at
+        most a couple of seconds, and collections whose stats are not in yet
+        are listed with status "pending".
+        """
+        server = self._server()
+        listing = collection_stats_cache.get(server, [self.COLLECTIONS_KEY], self._fetch_collection_names)
+        if self.COLLECTIONS_KEY not in listing:
+            raise VectorDatabaseError("Failed to get collections: Qdrant did not respond in time")
+        ok, names = listing[self.COLLECTIONS_KEY]
+        if not ok:
+            raise VectorDatabaseError(f"Failed to get collections: {names}")
+
+        stats = collection_stats_cache.get(server, names, self._fetch_stats)
+        collections = []
+        for name in names:
+            ok, value = stats.get(name, (False, None))
+            if ok:
+                collections.append(value)
+            else:
+                collections.append({
+                    "name": name,
+                    "vector_size": "N/A",
+                    "distance": "N/A",
+                    "count": "N/A",
+                    "status": "pending" if name not in stats else "Error"
+                })
+        return collections
 
     def delete_collection(self, collection_name: str) -> bool:
         """Delete collection"""
         try:
             client = self._get_client()
             client.delete_collection(collection_name)
+            self._changed(collection_name, listing=True)
             return True
         except Exception as e:
             raise VectorDatabaseError(f"Failed to delete collection: {e}")
 
     def get_collection_info(self, collection_name: str) -> Optional[Dict[str, Any]]:
-        """Get collection information"""
-        try:
-            client = self._get_client()
-            collections = [c.name for c in client.get_collections().collections]
-
-            if collection_name in collections:
-                coll_info = client.get_collection(collection_name)
-                count = client.count(collection_name)
-                return {
-                    "name": collection_name,
-                    "vector_size": coll_info.config.params.vectors.size,
-                    "distance": coll_info.config.params.vectors.distance.value,
-                    "count": count.count if count else 0,
-                    "status": coll_info.status.value
-                }
-            return None
-        except Exception:
-            return None
+        """Get collection information (cached; None if missing, unreachable or not in yet)"""
+        stats = collection_stats_cache.get(self._server(), [collection_name], self._fetch_stats)
+        ok, value = stats.get(collection_name, (False, None))
+        return value if ok else None
 
     def test_connection(self) -> bool:
         """Test Qdrant connection"""
@@ -162,45 +494,202 @@ class VectorProcessor:
         return int.from_bytes(hash_bytes[:8], "big") & ((1 << 64) - 1)
 
     @staticmethod
-    def create_point_struct(
+    def create_content_hash(template: str, model_name: str, text: str, fields: str = "") -> str:
+        """Hash of everything that determines a chunk's vector (and its filter fields)"""
+        content = f"{model_name}\x1f{template}\x1f{text}"
+        if fields:
+            content += f"\x1f{fields}"
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+
+    @staticmethod
+    def create_point_ids(documents: DocumentBatch) -> np.ndarray:
+        """Point IDs of every chunk in a batch (computed once and kept on the batch)"""
+        if documents.point_ids is None:
+            documents.point_ids = np.fromiter(
+                (VectorProcessor.create_point_id(pk, chunk_index)
+                 for pk, chunk_index in zip(documents.pks, documents.chunk_indices.tolist())),
+                dtype=np.uint64, count=len(documents))
+        return documents.point_ids
+
+    @staticmethod
+    def create_payload(
         pk_value: Any,
         chunk_index: int,
         row_index: int,
         text: str,
-        vector: np.ndarray,
-        source_row: Any  # Can be Dict or JSON string
-    ) -> PointStruct:
-        """Create PointStruct for Qdrant
-
-        Args:
-            source_row: Source row data. Can be a dict or JSON string for type safety.
+        source_row: Any,
+        content_hash: Optional[str] = None,
+        fields: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Payload stored with each point
+
+        `fields` are source columns copied as top-level keys so they can be
+        indexed and filtered on; they never replace the keys below.
         """
-        point_id = VectorProcessor.create_point_id(pk_value, chunk_index)
+        payload = dict(fields) if fields else {}
+        payload.update({
+            "text": text,
+            "pk": pk_value,
+            "chunk_index": chunk_index,
+            "row_index": row_index,
+            "source_row": source_row
+        })
+        if content_hash:
+            payload["content_hash"] = content_hash
+        return payload
 
-        return PointStruct(
-            id=point_id,
-            vector=vector.tolist(),
-            payload={
-                "text": text,
-                "pk": pk_value,
-                "chunk_index": chunk_index,
-                "row_index": row_index,
-                "source_row": source_row
-            }
-        )
+    @staticmethod
+    def payload_value(value: Any) -> Any:
+        """Source value as a JSON-native payload value (numpy scalars, NaN, timestamps)"""
+        if value is None or isinstance(value, (bool, int, str)):
+            return value
+        if isinstance(value, np.generic):
+            value = value.item()
+        if isinstance(value, float):
+            return None if value != value else value
+        try:
+            if pd.isna(value):  # NaT, pd.NA
+                return None
+        except (TypeError, ValueError):
+            pass
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value if isinstance(value, (bool, int, float, str)) else str(value)
 
 
 class BatchProcessor:
-    """Batch processing for large datasets"""
-
-    def __init__(self, qdrant_service: QdrantService, batch_size: int = 64):
+    """Batch processing for large datasets
+
+    Safe to share between threads: the pipeline runs several upsert workers
+    against one processor. Batches are split by point count and by estimated
+    request size (`max_batch_bytes`, 0 = no limit). With `wait=False` Qdrant
+    acknowledges a write once it is queued, so workers are not bound by
+    indexing latency; call `barrier()` after the last batch to wait until
+    everything is applied on every shard. Transport and server errors are
+    retried with exponential backoff and then fail the batch; a request
+    Qdrant rejects (4xx) is bisected so a single bad point does not sink
+    its batch. `retries`, `splits`, `points_sent` and `bytes_sent`
+    (estimated request bytes of the points written) accumulate over the
+    processor's lifetime.
+
+    With `adaptive=True` the point count per request follows the request
+    latency (additive-increase/multiplicative-decrease): it shrinks when a
+    request takes longer than TARGET_LATENCY or has to be retried, and grows
+    while full batches come back in under half of it, between
+    MIN_ADAPTIVE_BATCH and `max_batch_size`. The byte cap still applies.
+    """
+
+    # Rough per-point JSON overhead (ID, keys, numbers) on top of text and vector
+    POINT_OVERHEAD_BYTES = 256
+    # Adaptive batch sizing: seconds per request to aim for and the smallest batch
+    TARGET_LATENCY = 1.0
+    MIN_ADAPTIVE_BATCH = 16
+
+    def __init__(
+        self,
+        qdrant_service: QdrantService,
+        batch_size: int = 64,
+        max_batch_bytes: int = 0,
+        wait: bool = True,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        adaptive: bool = False,
+        max_batch_size: int = 0
+    ):
         self.qdrant_service = qdrant_service
         self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.wait = wait
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.adaptive = adaptive
+        self.max_batch_size = max(max_batch_size, batch_size)
+        self.retries = 0
+        self.splits = 0
+        self.bytes_sent = 0
+        self.points_sent = 0
+        self.requests = 0
+        self.request_time = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def estimate_point_bytes(documents: DocumentBatch, dimension: int) -> np.ndarray:
+        """Approximate serialized size of each point (vector floats as JSON text)"""
+        row_bytes = np.fromiter((len(row) for row in documents.source_rows), dtype=np.int64,
+                                count=len(documents.source_rows))
+        text_bytes = np.fromiter((len(text.encode("utf-8")) for text in documents.texts), dtype=np.int64,
+                                 count=len(documents))
+        return (text_bytes + row_bytes[documents.row_offsets]
+                + dimension * 12 + BatchProcessor.POINT_OVERHEAD_BYTES)
+
+    def _next_end(self, sizes: np.ndarray, start: int) -> int:
+        """End of the batch starting at `start`, bounded by batch_size and max_batch_bytes"""
+        end = min(start + self.batch_size, len(sizes))
+        if not self.max_batch_bytes:
+            return end
+        size = 0
+        for i in range(start, end):
+            if i > start and size + sizes[i] > self.max_batch_bytes:
+                return i
+            size += sizes[i]
+        return end
+
+    def _adapt(self, points: int, latency: Optional[float]) -> None:
+        """Resize batches after a request (`latency` None = it had to be retried); caller holds the lock"""
+        if latency is None:
+            size = self.batch_size * 0.5
+        elif latency > self.TARGET_LATENCY:
+            size = self.batch_size * 0.7
+        elif latency < self.TARGET_LATENCY / 2 and points >= self.batch_size:
+            size = self.batch_size * 1.25 + 1
+        else:
+            return
+        self.batch_size = int(min(self.max_batch_size, max(self.MIN_ADAPTIVE_BATCH, size)))
+
+    def _send(self, collection_name: str, points: List[PointStruct], wait: Optional[bool] = None) -> None:
+        """Upsert with retry and exponential backoff; bisect batches Qdrant rejects"""
+        wait = self.wait if wait is None else wait
+        error = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                started = time.time()
+                self.qdrant_service.upsert_vectors(collection_name, points, wait=wait)
+                latency = time.time() - started
+                with self._lock:
+                    self.requests += 1
+                    self.request_time += latency
+                    if self.adaptive:
+                        self._adapt(len(points), latency)
+                return
+            except VectorDatabaseError as e:
+                error = e
+                if e.rejected:
+                    # Sending the same points again gets the same answer
+                    break
+                if attempt < self.max_retries:
+                    with self._lock:
+                        self.retries += 1
+                        if self.adaptive:
+                            self._adapt(len(points), None)
+                    time.sleep(self.retry_backoff * (2 ** attempt))
+
+        if not error.rejected:
+            # Qdrant unreachable or failing: smaller requests would not help
+            raise VectorDatabaseError(f"Upsert failed after {self.max_retries} retries: {error}",
+                                      status_code=error.status_code)
+        if len(points) == 1:
+            raise VectorDatabaseError(f"Point {points[0].id} rejected: {error}", status_code=error.status_code)
+
+        with self._lock:
+            self.splits += 1
+        middle = len(points) // 2
+        self._send(collection_name, points[:middle], wait)
+        self._send(collection_name, points[middle:], wait)
 
     def process_batches(
         self,
         collection_name: str,
-        documents: List[Dict[str, Any]],
+        documents: DocumentBatch,
         embeddings: np.ndarray,
         progress_callback: Optional[callable] = None
     ) -> Tuple[int, float]:
@@ -208,46 +697,102 @@ class BatchProcessor:
         total = len(documents)
         processed = 0
         start_time = time.time()
-
-        for i in range(0, total, self.batch_size):
-            batch_docs = documents[i:i + self.batch_size]
-            batch_embeddings = embeddings[i:i + self.batch_size]
-
-            # Create points for this batch
-            points = []
-            for doc, embedding in zip(batch_docs, batch_embeddings):
-                point = VectorProcessor.create_point_struct(
-                    pk_value=doc["pk"],
-                    chunk_index=doc["chunk_index"],
-                    row_index=doc["row_index"],
-                    text=doc["text"],
-                    vector=embedding,
-                    source_row=doc.get("source_row", "{}")  # JSON string, default to empty JSON
+        dimension = embeddings.shape[1] if len(embeddings) else 0
+        point_ids = VectorProcessor.create_point_ids(documents)
+        hashes = documents.content_hashes
+        sizes = self.estimate_point_bytes(documents, dimension)
+
+        begin = 0
+        while begin < total:
+            # Sized per batch: adaptive runs resize between requests
+            end = self._next_end(sizes, begin)
+            # Create points for this batch straight from the columns
+            points = [
+                PointStruct(
+                    id=int(point_ids[i]),
+                    vector=embeddings[i].tolist(),
+                    payload=VectorProcessor.create_payload(
+                        pk_value=documents.pks[i],
+                        chunk_index=int(documents.chunk_indices[i]),
+                        row_index=int(documents.row_indices[i]),
+                        text=documents.texts[i],
+                        source_row=documents.source_row(i),  # Shared per-row JSON string
+                        content_hash=hashes[i] if hashes is not None else None,
+                        fields=documents.row_fields_of(i)
+                    )
                 )
-                points.append(point)
+                for i in range(begin, end)
+            ]
 
             # Upsert batch
-            self.qdrant_service.upsert_vectors(collection_name, points)
-            processed += len(batch_docs)
+            self._send(collection_name, points)
+            processed += end - begin
+            if points:
+                with self._lock:
+                    self.points_sent += len(points)
+                    self.bytes_sent += int(sizes[begin:end].sum())
 
             # Call progress callback if provided
             if progress_callback:
                 progress_callback(processed, total, time.time() - start_time)
+            begin = end
+
+        return processed, time.time() - start_time
 
-        elapsed_time = time.time() - start_time
-        print(f"[DEBUG] BatchProcessor - start_time: {start_time}, end_time: {time.time()}, elapsed: {elapsed_time}")
-        return processed, elapsed_time
+    def barrier(self, collection_name: str) -> int:
+        """Wait until all queued (wait=False) writes are applied on every shard
+
+        Returns how many points sent in this run are missing from the
+        collection afterwards (0 = all accounted for). An asynchronous write
+        Qdrant accepted but could not apply shows up here: the exact count
+        must be at least the number of points sent, since every point ID
+        of a run is distinct. Duplicate source PKs also lower the count, and
+        points already in an existing collection can hide a shortfall.
+        """
+        if self.wait or not self.points_sent:
+            return 0
+        self.qdrant_service.flush_writes(collection_name)
+        return max(0, self.points_sent - self.qdrant_service.count_points(collection_name))
+
+    @property
+    def average_latency(self) -> Optional[float]:
+        """Mean seconds per successful upsert request"""
+        with self._lock:
+            return self.request_time / self.requests if self.requests else None
 
 
 class VectorDatabaseError(Exception):
-    """Vector database operation error"""
-    pass
+    """Vector database operation error
+
+    `status_code` is the HTTP status of Qdrant's answer when there was one.
+    `rejected` tells a request Qdrant refused (4xx, e.g. a malformed point or
+    a payload too large) from transport errors, timeouts and server errors.
+    """
+
+    # 4xx answers that say nothing about the request itself
+    RETRYABLE_STATUS = {408, 429}
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @staticmethod
+    def status_of(error: Exception) -> Optional[int]:
+        """HTTP status of a qdrant_client error (UnexpectedResponse), if any"""
+        status = getattr(error, 'status_code', None)
+        return status if isinstance(status, int) else None
+
+    @property
+    def rejected(self) -> bool:
+        return (self.status_code is not None and 400 <= self.status_code < 500
+                and self.status_code not in self.RETRYABLE_STATUS)
 
 
 class QdrantServiceFactory:
     """Factory for creating Qdrant services"""
 
     @staticmethod
-    def create_service(host: str, port: int, api_key: Optional[str] = None) -> VectorDatabaseInterface:
-        """Create Qdrant service instance"""
-        return QdrantService(host, port, api_key)
\ No newline at end of file
+    def create_service(host: str, port: int, api_key: Optional[str] = None,
+                       location: Optional[str] = None) -> VectorDatabaseInterface:
+        """Create Qdrant service instance (`location`: ":memory:" or a path for local mode)"""
+        return QdrantService(host, port, api_key, location)
\ No newline at end of file
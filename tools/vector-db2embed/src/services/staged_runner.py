@@ -0,0 +1,202 @@
+"""Concurrent stage runner: stages run in worker threads connected by bounded queues"""
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+_DONE = object()
+_POLL_INTERVAL = 0.1
+
+
+class Stage:
+    """One pipeline stage
+
+    `fn(item)` returns an iterable of items passed to the next stage.
+    `measure(item)` converts an output item to work units (rows, texts, vectors)
+    for throughput reporting.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Any], Iterable[Any]],
+        workers: int = 1,
+        measure: Optional[Callable[[Any], int]] = None
+    ):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.measure = measure or (lambda item: 1)
+        self.input: Optional[queue.Queue] = None
+        self.units = 0
+        self.busy_time = 0.0
+        self._remaining_workers = self.workers
+        self._occupancy_sum = 0.0
+        self._occupancy_samples = 0
+        self._lock = threading.Lock()
+
+    def record(self, units: int, busy: float) -> None:
+        with self._lock:
+            self.units += units
+            self.busy_time += busy
+
+    def worker_finished(self) -> bool:
+        """Return True when the last worker of this stage finished"""
+        with self._lock:
+            self._remaining_workers -= 1
+            return self._remaining_workers == 0
+
+    def stats(self, elapsed: float) -> Dict[str, Any]:
+        occupancy = None
+        if self.input is not None and self.input.maxsize:
+            occupancy = self.input.qsize() / self.input.maxsize
+            self._occupancy_sum += occupancy
+            self._occupancy_samples += 1
+
+        with self._lock:
+            units, busy = self.units, self.busy_time
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "units": units,
+            "busy_time": busy,
+            # Capacity if every worker were kept busy, and actual wall-clock throughput
+            "busy_rate": units / busy * self.workers if busy > 0 else 0.0,
+            "wall_rate": units / elapsed if elapsed > 0 else 0.0,
+            # Share of the run its workers spent working; the busiest stage limits throughput
+            "utilization": min(busy / (elapsed * self.workers), 1.0) if elapsed > 0 else 0.0,
+            "queue_occupancy": occupancy,
+            "avg_queue_occupancy": (self._occupancy_sum / self._occupancy_samples
+                                    if self._occupancy_samples else None),
+        }
+
+
+class StageFailure(Exception):
+    """Wraps the first exception raised by any stage"""
+
+    def __init__(self, stage: str, error: Exception):
+        super().__init__(str(error))
+        self.stage = stage
+        self.error = error
+
+
+class StagedRunner:
+    """Runs a source iterator and a chain of stages concurrently
+
+    Each stage reads from a bounded input queue, so a slow stage applies
+    back-pressure upstream instead of letting memory grow. End-to-end time
+    approaches the time of the slowest stage.
+    """
+
+    def __init__(self, source: Iterable[Any], source_stage: Stage, stages: List[Stage], queue_size: int = 4):
+        self.source = source
+        self.source_stage = source_stage
+        self.stages = stages
+        for stage in stages:
+            stage.input = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._failure: Optional[StageFailure] = None
+        self._failure_lock = threading.Lock()
+        self._start_time = 0.0
+
+    def _fail(self, stage: str, error: Exception) -> None:
+        with self._failure_lock:
+            if self._failure is None:
+                self._failure = StageFailure(stage, error)
+        self._stop.set()
+
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue) -> Any:
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _run_source(self) -> None:
+        stage = self.source_stage
+        output = self.stages[0].input if self.stages else None
+        iterator = iter(self.source)
+        try:
+            while not self._stop.is_set():
+                t0 = time.time()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                stage.record(stage.measure(item), time.time() - t0)
+                if output is not None and not self._put(output, item):
+                    return
+        except Exception as e:
+            self._fail(stage.name, e)
+            return
+        if output is not None:
+            self._put(output, _DONE)
+
+    def _run_worker(self, index: int) -> None:
+        stage = self.stages[index]
+        output = self.stages[index + 1].input if index + 1 < len(self.stages) else None
+        try:
+            while not self._stop.is_set():
+                item = self._get(stage.input)
+                if item is _DONE:
+                    # Let sibling workers see the end marker too
+                    self._put(stage.input, _DONE)
+                    break
+                t0 = time.time()
+                results = list(stage.fn(item))
+                stage.record(sum(stage.measure(r) for r in results), time.time() - t0)
+                if output is not None:
+                    for result in results:
+                        if not self._put(output, result):
+                            return
+        except Exception as e:
+            self._fail(stage.name, e)
+            return
+        if stage.worker_finished() and output is not None:
+            self._put(output, _DONE)
+
+    def start(self) -> None:
+        self._start_time = time.time()
+        self._threads = [threading.Thread(target=self._run_source, name=f"stage-{self.source_stage.name}",
+                                          daemon=True)]
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                self._threads.append(threading.Thread(target=self._run_worker, args=(index,),
+                                                      name=f"stage-{stage.name}-{n}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait up to `timeout` seconds; return True once every thread finished"""
+        deadline = None if timeout is None else time.time() + timeout
+        for thread in self._threads:
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            thread.join(remaining)
+            if thread.is_alive():
+                return False
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def raise_if_failed(self) -> None:
+        if self._failure is not None:
+            raise self._failure
+
+    def elapsed(self) -> float:
+        return time.time() - self._start_time if self._start_time else 0.0
+
+    def stats(self) -> List[Dict[str, Any]]:
+        elapsed = self.elapsed()
+        return [stage.stats(elapsed) for stage in [self.source_stage] + self.stages]
@@ -1,11 +1,19 @@
 """Text processing and chunking service"""
 import re
 import json
-from typing import List, Dict, Any, Optional, Tuple
+import multiprocessing as mp
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from abc import ABC, abstractmethod
 from jinja2 import Template, TemplateError
+import numpy as np
 import pandas as pd
 
+from src.services.document_batch import DocumentBatch
+
 
 class TextProcessorInterface(ABC):
     """Abstract interface for text processing"""
@@ -17,9 +25,11 @@ class TextProcessorInterface(ABC):
         template: str,
         pk_column: str,
         max_chars: int = 1000,
-        strip_whitespace: bool = True
-    ) -> List[Dict[str, Any]]:
-        """Build text documents from DataFrame"""
+        strip_whitespace: bool = True,
+        processes: int = 1,
+        token_chunker: Optional["TokenChunker"] = None
+    ) -> DocumentBatch:
+        """Build text documents (one entry per chunk) from DataFrame"""
         pass
 
 
@@ -76,20 +86,207 @@ class TextChunker:
         return chunks
 
 
+class TokenChunker:
+    """Chunking measured in tokens of the embedding model's fast tokenizer
+
+    Text is split into sentences (Western punctuation, Korean sentence
+    endings at line breaks, paragraph breaks) and sentences are packed
+    greedily up to the token budget, keeping the original text including
+    punctuation. Consecutive chunks share up to `overlap_tokens` of
+    trailing whole sentences. Sentences longer than the budget are cut at
+    token boundaries. All sentences of a frame are tokenized in batches.
+    """
+
+    _SENTENCE_BREAK = re.compile(
+        r'(?<=[.!?。！？…])\s+'          # punctuation followed by whitespace
+        r'|(?<=[.!?])(?=[가-힣])'         # missing space after punctuation in Korean text
+        r'|(?<=[다요죠까니])[ \t]*\n\s*'  # Korean sentence endings at line breaks
+        r'|\n\s*\n\s*'                   # paragraph breaks
+    )
+    TOKENIZE_BATCH = 1024
+
+    def __init__(self, tokenizer, max_tokens: int, overlap_tokens: int = 0, prefix: str = ""):
+        if not getattr(tokenizer, 'is_fast', False):
+            raise TextProcessingError("Token chunking requires a fast tokenizer")
+        self.tokenizer = tokenizer
+        # Room taken by special tokens ([CLS]/[SEP]) and the passage prefix
+        self.reserved_tokens = tokenizer.num_special_tokens_to_add(pair=False)
+        if prefix:
+            self.reserved_tokens += len(tokenizer(prefix, add_special_tokens=False)['input_ids'])
+        self.max_tokens = max_tokens
+        self.budget = max(1, max_tokens - self.reserved_tokens)
+        self.overlap_tokens = max(0, min(int(overlap_tokens), self.budget // 2))
+
+    def split_sentences(self, text: str) -> List[Tuple[int, int]]:
+        """Sentence spans (start, end) without surrounding whitespace"""
+        spans = []
+        start = 0
+        for match in self._SENTENCE_BREAK.finditer(text):
+            spans.append((start, match.start()))
+            start = match.end()
+        spans.append((start, len(text)))
+        result = []
+        for begin, end in spans:
+            segment = text[begin:end]
+            stripped = segment.strip()
+            if stripped:
+                begin += len(segment) - len(segment.lstrip())
+                result.append((begin, begin + len(stripped)))
+        return result
+
+    def _tokenize(self, texts: List[str]) -> Tuple[List[List[int]], List[List[Tuple[int, int]]]]:
+        """Token IDs and character offsets, in batches"""
+        ids, offsets = [], []
+        for i in range(0, len(texts), self.TOKENIZE_BATCH):
+            encoded = self.tokenizer(
+                texts[i:i + self.TOKENIZE_BATCH],
+                add_special_tokens=False,
+                return_offsets_mapping=True,
+                return_attention_mask=False,
+                return_token_type_ids=False
+            )
+            ids.extend(encoded['input_ids'])
+            offsets.extend(encoded['offset_mapping'])
+        return ids, offsets
+
+    def chunk_texts(self, texts: List[str]) -> List[List[str]]:
+        """Chunk many texts at once; returns the chunks of each text"""
+        return self.chunk_texts_counted(texts)[0]
+
+    def chunk_texts_counted(self, texts: List[str]) -> Tuple[List[List[str]], int]:
+        """Like chunk_texts, plus the encoder tokens of all chunks (special tokens and prefix included)"""
+        spans = [self.split_sentences(text) for text in texts]
+        sentences = [text[begin:end] for text, row_spans in zip(texts, spans) for begin, end in row_spans]
+        ids, offsets = self._tokenize(sentences)
+
+        result = []
+        tokens = 0
+        k = 0
+        for text, row_spans in zip(texts, spans):
+            pieces = []
+            for begin, _ in row_spans:
+                pieces.extend(self._pieces(begin, ids[k], offsets[k]))
+                k += 1
+            chunks = self._pack(pieces)
+            tokens += sum(piece[2] for chunk in chunks for piece in chunk) + len(chunks) * self.reserved_tokens
+            result.append([text[chunk[0][0]:chunk[-1][1]] for chunk in chunks])
+        return result, tokens
+
+    def _pieces(self, begin: int, ids: List[int], offsets: List[Tuple[int, int]]) -> List[Tuple[int, int, int]]:
+        """(start, end, tokens) of a sentence, cut at token boundaries if over budget"""
+        n = len(ids)
+        if n == 0:
+            return []
+        if n <= self.budget:
+            return [(begin + offsets[0][0], begin + offsets[-1][1], n)]
+        pieces = []
+        step = self.budget - self.overlap_tokens
+        for i in range(0, n, step):
+            j = min(i + self.budget, n)
+            pieces.append((begin + offsets[i][0], begin + offsets[j - 1][1], j - i))
+            if j == n:
+                break
+        return pieces
+
+    def _pack(self, pieces: List[Tuple[int, int, int]]) -> List[List[Tuple[int, int, int]]]:
+        """Greedily pack pieces into chunks of at most `budget` tokens with overlap"""
+        chunks = []
+        current, tokens = [], 0
+        for piece in pieces:
+            if current and tokens + piece[2] > self.budget:
+                chunks.append(current)
+                # Carry trailing whole pieces that fit in the overlap
+                carry, carried = [], 0
+                for previous in reversed(current):
+                    if carried + previous[2] > self.overlap_tokens:
+                        break
+                    carry.insert(0, previous)
+                    carried += previous[2]
+                while carry and carried + piece[2] > self.budget:
+                    carried -= carry.pop(0)[2]
+                current, tokens = carry, carried
+            current.append(piece)
+            tokens += piece[2]
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """Tokens each text occupies in the encoder, including special tokens and prefix"""
+        ids, _ = self._tokenize(list(texts))
+        return [len(token_ids) + self.reserved_tokens for token_ids in ids]
+
+
 class TemplateRenderer:
     """Jinja2 template rendering utilities"""
 
+    # Only plain {{ column }} placeholders (no filters, expressions, tags or comments)
+    _PLACEHOLDER = re.compile(r'\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}')
+    _JINJA_SYNTAX = re.compile(r'\{[{%#]|[}%#]\}')
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def compile(template_str: str) -> Template:
+        """Parse and compile a template once; later calls reuse the compiled template"""
+        try:
+            return Template(template_str)
+        except TemplateError as e:
+            raise TextProcessingError(f"Template rendering failed: {e}")
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def simple_fields(template_str: str) -> Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+        """Split a plain `{{column}}` template into (literals, columns), or None
+
+        literals has one more entry than columns; the rendered text is
+        literals[0] + col[0] + literals[1] + ... + literals[-1].
+        """
+        parts = TemplateRenderer._PLACEHOLDER.split(template_str)
+        literals, columns = parts[0::2], tuple(parts[1::2])
+        # Jinja drops a single trailing newline (keep_trailing_newline=False)
+        literals[-1] = re.sub(r'\r?\n$', '', literals[-1])
+        literals = tuple(literals)
+        if not columns or any(TemplateRenderer._JINJA_SYNTAX.search(lit) for lit in literals):
+            return None
+        return literals, columns
+
     @staticmethod
     def render_template(template_str: str, row_data: Dict[str, Any]) -> str:
         """Render Jinja2 template with row data"""
         try:
-            template = Template(template_str)
-            return template.render(**row_data)
+            return TemplateRenderer.compile(template_str).render(**row_data)
+        except TextProcessingError:
+            raise
         except TemplateError as e:
             raise TextProcessingError(f"Template rendering failed: {e}")
         except Exception as e:
             raise TextProcessingError(f"Unexpected template error: {e}")
 
+    @staticmethod
+    def render_frame(template_str: str, df: pd.DataFrame) -> Optional[pd.Series]:
+        """Render a simple template for all rows with vectorized string ops
+
+        Values are formatted with str() exactly as Jinja would. Returns None
+        when the template needs Jinja (filters, tags) or names a missing column.
+        """
+        fields = TemplateRenderer.simple_fields(template_str)
+        if fields is None:
+            return None
+        literals, columns = fields
+        if any(column not in df.columns for column in columns):
+            return None
+
+        rendered = pd.Series(literals[0], index=df.index, dtype=object)
+        for column, literal in zip(columns, literals[1:]):
+            values = df[column]
+            # astype(str) matches str() except for datetimes (date-only formatting)
+            if pd.api.types.is_datetime64_any_dtype(values):
+                values = values.map(str)
+            else:
+                values = values.astype(str)
+            rendered = rendered + values + literal
+        return rendered
+
     @staticmethod
     def validate_template(template_str: str, sample_data: Dict[str, Any]) -> bool:
         """Validate template with sample data"""
@@ -103,76 +300,200 @@ class TemplateRenderer:
 class TextProcessor(TextProcessorInterface):
     """Main text processing implementation"""
 
+    # Frames smaller than this are rendered in-process even when processes > 1
+    PARALLEL_MIN_ROWS = 20000
+    # Whitespace cleanup that keeps line and paragraph breaks (\r counts as horizontal)
+    _LINE_WHITESPACE = [
+        (r'[^\S\n]+', ' '),
+        (r' ?\n(?: ?\n)+ ?', '\n\n'),
+        (r' ?\n ?', '\n'),
+    ]
+
+    # Render pools by size, with the number of render calls using each
+    _pools: Dict[int, ProcessPoolExecutor] = {}
+    _pool_users: Dict[int, int] = {}
+    _pool_lock = threading.Lock()
+
     def __init__(self):
         self.chunker = TextChunker()
         self.renderer = TemplateRenderer()
 
+    @classmethod
+    @contextmanager
+    def _use_pool(cls, processes: int) -> Iterator[ProcessPoolExecutor]:
+        """Process pool of `processes` workers shared by all processors
+
+        Workers are spawned, not forked: the parent is threaded (Streamlit,
+        torch) and a forked child can deadlock on a lock held by another
+        thread. Pools of other sizes are shut down once no render call is
+        using them, so a job changing the setting never breaks another
+        job's render stage.
+        """
+        with cls._pool_lock:
+            pool = cls._pools.get(processes)
+            if pool is None:
+                pool = cls._pools[processes] = ProcessPoolExecutor(max_workers=processes,
+                                                                   mp_context=mp.get_context("spawn"))
+            cls._pool_users[processes] = cls._pool_users.get(processes, 0) + 1
+            for size in [size for size in cls._pools if size != processes and not cls._pool_users.get(size)]:
+                cls._pools.pop(size).shutdown(wait=False)
+        try:
+            yield pool
+        finally:
+            with cls._pool_lock:
+                cls._pool_users[processes] -= 1
+
     def build_text_documents(
         self,
         df: pd.DataFrame,
         template: str,
         pk_column: str,
         max_chars: int = 1000,
-        strip_whitespace: bool = True
-    ) -> List[Dict[str, Any]]:
-        """Build text documents from DataFrame with chunking"""
+        strip_whitespace: bool = True,
+        processes: int = 1,
+        token_chunker: Optional[TokenChunker] = None
+    ) -> DocumentBatch:
+        """Build text documents from DataFrame with chunking
+
+        Chunks are limited to `max_chars` characters, or to the model's token
+        budget when a `token_chunker` is given.
+
+        With `processes` > 1, large frames are split into row ranges that are
+        rendered and chunked in a process pool (for CPU-heavy Jinja templates).
+        """
         if df.empty:
-            return []
+            return DocumentBatch.empty()
 
         if pk_column not in df.columns:
             raise TextProcessingError(f"PK column '{pk_column}' not found in DataFrame")
 
-        documents = []
+        if processes > 1 and len(df) >= self.PARALLEL_MIN_ROWS:
+            step = -(-len(df) // processes)
+            parts = [df.iloc[i:i + step] for i in range(0, len(df), step)]
+            with self._use_pool(processes) as pool:
+                futures = [pool.submit(_build_part, part, template, pk_column, max_chars, strip_whitespace,
+                                       token_chunker)
+                           for part in parts]
+                return DocumentBatch.concat([future.result() for future in futures])
 
-        for row_index, row in df.iterrows():
-            try:
-                # Convert row to dict for template rendering
-                row_dict = row.to_dict()
+        return self._build(df, template, pk_column, max_chars, strip_whitespace, token_chunker)
 
-                # Render template
-                text = self.renderer.render_template(template, row_dict)
+    def _build(
+        self,
+        df: pd.DataFrame,
+        template: str,
+        pk_column: str,
+        max_chars: int,
+        strip_whitespace: bool,
+        token_chunker: Optional[TokenChunker] = None
+    ) -> DocumentBatch:
+        # Token chunking splits sentences at line and paragraph breaks, so
+        # those survive whitespace cleanup until the text is chunked
+        keep_lines = strip_whitespace and token_chunker is not None
+
+        # Plain {{column}} templates are rendered column-wise without Jinja
+        rendered = self.renderer.render_frame(template, df)
+        if rendered is not None and strip_whitespace:
+            if keep_lines:
+                for pattern, replacement in self._LINE_WHITESPACE:
+                    rendered = rendered.str.replace(pattern, replacement, regex=True)
+                rendered = rendered.str.strip()
+            else:
+                rendered = rendered.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+        # Rows as lightweight dicts (no per-row Series boxing)
+        records = df.to_dict('records')
 
-                if strip_whitespace:
-                    text = self._clean_whitespace(text)
+        # Pass 1: render text per row
+        rows = []  # (row_index, row_dict, text)
+        for position, (row_index, row_dict) in enumerate(zip(df.index, records)):
+            try:
+                if rendered is not None:
+                    text = rendered.iat[position]
+                else:
+                    # Render template
+                    text = self.renderer.render_template(template, row_dict)
+                    if strip_whitespace:
+                        text = self._clean_whitespace(text, keep_lines)
 
                 if not text.strip():
                     continue  # Skip empty texts
 
+                rows.append((row_index, row_dict, text))
+            except Exception as e:
+                # Log error but continue processing other rows
+                print(f"Error processing row {row_index}: {e}")
+                continue
+
+        # Pass 2: chunk text (token chunking tokenizes the whole frame in batches)
+        tokens = None
+        if token_chunker is not None:
+            row_chunks, tokens = token_chunker.chunk_texts_counted([text for _, _, text in rows])
+            if strip_whitespace:
+                row_chunks = [[self._clean_whitespace(chunk) for chunk in chunks] for chunks in row_chunks]
+        else:
+            row_chunks = [self.chunker.chunk_text(text, max_chars) for _, _, text in rows]
+
+        texts, pks, chunk_indices, row_indices, row_offsets, source_rows = [], [], [], [], [], []
+        for (row_index, row_dict, _), chunks in zip(rows, row_chunks):
+            try:
+                if not chunks:
+                    continue
+
                 # Get PK value
                 pk_value = row_dict[pk_column]
 
-                # Chunk text
-                chunks = self.chunker.chunk_text(text, max_chars)
-
-                # Create document for each chunk
-                for chunk_index, chunk in enumerate(chunks):
-                    # Convert source_row to JSON string for type safety
-                    # This prevents numpy/pandas type serialization issues with Qdrant
-                    source_row_json = json.dumps(row_dict, default=str, ensure_ascii=False)
+                # Convert source_row to JSON string for type safety, once per row
+                # This prevents numpy/pandas type serialization issues with Qdrant
+                source_row_json = json.dumps(row_dict, default=str, ensure_ascii=False)
+                row_offset = len(source_rows)
+                source_rows.append(source_row_json)
 
-                    documents.append({
-                        "text": chunk,
-                        "pk": pk_value,
-                        "chunk_index": chunk_index,
-                        "row_index": int(row_index),
-                        "source_row": source_row_json
-                    })
+                # Add one entry per chunk
+                texts.extend(chunks)
+                pks.extend([pk_value] * len(chunks))
+                chunk_indices.extend(range(len(chunks)))
+                row_indices.extend([int(row_index)] * len(chunks))
+                row_offsets.extend([row_offset] * len(chunks))
 
             except Exception as e:
                 # Log error but continue processing other rows
                 print(f"Error processing row {row_index}: {e}")
                 continue
 
-        return documents
-
-    def _clean_whitespace(self, text: str) -> str:
-        """Clean excessive whitespace from text"""
+        return DocumentBatch(
+            texts=texts,
+            pks=pks,
+            chunk_indices=np.asarray(chunk_indices, dtype=np.int32),
+            row_indices=np.asarray(row_indices, dtype=np.int64),
+            row_offsets=np.asarray(row_offsets, dtype=np.int64),
+            source_rows=source_rows,
+            tokens=tokens
+        )
+
+    def _clean_whitespace(self, text: str, keep_lines: bool = False) -> str:
+        """Clean excessive whitespace from text
+
+        With `keep_lines`, only horizontal whitespace is collapsed; line
+        breaks become a single newline and blank-line runs one paragraph
+        break.
+        """
+        if keep_lines:
+            for pattern, replacement in self._LINE_WHITESPACE:
+                text = re.sub(pattern, replacement, text)
+            return text.strip()
         # Replace multiple whitespace with single space
         text = re.sub(r'\s+', ' ', text)
         # Remove leading/trailing whitespace
         return text.strip()
 
 
+def _build_part(df: pd.DataFrame, template: str, pk_column: str, max_chars: int,
+                strip_whitespace: bool, token_chunker: Optional[TokenChunker] = None) -> DocumentBatch:
+    """Process pool entry point (module level so it can be pickled)"""
+    return TextProcessor()._build(df, template, pk_column, max_chars, strip_whitespace, token_chunker)
+
+
 class TextProcessingError(Exception):
     """Text processing error"""
     pass
@@ -98,14 +98,49 @@ class AppSettings:
         'pk_col': 'id',
         'template_str': '{{title}} - {{description}}',
         'max_chars': 800,
+        'chunk_mode': 'chars',
+        'max_tokens': 0,
+        'chunk_overlap': 32,
         'strip_ws': True,
         'q_host': 'localhost',
         'q_port': 6333,
         'collection': 'collection_name',
+        'collection_profile': 'default',
+        'filter_fields': '',
         'batch_size': 64,
         'model': 'mE5-base',
         'preview_rows': 50,
-        'max_rows': 1000
+        'max_rows': 1000,
+        'streaming': False,
+        'fetch_size': 10000,
+        'db_arraysize': 1000,
+        'partition_column': '',
+        'partition_parallelism': 4,
+        'render_workers': 1,
+        'render_processes': 1,
+        'upsert_workers': 2,
+        'encode_processes': 0,
+        'encode_threads': 1,
+        'encode_pin': True,
+        'queue_size': 4,
+        'incremental': False,
+        'bulk_load': False,
+        'index_wait_timeout': 3600,
+        'embedding_cache': False,
+        'embedding_cache_dir': 'cache/embeddings',
+        'embedding_cache_gb': 10,
+        'embedding_dtype': 'float32',
+        'embedding_buffer': 'ram',
+        'embedding_buffer_dir': 'cache/buffers',
+        'artifact_dir': '',
+        'artifact_only': False,
+        'upsert_async': True,
+        'upsert_max_mb': 16,
+        'upsert_retries': 3,
+        'job_log_dir': 'logs/jobs',
+        'pushgateway_url': '',
+        'auto_tune': False,
+        'tuned_batch_sizes': {}
     }
 
     def __init__(self, config_manager: ConfigManagerInterface):
@@ -138,6 +173,13 @@ class AppSettings:
         """Save current settings"""
         return self.config_manager.save_settings(self._settings)
 
+    def save_key(self, key: str, value: Any) -> bool:
+        """Set one setting and save only it; other saved values stay as they are on disk"""
+        self._settings[key] = value
+        saved = self.config_manager.load_settings() or {}
+        saved[key] = value
+        return self.config_manager.save_settings(saved)
+
     def get_all(self) -> Dict[str, Any]:
         """Get all settings"""
         return self._settings.copy()
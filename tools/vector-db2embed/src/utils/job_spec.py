@@ -0,0 +1,157 @@
+"""Job specification files for headless pipeline runs"""
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+try:
+    import yaml
+    HAS_YAML = True
+except ImportError:
+    HAS_YAML = False
+
+from src.services.collection_profiles import parse_field_list, parse_field_spec
+from src.utils.config_manager import AppSettings
+
+
+class JobSpecError(Exception):
+    """Invalid job specification"""
+    pass
+
+
+class JobSpecLoader:
+    """Load and validate job spec files (YAML or JSON)
+
+    A job spec uses the same keys as the UI settings (see AppSettings.DEFAULT_SETTINGS);
+    missing optional keys fall back to those defaults.
+    """
+
+    REQUIRED_KEYS = [
+        'db_uri',
+        'sql',
+        'pk_col',
+        'template_str',
+        'model',
+        'collection',
+    ]
+    INT_KEYS = [
+        'max_chars',
+        'max_tokens',
+        'chunk_overlap',
+        'q_port',
+        'batch_size',
+        'max_rows',
+        'fetch_size',
+        'db_arraysize',
+        'partition_parallelism',
+        'render_workers',
+        'render_processes',
+        'upsert_workers',
+        'encode_processes',
+        'encode_threads',
+        'queue_size',
+        'upsert_max_mb',
+        'upsert_retries',
+        'index_wait_timeout',
+    ]
+
+    @staticmethod
+    def load(path: str, overrides: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Load spec file, apply key=value overrides and validate"""
+        if not os.path.exists(path):
+            raise JobSpecError(f"Job spec not found: {path}")
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                if path.endswith('.json'):
+                    spec = json.load(f)
+                elif HAS_YAML:
+                    spec = yaml.safe_load(f)
+                else:
+                    raise JobSpecError("PyYAML is required for YAML job specs")
+        except JobSpecError:
+            raise
+        except Exception as e:
+            raise JobSpecError(f"Failed to parse job spec: {e}")
+
+        if not isinstance(spec, dict):
+            raise JobSpecError("Job spec must be a mapping")
+
+        job = AppSettings.DEFAULT_SETTINGS.copy()
+        job.update(spec)
+        JobSpecLoader.apply_overrides(job, overrides)
+
+        JobSpecLoader.validate(job)
+        return job
+
+    @staticmethod
+    def apply_overrides(job: Dict[str, Any], overrides: Optional[List[str]]) -> None:
+        """Apply key=value overrides (values parsed as YAML scalars)"""
+        for item in overrides or []:
+            key, value = JobSpecLoader._parse_override(item)
+            job[key] = value
+
+    @staticmethod
+    def _parse_override(item: str):
+        if '=' not in item:
+            raise JobSpecError(f"Override must be key=value: {item}")
+        key, raw = item.split('=', 1)
+        value = yaml.safe_load(raw) if HAS_YAML else raw
+        return key.strip(), value
+
+    @staticmethod
+    def validate(job: Dict[str, Any]) -> None:
+        """Validate required keys and numeric fields"""
+        missing = [key for key in JobSpecLoader.REQUIRED_KEYS if not job.get(key)]
+        if missing:
+            raise JobSpecError(f"Missing required keys: {', '.join(missing)}")
+
+        for key in JobSpecLoader.INT_KEYS:
+            try:
+                job[key] = int(job[key])
+            except (KeyError, TypeError, ValueError):
+                raise JobSpecError(f"'{key}' must be an integer")
+
+        job['incremental'] = bool(job.get('incremental'))
+        job['bulk_load'] = bool(job.get('bulk_load'))
+        job['encode_pin'] = bool(job.get('encode_pin'))
+        job['embedding_cache'] = bool(job.get('embedding_cache'))
+        try:
+            job['embedding_cache_gb'] = float(job['embedding_cache_gb'])
+        except (KeyError, TypeError, ValueError):
+            raise JobSpecError("'embedding_cache_gb' must be a number")
+        job['upsert_async'] = bool(job.get('upsert_async'))
+        job['artifact_only'] = bool(job.get('artifact_only'))
+        if job['artifact_only'] and not job.get('artifact_dir'):
+            raise JobSpecError("'artifact_only' requires 'artifact_dir'")
+        job['job_log_dir'] = job.get('job_log_dir') or ''
+        job['partition_column'] = str(job.get('partition_column') or '').strip()
+        if job['partition_column'] and not re.match(r'^[A-Za-z_][A-Za-z0-9_$#]*$', job['partition_column']):
+            raise JobSpecError("'partition_column' must be a plain column name")
+        if job['partition_parallelism'] < 1:
+            raise JobSpecError("'partition_parallelism' must be at least 1")
+        job['auto_tune'] = bool(job.get('auto_tune'))
+        job['tuned_batch_sizes'] = job.get('tuned_batch_sizes') or {}
+        if not isinstance(job['tuned_batch_sizes'], dict):
+            raise JobSpecError("'tuned_batch_sizes' must be a mapping of model name to batch sizes")
+        job['pushgateway_url'] = job.get('pushgateway_url') or ''
+        if job['pushgateway_url'] and not str(job['pushgateway_url']).startswith(('http://', 'https://')):
+            raise JobSpecError("'pushgateway_url' must start with http:// or https://")
+
+        try:
+            for entry in parse_field_list(job.get('filter_fields')):
+                parse_field_spec(entry)
+        except ValueError as e:
+            raise JobSpecError(f"'filter_fields': {e}")
+
+        if job['embedding_dtype'] not in ('float32', 'float16'):
+            raise JobSpecError("'embedding_dtype' must be 'float32' or 'float16'")
+
+        if job['embedding_buffer'] not in ('ram', 'memmap'):
+            raise JobSpecError("'embedding_buffer' must be 'ram' or 'memmap'")
+
+        if job['chunk_mode'] not in ('chars', 'tokens'):
+            raise JobSpecError("'chunk_mode' must be 'chars' or 'tokens'")
+
+        if job['batch_size'] <= 0:
+            raise JobSpecError("'batch_size' must be positive")
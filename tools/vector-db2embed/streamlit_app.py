@@ -1,14 +1,15 @@
 """Clean, refactored Streamlit application for DB to Vector embedding"""
+import time
 import streamlit as st
 import pandas as pd
-import time
 from typing import Optional
 
 # Import our clean modules
 from src.model_management.embedding_model import EmbeddingModelFactory, ModelConfig
 from src.services.database_service import DatabaseServiceFactory, QueryValidator
-from src.services.qdrant_service import QdrantServiceFactory, BatchProcessor
+from src.services.qdrant_service import QdrantServiceFactory
 from src.services.text_processor import TextProcessorFactory
+from src.services.embedding_pipeline import EmbeddingPipeline, PipelineError
 from src.utils.config_manager import ConfigManagerFactory
 from src.components.ui_components import (
     DatabaseConfigComponent,
@@ -19,13 +20,19 @@ from src.components.ui_components import (
     CollectionInfoComponent,
     ProgressComponent,
     CollectionManagerComponent,
-    SettingsComponent
+    SettingsComponent,
+    PipelineProgressComponent,
+    TokenStatsComponent,
+    ModelRegistryComponent
 )
 
 
 class EmbeddingApp:
     """Main application controller"""
 
+    # Rows used for the token length distribution shown with the preview
+    TOKEN_STATS_ROWS = 2000
+
     def __init__(self):
         self.setup_page_config()
         self.initialize_services()
@@ -74,6 +81,7 @@ class EmbeddingApp:
 
             # Embedding model selection
             model_name, dimension = EmbeddingModelComponent.render(self.settings, self.model_factory)
+            ModelRegistryComponent.render()
 
             # Qdrant configuration
             q_host, q_port, collection = QdrantConfigComponent.render(self.settings)
@@ -88,14 +96,46 @@ class EmbeddingApp:
                 'pk_col': st.session_state.get('pk_col', 'id'),
                 'template_str': st.session_state.get('template_str', ''),
                 'max_chars': st.session_state.get('max_chars', 800),
+                'chunk_mode': st.session_state.get('chunk_mode', 'chars'),
+                'max_tokens': st.session_state.get('max_tokens', 0),
+                'chunk_overlap': st.session_state.get('chunk_overlap', 32),
                 'strip_ws': st.session_state.get('strip_ws', True),
                 'model': st.session_state.get('model', 'mE5-base'),
                 'q_host': st.session_state.get('q_host', 'localhost'),
                 'q_port': st.session_state.get('q_port', 6333),
                 'collection': st.session_state.get('collection', 'my_collection'),
+                'collection_profile': st.session_state.get('collection_profile', 'default'),
+                'filter_fields': st.session_state.get('filter_fields', ''),
                 'preview_rows': st.session_state.get('preview_rows', 50),
                 'max_rows': st.session_state.get('max_rows', 0),
-                'batch_size': st.session_state.get('batch_size', 64)
+                'batch_size': st.session_state.get('batch_size', 64),
+                'streaming': st.session_state.get('streaming', False),
+                'fetch_size': st.session_state.get('fetch_size', 10000),
+                'partition_column': st.session_state.get('partition_column', ''),
+                'partition_parallelism': st.session_state.get('partition_parallelism', 4),
+                'render_workers': st.session_state.get('render_workers', 1),
+                'render_processes': st.session_state.get('render_processes', 1),
+                'upsert_workers': st.session_state.get('upsert_workers', 2),
+                'encode_processes': st.session_state.get('encode_processes', 0),
+                'encode_threads': st.session_state.get('encode_threads', 1),
+                'encode_pin': st.session_state.get('encode_pin', True),
+                'queue_size': st.session_state.get('queue_size', 4),
+                'incremental': st.session_state.get('incremental', False),
+                'bulk_load': st.session_state.get('bulk_load', False),
+                'embedding_cache': st.session_state.get('embedding_cache', False),
+                'embedding_cache_dir': st.session_state.get('embedding_cache_dir', 'cache/embeddings'),
+                'embedding_cache_gb': st.session_state.get('embedding_cache_gb', 10),
+                'embedding_dtype': st.session_state.get('embedding_dtype', 'float32'),
+                'embedding_buffer': st.session_state.get('embedding_buffer', 'ram'),
+                'embedding_buffer_dir': st.session_state.get('embedding_buffer_dir', 'cache/buffers'),
+                'artifact_dir': st.session_state.get('artifact_dir', ''),
+                'artifact_only': st.session_state.get('artifact_only', False),
+                'upsert_async': st.session_state.get('upsert_async', True),
+                'upsert_max_mb': st.session_state.get('upsert_max_mb', 16),
+                'upsert_retries': st.session_state.get('upsert_retries', 3),
+                'job_log_dir': st.session_state.get('job_log_dir', 'logs/jobs'),
+                'pushgateway_url': st.session_state.get('pushgateway_url', ''),
+                'auto_tune': st.session_state.get('auto_tune', False)
             }
 
             # Update settings with current values from session_state
@@ -150,19 +190,51 @@ class EmbeddingApp:
 
             # Execute query
             database_service = self.get_database_service()
-            df = database_service.execute_query(sql_query)
+            preview_rows = self.settings.get('preview_rows', 50)
+            if self.settings.get('streaming'):
+                # Read only the first chunk (enough for the token stats) instead of the whole result
+                chunks = database_service.iter_query(sql_query, max(preview_rows, self.TOKEN_STATS_ROWS))
+                try:
+                    df = next(chunks, None)
+                finally:
+                    chunks.close()
+                if df is None:
+                    df = pd.DataFrame()
+                summary = f"미리보기 성공: 처음 {min(len(df), preview_rows)}건 표시 (스트리밍: 전체 행 수는 세지 않음)"
+            else:
+                df = database_service.execute_query(sql_query)
+                summary = f"미리보기 성공: 총 {len(df)} rows 중 {min(len(df), preview_rows)}건 표시"
 
             # Display preview
-            preview_rows = self.settings.get('preview_rows', 50)
             table_slot.dataframe(df.head(preview_rows))
 
             with log:
-                st.success(f"미리보기 성공: 총 {len(df)} rows 중 {min(len(df), preview_rows)}건 표시")
+                st.success(summary)
+                self.render_token_stats(df)
 
         except Exception as e:
             with log:
                 st.error(f"미리보기 실패: {e}")
 
+    def render_token_stats(self, df: pd.DataFrame):
+        """Show chunk token lengths for the preview rows with the current settings"""
+        job = self.settings.get_all()
+        try:
+            chunker = EmbeddingPipeline.create_token_chunker(self.model_factory, job)
+            documents = self.text_processor.build_text_documents(
+                df=df.head(self.TOKEN_STATS_ROWS),
+                template=job['template_str'],
+                pk_column=job['pk_col'],
+                max_chars=job['max_chars'],
+                strip_whitespace=job['strip_ws'],
+                token_chunker=chunker if job.get('chunk_mode') == 'tokens' else None
+            )
+            lengths = chunker.count_tokens(documents.texts)
+        except Exception as e:
+            st.info(f"토큰 길이 분포를 계산하지 못했습니다: {e}")
+            return
+        TokenStatsComponent.render(lengths, chunker.max_tokens)
+
     def handle_embedding_process(self, log, table_slot):
         """Handle the complete embedding and upserting process"""
         # Validate inputs
@@ -174,228 +246,47 @@ class EmbeddingApp:
             st.error("DB URI, SQL, 컬렉션 이름을 입력하세요.")
             return
 
+        reporter = PipelineProgressComponent(log, table_slot, self.settings.get('preview_rows', 50))
         try:
-            # Step 1: Execute query and get data
-            with log:
-                st.info("🔍 데이터베이스에서 데이터 가져오는 중...")
-
-            database_service = self.get_database_service()
-            QueryValidator.validate_query(sql_query)
-            df = database_service.execute_query(sql_query)
-
-            # Apply max rows limit
-            max_rows = self.settings.get('max_rows', 0)
-            if max_rows > 0 and len(df) > max_rows:
-                df = df.head(max_rows)
-                with log:
-                    st.warning(f"최대 {max_rows}행만 처리합니다.")
-
-            # Display data
-            preview_rows = self.settings.get('preview_rows', 50)
-            table_slot.dataframe(df.head(preview_rows))
-
-            with log:
-                st.info(f"쿼리 완료: {len(df)} rows")
-
-            # Step 2: Process text documents
-            with log:
-                st.info("📝 텍스트 처리 및 청킹 중...")
-
-            documents = self.text_processor.build_text_documents(
-                df=df,
-                template=self.settings.get('template_str'),
-                pk_column=self.settings.get('pk_col'),
-                max_chars=self.settings.get('max_chars'),
-                strip_whitespace=self.settings.get('strip_ws')
-            )
-
-            if not documents:
-                st.error("처리된 텍스트가 없습니다. 템플릿이나 데이터를 확인하세요.")
-                return
-
-            with log:
-                st.info(f"텍스트 처리 완료: {len(documents)} 개 청크 생성")
-
-            # Step 3: Load embedding model
-            with log:
-                st.info("🤖 임베딩 모델 로딩 중...")
-
-            model_name = self.settings.get('model')
-            embedding_model = self.model_factory.create_model(model_name)
-            dimension = embedding_model.get_dimension()
-
-            with log:
-                st.info(f"모델 로딩 완료: {model_name} ({dimension}차원)")
-
-            # Step 4: Prepare Qdrant
-            with log:
-                st.info("🎯 Qdrant 컬렉션 준비 중...")
-
-            qdrant_service = self.get_qdrant_service()
-            created = qdrant_service.ensure_collection(collection, dimension)
-
-            with log:
-                if created:
-                    st.success(f"컬렉션 생성: {collection} (size={dimension}, distance=Cosine)")
-                else:
-                    st.info(f"컬렉션 존재: {collection}")
-
-            # Step 5: Generate embeddings and upsert
-            with log:
-                st.info("⚡ 임베딩 생성 및 업서트 중...")
-
-            # 전체 시간 측정 시작
-            total_start_time = time.time()
-
-            # Create two separate progress bars
-            col1, col2 = st.columns(2)
-            with col1:
-                st.write("🤖 **임베딩 생성**")
-                embedding_progress_bar = st.progress(0, text="준비 중...")
-                embedding_status = st.empty()
-
-            with col2:
-                st.write("📤 **Qdrant 업서트**")
-                upsert_progress_bar = st.progress(0, text="대기 중...")
-                upsert_status = st.empty()
-
-            # Prepare batch processor
-            batch_size = self.settings.get('batch_size', 64)
-            batch_processor = BatchProcessor(qdrant_service, batch_size)
-
-            # Generate embeddings in batches with progress
-            texts = [doc["text"] for doc in documents]
-            embeddings = []
-            total_texts = len(texts)
-
-            # Variables for time estimation
-            embedding_start_time = time.time()
-            avg_time_per_batch = None
-            batches_completed = 0
-            total_batches = (total_texts + batch_size - 1) // batch_size
-
-            for i in range(0, total_texts, batch_size):
-                batch_texts = texts[i:i + batch_size]
-                current_batch_size = len(batch_texts)
-                current_batch_num = batches_completed + 1
-
-                # Update embedding progress before processing
-                embedding_progress = i / total_texts
-                embedding_progress_bar.progress(embedding_progress, text=f"배치 {current_batch_num}/{total_batches}")
-
-                # Process batch (시간이 걸리는 실제 작업)
-                batch_start_time = time.time()
-                batch_embeddings = embedding_model.encode(batch_texts)
-                embeddings.extend(batch_embeddings)
-                batch_end_time = time.time()
-
-                # Update after processing with remaining time
-                completed_texts = i + current_batch_size
-                batches_completed += 1
-                embedding_progress = completed_texts / total_texts
-
-                # Calculate timing statistics
-                elapsed_time = time.time() - embedding_start_time
-                avg_time_per_batch = elapsed_time / batches_completed
-
-                if batches_completed < total_batches:
-                    remaining_batches = total_batches - batches_completed
-                    remaining_time = avg_time_per_batch * remaining_batches
-
-                    # Format time string
-                    if remaining_time < 60:
-                        time_str = f"{remaining_time:.1f}초"
-                    elif remaining_time < 3600:
-                        minutes = int(remaining_time // 60)
-                        seconds = int(remaining_time % 60)
-                        time_str = f"{minutes}분 {seconds}초"
-                    else:
-                        hours = int(remaining_time // 3600)
-                        minutes = int((remaining_time % 3600) // 60)
-                        time_str = f"{hours}시간 {minutes}분"
-
-                    progress_text = f"{completed_texts}/{total_texts} - 남은 시간: {time_str}"
-                    status_text = f"처리중: {completed_texts}/{total_texts} 텍스트 (남은 시간: {time_str})"
-                else:
-                    progress_text = f"{completed_texts}/{total_texts} - 완료"
-                    status_text = f"처리중: {completed_texts}/{total_texts} 텍스트"
-
-                embedding_progress_bar.progress(embedding_progress, text=progress_text)
-                embedding_status.info(status_text)
-
-            # Mark embedding as complete
-            embedding_progress_bar.progress(1.0, text="완료!")
-            embedding_status.success(f"✅ 임베딩 생성 완료: {total_texts}개 텍스트")
-
-            # Process in batches with progress updates
-            upsert_start_time = time.time()
-            def progress_callback(processed, total, elapsed):
-                upsert_progress = processed / total  # 0-100%
-
-                # Calculate remaining time for upsert
-                upsert_elapsed = time.time() - upsert_start_time
-                if processed > 0:
-                    avg_time_per_item = upsert_elapsed / processed
-                    remaining_items = total - processed
-                    remaining_time = avg_time_per_item * remaining_items
-
-                    # Format time string
-                    if remaining_time < 60:
-                        time_str = f"{remaining_time:.1f}초"
-                    elif remaining_time < 3600:
-                        minutes = int(remaining_time // 60)
-                        seconds = int(remaining_time % 60)
-                        time_str = f"{minutes}분 {seconds}초"
-                    else:
-                        hours = int(remaining_time // 3600)
-                        minutes = int((remaining_time % 3600) // 60)
-                        time_str = f"{hours}시간 {minutes}분"
-
-                    progress_text = f"{processed}/{total} - 남은 시간: {time_str}"
-                    status_text = f"처리중: {processed}/{total} 벡터 (남은 시간: {time_str})"
-                else:
-                    progress_text = f"{processed}/{total}"
-                    status_text = f"시작: {processed}/{total} 벡터"
-
-                upsert_progress_bar.progress(upsert_progress, text=progress_text)
-                upsert_status.info(status_text)
-
-            import numpy as np
-            embeddings_array = np.array(embeddings)
-            processed_count, batch_elapsed_time = batch_processor.process_batches(
-                collection_name=collection,
-                documents=documents,
-                embeddings=embeddings_array,
-                progress_callback=progress_callback
+            pipeline = EmbeddingPipeline(
+                database_service=self.get_database_service(),
+                text_processor=self.text_processor,
+                model_factory=self.model_factory,
+                qdrant_service=self.get_qdrant_service(),
+                reporter=reporter
             )
-
-            # 전체 소요 시간 계산 (임베딩 + 업서트)
-            total_elapsed_time = time.time() - total_start_time
-            embedding_time = upsert_start_time - embedding_start_time
-            upsert_time = time.time() - upsert_start_time
-
-            # Mark upsert as complete
-            upsert_progress_bar.progress(1.0, text="완료!")
-            upsert_status.success(f"✅ Qdrant 업서트 완료: {processed_count}개 벡터")
-
-            # Show final summary
-            st.success(f"🎉 전체 작업 완료! 총 {processed_count}건 처리")
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("임베딩 시간", f"{embedding_time:.1f}초")
-            with col2:
-                st.metric("업서트 시간", f"{upsert_time:.1f}초")
-            with col3:
-                st.metric("전체 시간", f"{total_elapsed_time:.1f}초")
-
+            stats = pipeline.run(self.settings.get_all())
+            if stats.get('tuning'):
+                self.save_tuning(stats['tuning'])
+            reporter.render_summary(stats)
+
+        except PipelineError as e:
+            if e.stage == "text":
+                st.error(str(e))
+            else:
+                st.error(f"처리 중 오류 발생: {e}")
         except Exception as e:
             st.error(f"처리 중 오류 발생: {e}")
 
+    def save_tuning(self, tuning):
+        """Remember the tuned batch sizes per model so the next run only probes around them"""
+        tuned = dict(self.settings.get('tuned_batch_sizes') or {})
+        tuned[tuning['model']] = {
+            'encode_batch_size': tuning['encode_batch_size'],
+            'encode_processes': tuning['encode_processes'],
+            'upsert_batch_size': tuning['upsert_batch_size'],
+            'encode_rate': tuning['encode_rate'],
+            'tuned_at': time.strftime('%Y-%m-%d %H:%M'),
+        }
+        # Unsaved sidebar values (DB URI, collection, ...) must not be written as a side effect
+        self.settings.save_key('tuned_batch_sizes', tuned)
+
     def get_database_service(self):
         """Get or create database service"""
         db_uri = self.settings.get('db_uri')
         if self.database_service is None or getattr(self.database_service, 'connection_uri', None) != db_uri:
-            self.database_service = DatabaseServiceFactory.create_service(db_uri)
+            self.database_service = DatabaseServiceFactory.create_service(
+                db_uri, self.settings.get('db_arraysize'))
         return self.database_service
 
     def get_qdrant_service(self):
@@ -1,14 +1,18 @@
-from fastapi import FastAPI, Header, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 import time
+import numpy as np
 from typing import Optional, List
 
 from .config import settings
-from .models import SearchRequest, SearchResponse, Hit, ModelSpec
-from .embeddings import embed_query
-from .qdrant_wrapper import query_points
+from .deadline import Deadline, DeadlineExceeded
+from .models import SearchRequest, SearchResponse, Hit, HitGroup, ModelSpec, EmbedRequest, EmbedResponse
+from .embeddings import embed_query, embed_batch
+from .qdrant_wrapper import query_points, query_point_groups
 from .embeddings_registry import PRESETS
+from .local_index import local_index
+from .replicas import replica_pool
 
 app = FastAPI(title="Vector Search WebAPI", version="0.1.0")
 
@@ -22,13 +26,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def _stamp_received_at(request: Request, call_next):
+    # 스레드풀 대기 시간까지 데드라인에 포함되도록 도착 시각 기록
+    request.state.received_at = time.monotonic()
+    return await call_next(request)
+
 def _require_key(x_api_key: Optional[str]):
     if settings.API_KEY and x_api_key != settings.API_KEY:
         raise HTTPException(status_code=401, detail="Invalid API key")
 
+def _resolve_model(preset_id: Optional[str], model: ModelSpec) -> ModelSpec:
+    # preset_id가 있으면 우선 적용
+    model_spec = model
+    if preset_id:
+        if preset_id not in PRESETS:
+            raise HTTPException(status_code=400, detail="Unknown preset_id")
+        model_spec = ModelSpec(**PRESETS[preset_id])
+
+    # 허용목록 체크
+    if (model_spec.backend, model_spec.name) not in settings.allow_models:
+        raise HTTPException(status_code=400, detail="Model not allowed")
+    return model_spec
+
+def _to_hits(points, threshold: float) -> List[Hit]:
+    hits: List[Hit] = []
+    for p in points:
+        score = float(p.score) if getattr(p, "score", None) is not None else 0.0
+        if score < threshold:
+            continue
+        hits.append(Hit(id=p.id, score=score, payload=getattr(p, "payload", None)))
+    return hits
+
 @app.get("/health")
 def health():
-    return {"ok": True, "qdrant_url": settings.QDRANT_URL}
+    return {"ok": True, "qdrant_url": settings.QDRANT_URL, "local_index": local_index.status()}
+
+@app.get("/replicas")
+def replicas():
+    # 레플리카별 지연/오류/헤지 지표
+    return {"replicas": replica_pool.stats()}
 
 @app.get("/models")
 def models():
@@ -42,61 +79,150 @@ def models():
     return {"models": items}
 
 @app.post("/search", response_model=SearchResponse)
-def search(req: SearchRequest, x_api_key: Optional[str] = Header(default=None, alias="X-API-Key")):
+def search(
+    req: SearchRequest,
+    request: Request,
+    x_api_key: Optional[str] = Header(default=None, alias="X-API-Key"),
+    x_request_timeout_ms: Optional[int] = Header(default=None, alias="X-Request-Timeout-Ms")
+):
     _require_key(x_api_key)
 
-    # 1) preset_id가 있으면 우선 적용
-    model_spec: ModelSpec = req.model
-    if req.preset_id:
-        if req.preset_id not in PRESETS:
-            raise HTTPException(status_code=400, detail="Unknown preset_id")
-        p = PRESETS[req.preset_id]
-        model_spec = ModelSpec(**p)
+    # 1) preset_id 우선 적용 + 2) 허용목록 체크
+    model_spec = _resolve_model(req.preset_id, req.model)
 
-    # 2) 허용목록 체크
-    if (model_spec.backend, model_spec.name) not in settings.allow_models:
-        raise HTTPException(status_code=400, detail="Model not allowed")
+    # 3) 데드라인: body > 헤더 > 설정 기본값 (0이면 무제한), 기준 시각은 요청 도착 시각
+    received_at = getattr(request.state, "received_at", None)
+    deadline = Deadline(req.timeout_ms or x_request_timeout_ms or settings.REQUEST_TIMEOUT_MS,
+                        start=received_at)
+    timings = {"queue_ms": int((time.monotonic() - deadline.start) * 1000)}
 
     t0 = time.time()
+    groups: Optional[List[HitGroup]] = None
+    engine = "qdrant"
     try:
-        vec = embed_query(req.text, model_spec)
-    except Exception as e:
-        logger.exception("Embedding failed")
-        raise HTTPException(status_code=500, detail=f"Embedding error: {e}")
+        t_embed = time.time()
+        try:
+            vec = embed_query(req.text, model_spec, deadline=deadline)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.exception("Embedding failed")
+            raise HTTPException(status_code=500, detail=f"Embedding error: {e}")
+        timings["embed_ms"] = int((time.time() - t_embed) * 1000)
 
-    try:
-        points = query_points(
-            cfg=req.qdrant,
-            vector=vec,
-            limit=req.top_k,
-            with_payload=req.with_payload
-        )
-    except Exception as e:
-        logger.exception("Qdrant query failed")
-        raise HTTPException(status_code=404, detail=f"Qdrant error: {e}")
+        t_query = time.time()
+        try:
+            if req.group_by:
+                point_groups = query_point_groups(
+                    cfg=req.qdrant,
+                    vector=vec,
+                    group_by=req.group_by,
+                    limit=req.top_k,
+                    group_size=req.group_size,
+                    with_payload=req.with_payload,
+                    deadline=deadline
+                )
+            else:
+                # 로컬 정확 검색 엔진 대상이면 우선 사용, 준비 전/비대상이면 Qdrant
+                points = local_index.search(req.qdrant, vec, req.top_k, req.with_payload)
+                engine = "local" if points is not None else "qdrant"
+                if points is None:
+                    points = query_points(
+                        cfg=req.qdrant,
+                        vector=vec,
+                        limit=req.top_k,
+                        with_payload=req.with_payload,
+                        deadline=deadline
+                    )
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            # Qdrant 쪽 타임아웃도 데드라인 만료로 처리
+            deadline.check("qdrant")
+            logger.exception("Qdrant query failed")
+            raise HTTPException(status_code=404, detail=f"Qdrant error: {e}")
+        timings["qdrant_ms"] = int((time.time() - t_query) * 1000)
+    except DeadlineExceeded as e:
+        # 부분 소요 시간과 함께 빠르게 504 반환
+        logger.warning({"event": "search_deadline_exceeded", "stage": e.stage, **timings})
+        raise HTTPException(status_code=504, detail={
+            "error": "Deadline exceeded",
+            "stage": e.stage,
+            "timings": timings
+        })
 
-    hits: List[Hit] = []
-    for p in points:
-        score = float(p.score) if getattr(p, "score", None) is not None else 0.0
-        if score < req.threshold:
-            continue
-        hits.append(Hit(id=p.id, score=score, payload=getattr(p, "payload", None)))
+    if req.group_by:
+        groups = []
+        total_candidates = 0
+        for g in point_groups:
+            total_candidates += len(g.hits)
+            group_hits = _to_hits(g.hits, req.threshold)
+            if group_hits:
+                groups.append(HitGroup(id=g.id, hits=group_hits))
+        # hits에는 그룹별 대표(최고 점수) hit만 담아 기존 클라이언트와 호환
+        hits = [g.hits[0] for g in groups]
+    else:
+        total_candidates = len(points)
+        hits = _to_hits(points, req.threshold)
 
     took_ms = int((time.time() - t0) * 1000)
     logger.info({
         "event": "search",
         "took_ms": took_ms,
+        **timings,
         "backend": model_spec.backend,
         "model": model_spec.name,
         "collection": req.qdrant.collection,
         "top_k": req.top_k,
         "threshold": req.threshold,
+        "group_by": req.group_by,
+        "engine": engine,
         "result_count": len(hits)
     })
     return SearchResponse(
         took_ms=took_ms,
         model=model_spec,
         collection=req.qdrant.collection,
-        total_candidates=len(points),
-        hits=hits
+        total_candidates=total_candidates,
+        hits=hits,
+        groups=groups
+    )
+
+@app.post("/embed", response_model=EmbedResponse)
+def embed(req: EmbedRequest, x_api_key: Optional[str] = Header(default=None, alias="X-API-Key")):
+    """배치 임베딩. format=f32/f16이면 (N, D) little-endian raw bytes 반환."""
+    _require_key(x_api_key)
+    model_spec = _resolve_model(req.preset_id, req.model)
+
+    t0 = time.time()
+    try:
+        arr = embed_batch(req.texts, model_spec, mode=req.mode, batch_size=req.batch_size)
+    except Exception as e:
+        logger.exception("Embedding failed")
+        raise HTTPException(status_code=500, detail=f"Embedding error: {e}")
+    took_ms = int((time.time() - t0) * 1000)
+
+    n, dim = arr.shape
+    logger.info({
+        "event": "embed",
+        "took_ms": took_ms,
+        "backend": model_spec.backend,
+        "model": model_spec.name,
+        "mode": req.mode,
+        "format": req.format,
+        "count": n
+    })
+
+    if req.format == "json":
+        return EmbedResponse(took_ms=took_ms, model=model_spec, dimension=dim, vectors=arr.tolist())
+
+    dtype = np.dtype("<f4") if req.format == "f32" else np.dtype("<f2")
+    return Response(
+        content=arr.astype(dtype, copy=False).tobytes(),
+        media_type="application/octet-stream",
+        headers={
+            "X-Embedding-Shape": f"{n},{dim}",
+            "X-Embedding-Dtype": "float32" if req.format == "f32" else "float16",
+            "X-Took-Ms": str(took_ms),
+        }
     )
@@ -1,14 +1,41 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     # Qdrant
     QDRANT_URL: str = "http://localhost:6333"
     DEFAULT_COLLECTION: str = "sample_docs"
 
+    # Qdrant 레플리카: "collection=url1|url2,..." ("*"는 모든 컬렉션)
+    QDRANT_REPLICAS: str = ""
+    QDRANT_TIMEOUT_SEC: int = 5
+    QDRANT_POOL_WORKERS: int = 32
+    # 헤지 요청: 첫 응답이 해당 레플리카 지연 백분위수를 넘으면 다음 레플리카로 한 번 더 요청
+    QDRANT_HEDGE: bool = True
+    QDRANT_HEDGE_PERCENTILE: float = 95.0
+    QDRANT_HEDGE_MIN_MS: float = 20.0
+    QDRANT_LATENCY_WINDOW: int = 1000
+    # 서킷 브레이커: 연속 실패 N회 → 쿨다운 동안 제외
+    QDRANT_CB_FAILURES: int = 3
+    QDRANT_CB_COOLDOWN_SEC: float = 10.0
+
     # 모델 화이트리스트: "all" 또는 "backend:name,backend:name"
     ALLOW_MODELS: str = "all"  # "all"이면 models_config.yaml의 모든 모델 허용
 
+    # 요청 데드라인 기본값 (ms, 0이면 무제한)
+    REQUEST_TIMEOUT_MS: int = 10_000
+
+    # 로컬 정확 검색 엔진 (소규모 컬렉션용, 메모리 매핑 벡터)
+    # 대상 컬렉션: 콤마 구분, 비어 있으면 비활성
+    LOCAL_INDEX_COLLECTIONS: str = ""
+    LOCAL_INDEX_DIR: str = "./local_index"
+    LOCAL_INDEX_DTYPE: str = "float32"  # float32|int8|binary
+    LOCAL_INDEX_MAX_POINTS: int = 200_000
+    LOCAL_INDEX_CHECK_SEC: float = 30.0  # 컬렉션 변경 확인 주기
+    LOCAL_INDEX_MAX_AGE_SEC: float = 300.0  # 변경 신호가 없어도 이 시간이 지나면 재구성 (0이면 안 함)
+    # 갱신 시각 등 증가하는 숫자 payload 필드: 설정하면 변경된 포인트만 제자리 갱신 (비어 있으면 전체 재구성만)
+    LOCAL_INDEX_UPDATED_FIELD: str = ""
+
     # 보안/CORS
     API_KEY: Optional[str] = None
     CORS_ALLOW_ORIGINS: str = "*"
@@ -34,4 +61,20 @@ class Settings(BaseSettings):
             items.append((backend.strip(), name.strip()))
         return items
 
+    @property
+    def qdrant_replicas(self) -> Dict[str, List[str]]:
+        mapping: Dict[str, List[str]] = {}
+        for token in self.QDRANT_REPLICAS.split(","):
+            if "=" not in token:
+                continue
+            collection, urls = token.split("=", 1)
+            urls_list = [u.strip() for u in urls.split("|") if u.strip()]
+            if collection.strip() and urls_list:
+                mapping[collection.strip()] = urls_list
+        return mapping
+
+    @property
+    def local_index_collections(self) -> List[str]:
+        return [c.strip() for c in self.LOCAL_INDEX_COLLECTIONS.split(",") if c.strip()]
+
 settings = Settings()
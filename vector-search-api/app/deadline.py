@@ -0,0 +1,46 @@
+# app/deadline.py
+"""
+요청 데드라인.
+
+클라이언트가 포기한 요청에 임베딩/Qdrant 작업을 낭비하지 않도록
+요청 도착 시각 기준 남은 시간을 각 단계에 전달하고, 만료되면 즉시 중단한다.
+"""
+import math
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(Exception):
+    """데드라인 만료. stage는 만료를 감지한 단계 (embed/qdrant 등)."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded at {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    def __init__(self, timeout_ms: Optional[int], start: Optional[float] = None):
+        # start: time.monotonic() 기준 요청 도착 시각
+        self.start = start if start is not None else time.monotonic()
+        self.expires_at = self.start + timeout_ms / 1000.0 if timeout_ms else None
+
+    def remaining(self) -> Optional[float]:
+        """남은 시간(초). 데드라인이 없으면 None."""
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        r = self.remaining()
+        return r is not None and r <= 0
+
+    def check(self, stage: str) -> None:
+        if self.expired():
+            raise DeadlineExceeded(stage)
+
+    def qdrant_timeout(self) -> Optional[int]:
+        """Qdrant 서버 측 timeout 파라미터 (정수 초, 최소 1)."""
+        r = self.remaining()
+        if r is None:
+            return None
+        return max(1, math.ceil(r))
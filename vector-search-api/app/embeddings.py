@@ -1,13 +1,14 @@
 # app/embeddings.py
 import os
 from functools import lru_cache
-from typing import Iterable, List
+from typing import Iterable, List, Optional
 import numpy as np
 
 from sentence_transformers import SentenceTransformer  # pragma: no cover
 import torch  # pragma: no cover
 
 from .models import ModelSpec
+from .deadline import Deadline
 
 # --------- 유틸 ---------
 def _e5_prefix(text: str, mode: str) -> str:
@@ -51,6 +52,17 @@ def _pick_device() -> str:
     return "cpu"
 
 
+def _norm_rows(arr: np.ndarray, enable: bool) -> np.ndarray:
+    """배치 전체를 한 번에 L2 정규화 (제자리 연산, float32)."""
+    arr = np.asarray(arr, dtype=np.float32)
+    if not enable:
+        return arr
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    arr /= norms
+    return arr
+
+
 def _norm(vec: List[float], enable: bool) -> List[float]:
     if not enable:
         return vec
@@ -90,16 +102,19 @@ def _load_st(name: str):
 
 
 # --------- 공개 API ---------
-def embed_query(text: str, spec: ModelSpec) -> List[float]:
+def embed_query(text: str, spec: ModelSpec, deadline: Optional[Deadline] = None) -> List[float]:
     """
     단일 쿼리 텍스트 → 벡터.
     - st: PyTorch 기반 (GPU/CPU 자동)
+    - deadline: 모델 로딩/대기 후 forward 직전에 만료 여부 확인 (만료 시 DeadlineExceeded)
     """
     name = _resolve_name(spec.name)
     t = _e5_prefix(text, spec.e5_mode) if "e5" in name.lower() else text
 
     # ST
     model, device = _load_st(name)
+    if deadline is not None:
+        deadline.check("embed")
     vec = model.encode(
         t,
         normalize_embeddings=False,
@@ -109,11 +124,20 @@ def embed_query(text: str, spec: ModelSpec) -> List[float]:
     return _norm(vec, spec.normalize)
 
 
-def embed_many(texts: List[str], spec: ModelSpec, batch_size: int = 64) -> List[List[float]]:
+def embed_batch(
+    texts: List[str],
+    spec: ModelSpec,
+    mode: Optional[str] = "passage",
+    batch_size: int = 64
+) -> np.ndarray:
     """
-    배치 임베딩 유틸 (인덱싱/대량 처리용).
+    배치 임베딩 → (N, D) float32 배열.
+    - mode: E5 계열 모델의 query/passage 프리픽스 (None이면 프리픽스 없이 원문 그대로)
+    - 정규화는 배치 전체에 NumPy로 한 번에 적용
     """
     name = _resolve_name(spec.name)
+    if mode is not None and "e5" in name.lower():
+        texts = [_e5_prefix(t, mode) for t in texts]
 
     # ST
     model, device = _load_st(name)
@@ -128,4 +152,11 @@ def embed_many(texts: List[str], spec: ModelSpec, batch_size: int = 64) -> List[
         convert_to_numpy=True,
         device=device
     )
-    return [_norm(v.tolist(), spec.normalize) for v in arr]
+    return _norm_rows(arr, spec.normalize)
+
+
+def embed_many(texts: List[str], spec: ModelSpec, batch_size: int = 64) -> List[List[float]]:
+    """
+    배치 임베딩 유틸 (인덱싱/대량 처리용). 기존 동작대로 E5 프리픽스를 붙이지 않는다.
+    """
+    return embed_batch(texts, spec, mode=None, batch_size=batch_size).tolist()
@@ -0,0 +1,429 @@
+# app/local_index.py
+"""
+소규모 컬렉션용 인프로세스 정확(exact) 검색 엔진.
+
+- scroll로 컬렉션 벡터/ID/payload를 디스크 스냅샷으로 떠서 메모리 매핑
+- top-k는 NumPy 행렬곱 + argpartition 으로 계산 (네트워크 홉 없음)
+- payload는 오프셋 배열 + JSON blob 사이드카에서 필요한 것만 읽음
+- 컬렉션 변경 신호(points/segments/indexed 수)를 주기적으로 확인해 백그라운드에서 새 스냅샷으로 교체
+- updated_field(숫자 payload, 예: 갱신 시각 epoch초)가 있으면 스냅샷 이후 값이 커진 포인트만 scroll해서
+  벡터 행과 payload를 제자리에서 덮어쓴다 (포인트 수가 바뀌거나 새 ID가 나오면 전체 재구성).
+  Qdrant는 "이후 변경된 포인트" 조회를 제공하지 않으므로, 이 필드가 없으면 같은 ID 덮어쓰기·payload 수정은
+  신호에 드러나지 않을 수 있어 max_age_sec가 지나면 강제로 다시 만든다
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from loguru import logger
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, FieldCondition, Filter, Range, ScoredPoint
+
+from .config import settings
+from .models import QdrantCfg
+from .qdrant_wrapper import get_client
+
+_SCROLL_BATCH = 2048
+# int8 점수 계산 시 한 번에 float32로 올리는 행 수 (행렬 전체 복사 방지)
+_SCORE_BLOCK_ROWS = 16384
+_DTYPES = ("float32", "int8", "binary")
+# 바이트 단위 popcount 테이블 (binary 모드 해밍 거리 계산용)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+# --------- 스냅샷 생성 ---------
+def _quantize(block: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """정규화된 float32 블록 → 저장 포맷 (int8은 벡터별 scale 동반)."""
+    if dtype == "int8":
+        scales = np.abs(block).max(axis=1)
+        scales[scales == 0] = 1.0
+        q = np.rint(block / scales[:, None] * 127.0).astype(np.int8)
+        return q, scales.astype(np.float32)
+    if dtype == "binary":
+        return np.packbits(block > 0, axis=1), None
+    return block, None
+
+
+def _normalize(records) -> np.ndarray:
+    block = np.asarray([r.vector for r in records], dtype=np.float32)
+    norms = np.linalg.norm(block, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    block /= norms
+    return block
+
+
+def _watermark(records, field: str, current: Optional[float]) -> Optional[float]:
+    """records의 updated_field 최댓값과 current 중 큰 값 (숫자가 아닌 값은 무시)."""
+    for r in records:
+        value = (r.payload or {}).get(field)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            current = float(value) if current is None else max(current, float(value))
+    return current
+
+
+def _write_json(path: str, data: Any) -> None:
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(path + ".tmp", path)
+
+
+def _change_signature(info) -> List[int]:
+    """컬렉션 변경 신호: 포인트 수·세그먼트 수·인덱싱된 벡터 수 (하나라도 바뀌면 재구성)."""
+    return [int(info.points_count or 0), int(getattr(info, "segments_count", 0) or 0),
+            int(getattr(info, "indexed_vectors_count", 0) or 0)]
+
+
+def build_snapshot(client: QdrantClient, collection: str, path: str, dtype: str,
+                   updated_field: str = "") -> Dict[str, Any]:
+    """컬렉션 전체를 scroll 하여 path 디렉터리에 스냅샷을 기록한다."""
+    if dtype not in _DTYPES:
+        raise ValueError(f"Unsupported LOCAL_INDEX_DTYPE: {dtype}")
+
+    info = client.get_collection(collection)
+    params = info.config.params.vectors
+    # 이름 있는 벡터(dict)나 Cosine 이외 거리는 로컬 엔진에서 점수가 달라지므로 지원하지 않음
+    if not hasattr(params, "size") or params.distance != Distance.COSINE:
+        raise ValueError("Local index supports only single unnamed COSINE vectors")
+    dim = int(params.size)
+
+    tmp = path + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    ids: List[Any] = []
+    offsets: List[int] = [0]
+    scales: List[np.ndarray] = []
+    watermark: Optional[float] = None
+    offset = None
+    with open(os.path.join(tmp, "vectors.bin"), "wb") as vf, \
+            open(os.path.join(tmp, "payloads.bin"), "wb") as pf:
+        while True:
+            records, offset = client.scroll(
+                collection_name=collection,
+                limit=_SCROLL_BATCH,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            if records:
+                block = _normalize(records)
+                if updated_field:
+                    watermark = _watermark(records, updated_field, watermark)
+
+                stored, block_scales = _quantize(block, dtype)
+                vf.write(np.ascontiguousarray(stored).tobytes())
+                if block_scales is not None:
+                    scales.append(block_scales)
+
+                for r in records:
+                    ids.append(r.id)
+                    raw = json.dumps(r.payload or {}, ensure_ascii=False, default=str).encode("utf-8")
+                    pf.write(raw)
+                    offsets.append(offsets[-1] + len(raw))
+            if offset is None:
+                break
+
+    np.save(os.path.join(tmp, "payload_offsets.npy"), np.asarray(offsets, dtype=np.int64))
+    if dtype == "int8":
+        all_scales = np.concatenate(scales) if scales else np.empty(0, dtype=np.float32)
+        np.save(os.path.join(tmp, "scales.npy"), all_scales)
+
+    meta = {
+        "collection": collection,
+        "dtype": dtype,
+        "dim": dim,
+        "count": len(ids),
+        "points_count": info.points_count or 0,
+        "signature": _change_signature(info),
+        "built_at": time.time(),
+        "updated_field": updated_field or None,
+        "watermark": watermark,
+    }
+    with open(os.path.join(tmp, "ids.json"), "w", encoding="utf-8") as f:
+        json.dump(ids, f)
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    os.replace(tmp, path)
+    return meta
+
+
+# --------- 스냅샷 조회 ---------
+class Snapshot:
+    """디스크 스냅샷을 메모리 매핑하여 top-k 정확 검색을 수행한다."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta: Dict[str, Any] = json.load(f)
+        with open(os.path.join(path, "ids.json"), encoding="utf-8") as f:
+            self.ids: List[Any] = json.load(f)
+
+        self.path = path
+        self.dtype: str = self.meta["dtype"]
+        self.dim: int = self.meta["dim"]
+        self.count: int = self.meta["count"]
+        self.points_count: int = self.meta["points_count"]
+        self.signature: Optional[List[int]] = self.meta.get("signature")
+
+        width, np_dtype = self.dim, np.float32
+        if self.dtype == "int8":
+            np_dtype = np.int8
+        elif self.dtype == "binary":
+            width, np_dtype = (self.dim + 7) // 8, np.uint8
+
+        # np.memmap은 크기 0 파일을 열 수 없으므로 빈 컬렉션은 별도 처리
+        if self.count:
+            self.vectors = np.memmap(os.path.join(path, "vectors.bin"), dtype=np_dtype,
+                                     mode="r", shape=(self.count, width))
+            self.payload_blob = np.memmap(os.path.join(path, "payloads.bin"), dtype=np.uint8, mode="r")
+        else:
+            self.vectors = np.empty((0, width), dtype=np_dtype)
+            self.payload_blob = np.empty(0, dtype=np.uint8)
+        self.payload_offsets = np.load(os.path.join(path, "payload_offsets.npy"), mmap_mode="r")
+        self.scales = (np.load(os.path.join(path, "scales.npy"), mmap_mode="r")
+                       if self.dtype == "int8" else None)
+        # 제자리 갱신된 payload (행 번호 → payload); 원본 blob은 가변 길이라 사이드카에 둔다
+        self.patches: Dict[int, Dict[str, Any]] = {}
+        patches_path = os.path.join(path, "payload_patches.json")
+        if os.path.exists(patches_path):
+            with open(patches_path, encoding="utf-8") as f:
+                self.patches = {int(row): payload for row, payload in json.load(f).items()}
+        self._rows: Dict[Any, int] = {pid: i for i, pid in enumerate(self.ids)}
+
+    def has_ids(self, ids: List[Any]) -> bool:
+        return all(pid in self._rows for pid in ids)
+
+    def patch(self, records, info, watermark: Optional[float]) -> None:
+        """이미 있는 ID의 벡터 행·scale·payload를 제자리에서 덮어쓴다 (검색 중인 memmap에 바로 보임)."""
+        if records:
+            rows = [self._rows[r.id] for r in records]
+            stored, block_scales = _quantize(_normalize(records), self.dtype)
+            vectors = np.memmap(os.path.join(self.path, "vectors.bin"), dtype=self.vectors.dtype,
+                                mode="r+", shape=self.vectors.shape)
+            vectors[rows] = stored
+            vectors.flush()
+            del vectors
+            if block_scales is not None:
+                scales = np.load(os.path.join(self.path, "scales.npy"), mmap_mode="r+")
+                scales[rows] = block_scales
+                scales.flush()
+                del scales
+            for row, r in zip(rows, records):
+                self.patches[row] = r.payload or {}
+            _write_json(os.path.join(self.path, "payload_patches.json"), self.patches)
+
+        self.meta["watermark"] = watermark
+        self.meta["signature"] = self.signature = _change_signature(info)
+        self.meta["patched_at"] = time.time()
+        _write_json(os.path.join(self.path, "meta.json"), self.meta)
+
+    def _scores(self, q: np.ndarray) -> np.ndarray:
+        if self.dtype == "int8":
+            # int8 행렬 전체를 float32로 올리지 않도록 블록 단위로 계산
+            scores = np.empty(self.count, dtype=np.float32)
+            for start in range(0, self.count, _SCORE_BLOCK_ROWS):
+                end = min(start + _SCORE_BLOCK_ROWS, self.count)
+                scores[start:end] = self.vectors[start:end].astype(np.float32) @ q
+            scores *= self.scales / 127.0
+            return scores
+        if self.dtype == "binary":
+            qbits = np.packbits(q > 0)
+            hamming = _POPCOUNT[np.bitwise_xor(self.vectors, qbits)].sum(axis=1)
+            # 해밍 거리 → 근사 코사인 유사도
+            return 1.0 - 2.0 * hamming.astype(np.float32) / self.dim
+        return self.vectors @ q
+
+    def _payload(self, i: int) -> Dict[str, Any]:
+        if i in self.patches:
+            return self.patches[i]
+        start, end = int(self.payload_offsets[i]), int(self.payload_offsets[i + 1])
+        return json.loads(bytes(self.payload_blob[start:end]).decode("utf-8"))
+
+    def search(self, vector: List[float], limit: int, with_payload: bool) -> List[ScoredPoint]:
+        k = min(limit, self.count)
+        if k <= 0:
+            return []
+
+        q = np.asarray(vector, dtype=np.float32)
+        n = np.linalg.norm(q)
+        if n > 0:
+            q = q / n
+
+        scores = self._scores(q)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            ScoredPoint(
+                id=self.ids[i],
+                version=0,
+                score=float(scores[i]),
+                payload=self._payload(i) if with_payload else None
+            )
+            for i in top
+        ]
+
+
+# --------- 관리자 ---------
+class LocalIndexManager:
+    """(url, collection)별 스냅샷 보관 및 백그라운드 갱신."""
+
+    def __init__(self, root: str, collections: List[str], dtype: str,
+                 max_points: int, check_sec: float, max_age_sec: float = 0.0, updated_field: str = ""):
+        self.root = root
+        self.collections = set(collections)
+        self.dtype = dtype
+        self.max_points = max_points
+        self.check_sec = check_sec
+        self.max_age_sec = max_age_sec
+        self.updated_field = updated_field
+        self._snapshots: Dict[Tuple[str, str], Snapshot] = {}
+        self._checked_at: Dict[Tuple[str, str], float] = {}
+        self._refreshing: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    def enabled_for(self, cfg: QdrantCfg) -> bool:
+        # 필터 검색은 Qdrant에 맡긴다 (로컬 엔진은 전체 스캔 전용)
+        return cfg.collection in self.collections and not cfg.query_filter
+
+    def search(self, cfg: QdrantCfg, vector: List[float], limit: int,
+               with_payload: bool) -> Optional[List[ScoredPoint]]:
+        """로컬 스냅샷으로 검색. 사용할 수 없으면 None (호출 측에서 Qdrant로 폴백)."""
+        if not self.enabled_for(cfg):
+            return None
+        key = (cfg.url, cfg.collection)
+        self._schedule_refresh(key)
+        snap = self._snapshots.get(key)
+        if snap is None:
+            return None
+        return snap.search(vector, limit, with_payload)
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {"url": url, "collection": coll, "dtype": s.dtype, "count": s.count,
+             "built_at": s.meta.get("built_at"), "patched_at": s.meta.get("patched_at")}
+            for (url, coll), s in self._snapshots.items()
+        ]
+
+    def _dir_for(self, key: Tuple[str, str]) -> str:
+        url, collection = key
+        url_hash = hashlib.sha1(url.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.root, f"{collection}_{url_hash}")
+
+    def _schedule_refresh(self, key: Tuple[str, str]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if key in self._refreshing or now - self._checked_at.get(key, float("-inf")) < self.check_sec:
+                return
+            self._checked_at[key] = now
+            self._refreshing.add(key)
+        threading.Thread(target=self._refresh, args=(key,), daemon=True).start()
+
+    def _load_latest(self, key: Tuple[str, str]) -> Optional[Snapshot]:
+        """재시작 시 디스크에 남은 최신 스냅샷 재사용."""
+        base = self._dir_for(key)
+        if not os.path.isdir(base):
+            return None
+        builds = sorted(d for d in os.listdir(base) if not d.endswith(".tmp"))
+        if not builds:
+            return None
+        try:
+            return Snapshot(os.path.join(base, builds[-1]))
+        except Exception:
+            logger.warning(f"Broken local index snapshot ignored: {base}/{builds[-1]}")
+            return None
+
+    def _is_stale(self, snap: Snapshot, info) -> bool:
+        if snap.dtype != self.dtype or snap.signature != _change_signature(info):
+            return True
+        # 덮어쓰기/payload 수정은 변경 신호에 잡히지 않을 수 있음 → 최대 보관 시간 경과 시 재구성
+        return bool(self.max_age_sec) and time.time() - snap.meta.get("built_at", 0) > self.max_age_sec
+
+    def _can_patch(self, snap: Snapshot, info) -> bool:
+        """포인트 추가/삭제가 없고 스냅샷에 updated_field 기준점이 있으면 변경분만 반영할 수 있다."""
+        return (bool(self.updated_field) and snap.dtype == self.dtype
+                and snap.meta.get("updated_field") == self.updated_field
+                and snap.meta.get("watermark") is not None
+                and snap.points_count == (info.points_count or 0))
+
+    def _patch(self, client: QdrantClient, collection: str, snap: Snapshot, info) -> bool:
+        """기준점 이후 갱신된 포인트만 제자리 반영. 새 ID가 있으면 False (전체 재구성 필요)."""
+        watermark = snap.meta["watermark"]
+        changed = Filter(must=[FieldCondition(key=self.updated_field, range=Range(gt=watermark))])
+        records, offset = [], None
+        while True:
+            batch, offset = client.scroll(
+                collection_name=collection,
+                scroll_filter=changed,
+                limit=_SCROLL_BATCH,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            records.extend(batch)
+            if offset is None:
+                break
+        if not snap.has_ids([r.id for r in records]):
+            return False
+        snap.patch(records, info, _watermark(records, self.updated_field, watermark))
+        if records:
+            logger.info({"event": "local_index_patched", "collection": collection, "count": len(records)})
+        return True
+
+    def _refresh(self, key: Tuple[str, str]) -> None:
+        url, collection = key
+        try:
+            snap = self._snapshots.get(key) or self._load_latest(key)
+            if snap is not None:
+                self._snapshots[key] = snap
+
+            client = get_client(url)
+            info = client.get_collection(collection)
+            points_count = info.points_count or 0
+            if points_count > self.max_points:
+                logger.warning(f"Local index disabled for {collection}: {points_count} > {self.max_points} points")
+                self._snapshots.pop(key, None)
+                return
+            if snap is not None and self._can_patch(snap, info) and self._patch(client, collection, snap, info):
+                return
+            if snap is not None and not self._is_stale(snap, info):
+                return
+
+            t0 = time.time()
+            base = self._dir_for(key)
+            path = os.path.join(base, f"{int(time.time() * 1000):015d}")
+            meta = build_snapshot(client, collection, path, self.dtype, self.updated_field)
+            self._snapshots[key] = Snapshot(path)
+            logger.info({
+                "event": "local_index_built",
+                "collection": collection,
+                "count": meta["count"],
+                "dtype": self.dtype,
+                "took_ms": int((time.time() - t0) * 1000)
+            })
+
+            # 이전 스냅샷 정리 (사용 중인 memmap이 있으면 OS에 따라 실패할 수 있으므로 무시)
+            for d in os.listdir(base):
+                if os.path.join(base, d) != path:
+                    shutil.rmtree(os.path.join(base, d), ignore_errors=True)
+        except Exception:
+            logger.exception(f"Local index refresh failed: {collection}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+
+local_index = LocalIndexManager(
+    root=settings.LOCAL_INDEX_DIR,
+    collections=settings.local_index_collections,
+    dtype=settings.LOCAL_INDEX_DTYPE,
+    max_points=settings.LOCAL_INDEX_MAX_POINTS,
+    check_sec=settings.LOCAL_INDEX_CHECK_SEC,
+    max_age_sec=settings.LOCAL_INDEX_MAX_AGE_SEC,
+    updated_field=settings.LOCAL_INDEX_UPDATED_FIELD,
+)
@@ -21,15 +21,41 @@ class SearchRequest(BaseModel):
     model: ModelSpec = ModelSpec()
     # 새로 추가: 프리셋 한 줄로 선택 가능 (들어오면 preset 우선 적용)
     preset_id: Optional[str] = None
+    # 그룹 검색: payload 필드(예: "pk", "source") 기준으로 묶어서 top_k개 그룹 반환
+    group_by: Optional[str] = None
+    group_size: int = Field(default=1, ge=1, le=20)
+    # 요청 데드라인 (ms). 없으면 X-Request-Timeout-Ms 헤더 또는 REQUEST_TIMEOUT_MS 사용
+    timeout_ms: Optional[int] = Field(default=None, ge=1)
 
 class Hit(BaseModel):
     id: Any
     score: float
     payload: Optional[Dict[str, Any]] = None
 
+class HitGroup(BaseModel):
+    id: Any
+    hits: List[Hit]
+
 class SearchResponse(BaseModel):
     took_ms: int
     model: ModelSpec
     collection: str
     total_candidates: int
     hits: List[Hit]
+    # group_by 요청 시에만 채워짐 (hits에는 그룹별 최고 점수 hit만 담김)
+    groups: Optional[List[HitGroup]] = None
+
+class EmbedRequest(BaseModel):
+    texts: List[str] = Field(min_length=1, max_length=1024)
+    mode: str = Field(default="passage", pattern="^(query|passage)$")
+    # json: vectors 배열 / f32, f16: little-endian raw bytes (X-Embedding-Shape 헤더 동반)
+    format: str = Field(default="json", pattern="^(json|f32|f16)$")
+    batch_size: int = Field(default=64, ge=1, le=512)
+    model: ModelSpec = ModelSpec()
+    preset_id: Optional[str] = None
+
+class EmbedResponse(BaseModel):
+    took_ms: int
+    model: ModelSpec
+    dimension: int
+    vectors: List[List[float]]
@@ -1,7 +1,9 @@
 from typing import Any, Dict, List, Optional
 from qdrant_client import QdrantClient
-from qdrant_client.models import Filter, ScoredPoint  # pydantic models
+from qdrant_client.models import Filter, ScoredPoint, PointGroup  # pydantic models
 from .models import QdrantCfg
+from .replicas import replica_pool
+from .deadline import Deadline
 
 def _to_filter(maybe: Optional[Dict[str, Any]]) -> Optional[Filter]:
     if not maybe:
@@ -11,23 +13,55 @@ def _to_filter(maybe: Optional[Dict[str, Any]]) -> Optional[Filter]:
     return Filter(**maybe)
 
 def get_client(url: str) -> QdrantClient:
-    return QdrantClient(url=url)
+    # URL별로 재사용되는 클라이언트 (타임아웃 포함)
+    return replica_pool.replica(url).client
 
 def ensure_collection(client: QdrantClient, name: str) -> None:
     # 존재 확인 (없으면 예외)
     client.get_collection(name)
 
-def query_points(cfg: QdrantCfg, vector: List[float], limit: int, with_payload: bool) -> List[ScoredPoint]:
-    client = get_client(cfg.url)
-    ensure_collection(client, cfg.collection)
+def query_points(
+    cfg: QdrantCfg,
+    vector: List[float],
+    limit: int,
+    with_payload: bool,
+    deadline: Optional[Deadline] = None
+) -> List[ScoredPoint]:
     qf = _to_filter(cfg.query_filter)
 
-    res = client.query_points(
+    # 컬렉션이 없으면 query_points 자체가 오류를 내므로 별도 존재 확인 왕복은 생략
+    res = replica_pool.call(cfg.url, cfg.collection, lambda client: client.query_points(
         collection_name=cfg.collection,
         query=vector,
         limit=limit,
         query_filter=qf,
-        with_payload=with_payload
-    )
+        with_payload=with_payload,
+        timeout=deadline.qdrant_timeout() if deadline else None
+    ), deadline=deadline)
     # Python client는 QueryResponse(points=[...]) 형태를 반환
     return list(res.points or [])
+
+def query_point_groups(
+    cfg: QdrantCfg,
+    vector: List[float],
+    group_by: str,
+    limit: int,
+    group_size: int,
+    with_payload: bool,
+    deadline: Optional[Deadline] = None
+) -> List[PointGroup]:
+    """payload 필드 기준 그룹 검색. 같은 pk의 청크들을 하나의 그룹으로 묶는다."""
+    qf = _to_filter(cfg.query_filter)
+
+    res = replica_pool.call(cfg.url, cfg.collection, lambda client: client.query_points_groups(
+        collection_name=cfg.collection,
+        query=vector,
+        group_by=group_by,
+        limit=limit,
+        group_size=group_size,
+        query_filter=qf,
+        with_payload=with_payload,
+        timeout=deadline.qdrant_timeout() if deadline else None
+    ), deadline=deadline)
+    # GroupsResult(groups=[PointGroup(id, hits), ...])
+    return list(res.groups or [])
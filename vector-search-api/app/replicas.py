@@ -0,0 +1,230 @@
+# app/replicas.py
+"""
+Qdrant 레플리카 풀.
+
+- 논리 컬렉션별 여러 Qdrant URL (QDRANT_REPLICAS) 라운드로빈 분산
+- 첫 요청이 레플리카 지연 백분위수(QDRANT_HEDGE_PERCENTILE)를 넘기면 다음 레플리카로 헤지 요청
+- 연속 실패 시 서킷 오픈 → 쿨다운 동안 해당 레플리카 제외
+  (전송 오류·타임아웃·5xx만 실패로 집계하고 재시도, 4xx는 요청 자체의 문제이므로 바로 반환)
+- 레플리카별 요청/오류/헤지 수, 지연 백분위수 지표
+"""
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, List, Optional, TypeVar
+
+import numpy as np
+from loguru import logger
+from qdrant_client import QdrantClient
+
+from .config import settings
+from .deadline import Deadline
+
+T = TypeVar("T")
+
+# 백분위수를 신뢰하기 위한 최소 표본 수 (그 전에는 QDRANT_HEDGE_MIN_MS 사용)
+_MIN_SAMPLES = 20
+# 4xx 중 레플리카 상태 탓일 수 있는 코드 (타임아웃, 과부하)
+_RETRYABLE_STATUS = {408, 429}
+# 요청 자체가 잘못된 gRPC 상태 코드
+_CLIENT_GRPC_CODES = {"INVALID_ARGUMENT", "NOT_FOUND", "ALREADY_EXISTS", "FAILED_PRECONDITION",
+                      "OUT_OF_RANGE", "PERMISSION_DENIED", "UNAUTHENTICATED"}
+
+
+def is_client_error(error: BaseException) -> bool:
+    """요청 자체의 오류(없는 컬렉션, 잘못된 필터, 차원 불일치 등)인지 판별.
+
+    이런 오류는 어느 레플리카로 보내도 같으므로 서킷에 집계하거나 재시도하지 않는다.
+    """
+    status = getattr(error, "status_code", None)  # qdrant_client UnexpectedResponse (REST)
+    if isinstance(status, int):
+        return 400 <= status < 500 and status not in _RETRYABLE_STATUS
+    code = getattr(error, "code", None)  # grpc.RpcError
+    if callable(code):
+        try:
+            return getattr(code(), "name", "") in _CLIENT_GRPC_CODES
+        except Exception:
+            return False
+    # 클라이언트 측 검증 오류 (잘못된 인자, 스키마)
+    return isinstance(error, (ValueError, TypeError))
+
+
+class Replica:
+    """단일 Qdrant 노드의 클라이언트, 지연 표본, 서킷 상태."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.client = QdrantClient(url=url, timeout=settings.QDRANT_TIMEOUT_SEC)
+        self.latencies: Deque[float] = deque(maxlen=settings.QDRANT_LATENCY_WINDOW)
+        self.requests = 0
+        self.errors = 0
+        self.hedges = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+
+    def available(self, now: float) -> bool:
+        # 쿨다운이 끝나면 half-open: 다음 요청이 실패하면 바로 다시 오픈
+        return now >= self.open_until
+
+    def record_success(self, elapsed: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(elapsed)
+            self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.errors += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= settings.QDRANT_CB_FAILURES:
+                self.open_until = time.monotonic() + settings.QDRANT_CB_COOLDOWN_SEC
+                logger.warning(f"Qdrant replica circuit open: {self.url} "
+                               f"({self.consecutive_failures} consecutive failures)")
+
+    def record_hedge(self) -> None:
+        with self._lock:
+            self.hedges += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = list(self.latencies)
+        if len(samples) < _MIN_SAMPLES:
+            return None
+        return float(np.percentile(samples, q))
+
+    def stats(self) -> Dict[str, Any]:
+        def ms(q: float) -> Optional[float]:
+            p = self.percentile(q)
+            return round(p * 1000, 2) if p is not None else None
+
+        return {
+            "url": self.url,
+            "circuit": "closed" if self.available(time.monotonic()) else "open",
+            "requests": self.requests,
+            "errors": self.errors,
+            "hedges": self.hedges,
+            "p50_ms": ms(50),
+            "p95_ms": ms(95),
+            "p99_ms": ms(99),
+        }
+
+
+class ReplicaPool:
+    """URL별 Replica 보관 및 헤지/재시도 호출."""
+
+    def __init__(self):
+        self._replicas: Dict[str, Replica] = {}
+        self._rr = itertools.count()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=settings.QDRANT_POOL_WORKERS,
+                                            thread_name_prefix="qdrant")
+
+    def replica(self, url: str) -> Replica:
+        with self._lock:
+            r = self._replicas.get(url)
+            if r is None:
+                r = self._replicas[url] = Replica(url)
+            return r
+
+    def _urls_for(self, url: str, collection: str) -> List[str]:
+        """레플리카 목록은 기본 QDRANT_URL이나 목록에 있는 URL로 온 요청에만 적용.
+        요청이 다른 Qdrant URL을 명시하면 그 URL로만 보낸다."""
+        mapping = settings.qdrant_replicas
+        urls = mapping.get(collection) or mapping.get("*")
+        if urls and (url in urls or url.rstrip("/") == settings.QDRANT_URL.rstrip("/")):
+            return urls
+        return [url]
+
+    def _order(self, urls: List[str]) -> List[Replica]:
+        replicas = [self.replica(u) for u in urls]
+        now = time.monotonic()
+        healthy = [r for r in replicas if r.available(now)]
+        if not healthy:
+            # 모두 차단된 경우: 가장 먼저 풀리는 레플리카부터 시도
+            return sorted(replicas, key=lambda r: r.open_until)
+        start = next(self._rr) % len(healthy)
+        return healthy[start:] + healthy[:start]
+
+    def _hedge_delay(self, replica: Replica) -> float:
+        floor = settings.QDRANT_HEDGE_MIN_MS / 1000.0
+        p = replica.percentile(settings.QDRANT_HEDGE_PERCENTILE)
+        return floor if p is None else max(p, floor)
+
+    @staticmethod
+    def _run(replica: Replica, fn: Callable[[QdrantClient], T]) -> T:
+        t0 = time.perf_counter()
+        try:
+            result = fn(replica.client)
+        except Exception as e:
+            if is_client_error(e):
+                # 레플리카는 정상 응답함 → 서킷에 집계하지 않음
+                replica.record_success(time.perf_counter() - t0)
+            else:
+                replica.record_failure()
+            raise
+        replica.record_success(time.perf_counter() - t0)
+        return result
+
+    def call(self, url: str, collection: str, fn: Callable[[QdrantClient], T],
+             deadline: Optional[Deadline] = None) -> T:
+        """fn(client)을 레플리카에 실행. 느리면 헤지, 실패하면 다음 레플리카로 재시도.
+        deadline이 지나면 남은 응답을 기다리지 않고 DeadlineExceeded."""
+        order = self._order(self._urls_for(url, collection))
+        pending: Dict[Future, Replica] = {}
+        next_idx = 0
+        last_error: Optional[Exception] = None
+
+        def submit() -> None:
+            nonlocal next_idx
+            r = order[next_idx]
+            next_idx += 1
+            pending[self._executor.submit(self._run, r, fn)] = r
+
+        if deadline is not None:
+            deadline.check("qdrant")
+        submit()
+        hedge_after = (self._hedge_delay(order[0])
+                       if settings.QDRANT_HEDGE and len(order) > 1 else None)
+
+        while pending:
+            timeout = hedge_after if next_idx < len(order) else None
+            remaining = deadline.remaining() if deadline is not None else None
+            if remaining is not None and (timeout is None or remaining < timeout):
+                timeout = max(remaining, 0.0)
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if deadline is not None:
+                    deadline.check("qdrant")
+                if hedge_after is not None and next_idx < len(order):
+                    # 헤지: 첫 응답이 늦으면 다음 레플리카에 한 번 더 요청 (먼저 온 응답 사용)
+                    order[next_idx].record_hedge()
+                    submit()
+                    hedge_after = None
+                continue
+
+            for f in done:
+                pending.pop(f)
+                try:
+                    return f.result()
+                except Exception as e:
+                    if is_client_error(e):
+                        raise
+                    last_error = e
+
+            # 실패: 남은 레플리카가 있으면 즉시 재시도
+            if next_idx < len(order) and (deadline is None or not deadline.expired()):
+                submit()
+
+        raise last_error  # type: ignore[misc]
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            replicas = list(self._replicas.values())
+        return [r.stats() for r in replicas]
+
+
+replica_pool = ReplicaPool()